@@ -0,0 +1,162 @@
+"""
+Helpers shared by the benchmark management commands: synthetic social graph
+seeding and latency statistics.
+"""
+import itertools
+import math
+import statistics
+import time
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+
+BENCH_EMAIL_DOMAIN = 'bench.invalid'
+BENCH_PASSWORD = 'bench-password-123'
+NAME_SYLLABLES = ('an', 'ar', 'be', 'ka', 'li', 'ma', 'na', 'ri', 'sa', 'th',
+                  'vi', 'ya', 'jo', 'el', 'ro', 'mi', 'ne', 'su', 'ha', 'de')
+
+
+def bench_email(number):
+    return 'user%d@%s' % (number, BENCH_EMAIL_DOMAIN)
+
+
+def random_name(rng):
+    return ''.join(
+        rng.choice(NAME_SYLLABLES)
+        for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def bench_users():
+    from user_profile.models import UserProfile
+
+    return UserProfile.objects.filter(email__endswith='@' + BENCH_EMAIL_DOMAIN)
+
+
+def seed_users(rng, count, batch_size=5000, password=None):
+    """
+    Grow the synthetic user population to `count` users.
+    All users share one password hash so seeding does not pay for hashing.
+    :return: List of the synthetic user ids.
+    """
+    from user_profile.models import UserProfile
+    from user_profile.search import get_search_backend
+
+    password = make_password(password) if password else '!'
+    if password != '!':
+        bench_users().update(password=password)
+    for offset in range(bench_users().count(), count, batch_size):
+        UserProfile.objects.bulk_create([
+            UserProfile(email=bench_email(number), first_name=random_name(rng),
+                        last_name=random_name(rng), password=password)
+            for number in range(offset, min(offset + batch_size, count))
+        ])
+    get_search_backend().reset()
+    return list(bench_users().order_by('pk').values_list('pk', flat=True))
+
+
+def power_law_degrees(rng, count, average, exponent=2.1, maximum=5000):
+    """
+    Draw `count` out-degrees from a discrete power law scaled to `average`.
+    """
+    raw = [rng.paretovariate(exponent - 1) for _ in range(count)]
+    scale = average / (sum(raw) / count)
+    return [min(maximum, int(round(value * scale))) for value in raw]
+
+
+def seed_friend_requests(rng, user_ids, average_degree, exponent=2.1,
+                         accepted=0.6, rejected=0.1, batch_size=5000):
+    """
+    Create friend requests between the synthetic users.
+    Out-degrees follow a power law, and targets are picked with a preference
+    for high degree users. The rest of the requests stay pending. Counters
+    and friendships are rebuilt afterwards because bulk inserts skip the
+    signals.
+    :return: Number of friend requests created.
+    """
+    from friends.models import FriendRequest
+
+    degrees = power_law_degrees(rng, len(user_ids), average_degree, exponent)
+    cumulative = list(itertools.accumulate(degree + 1 for degree in degrees))
+    total = 0
+    batch = []
+    for user_id, degree in zip(user_ids, degrees):
+        targets = set(rng.choices(user_ids, cum_weights=cumulative, k=degree))
+        targets.discard(user_id)
+        for target_id in targets:
+            draw = rng.random()
+            if draw < accepted:
+                status = FriendRequest.REQUEST_ACCEPTED
+            elif draw < accepted + rejected:
+                status = FriendRequest.REQUEST_REJECTED
+            else:
+                status = FriendRequest.REQUEST_PENDING
+            batch.append(FriendRequest(
+                created_by_id=user_id, modified_by_id=user_id,
+                to_user_id=target_id, status=status))
+        if len(batch) >= batch_size:
+            FriendRequest.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        FriendRequest.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+
+    with transaction.atomic():
+        call_command('backfill_friendships', batch_size=batch_size,
+                     stdout=StringIO())
+    call_command('reconcile_user_counts', stdout=StringIO())
+    return total
+
+
+def delete_bench_data():
+    from user_profile.search import get_search_backend
+
+    bench_users().delete()
+    get_search_backend().reset()
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(timings, elapsed=None, **extra):
+    """
+    Summarize latencies (in seconds) into a machine readable dict.
+    :param timings: Latency of every call.
+    :param elapsed: Wall clock time of the whole run, used for throughput.
+    """
+    values = sorted(timing * 1000 for timing in timings)
+    elapsed = elapsed if elapsed is not None else sum(timings)
+    summary = {
+        'calls': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p90_ms': round(percentile(values, 0.90), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+    }
+    summary.update(extra)
+    return summary
+
+
+class Stopwatch:
+    """
+    Context manager measuring wall clock time with perf_counter.
+    """
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries are only seen by the process which wrote them.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_error(setting, error_id):
+    """
+    Return the error of a cache alias setting pointing at a process-local
+    cache, or None.
+    :param setting: Name of the setting holding the cache alias.
+    :param error_id: Id of the check error.
+    """
+    alias = getattr(settings, setting, 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return None
+    return Error(
+        '%s uses the %r cache, which is local to each process.' % (setting, alias),
+        hint='Point %s at a cache shared by all processes, e.g. the redis '
+             'backend.' % setting,
+        id=error_id)
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Refuse to start when state every process must agree on is kept in a
+    process-local cache, where each worker would only see its own writes.
+    """
+    errors = []
+    if getattr(settings, 'RATE_LIMITS', None):
+        errors.append(shared_cache_error('RATE_LIMIT_CACHE', 'core.E001'))
+    errors.append(shared_cache_error('FRIENDS_CACHE_ALIAS', 'core.E002'))
+    if getattr(settings, 'JWT_AUTHENTICATION', None) == 'stateless':
+        errors.append(shared_cache_error('TOKEN_REVOCATION_CACHE', 'core.E003'))
+    if getattr(settings, 'DATABASE_REPLICAS', None):
+        errors.append(shared_cache_error('REPLICA_PIN_CACHE', 'core.E004'))
+    return [error for error in errors if error is not None]
@@ -0,0 +1,35 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core import metrics
+
+CONNECT_SECONDS = metrics.histogram(
+    'db_connect_seconds',
+    'Time spent opening a database connection, including its setup queries.',
+    labelnames=('alias',))
+HEALTH_CHECK_FAILURES = metrics.counter(
+    'db_health_check_failures_total',
+    'Persistent connections found unusable and closed before reuse.',
+    labelnames=('alias',))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend recording connection metrics, to tell how much of the
+    request latency goes into opening connections.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        CONNECT_SECONDS.observe(time.perf_counter() - started, alias=self.alias)
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            HEALTH_CHECK_FAILURES.inc(alias=self.alias)
+            self.close()
+        self.health_check_done = True
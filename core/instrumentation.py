@@ -0,0 +1,129 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core import metrics
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REQUESTS = metrics.counter(
+    'http_requests_total', 'HTTP requests served.',
+    labelnames=('view', 'method', 'status'))
+REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', 'Time spent serving HTTP requests.',
+    labelnames=('view', 'method'))
+REQUEST_QUERIES = metrics.histogram(
+    'http_request_db_queries', 'Database queries run per HTTP request.',
+    labelnames=('view', 'method'), buckets=QUERY_BUCKETS)
+REQUEST_DB_SECONDS = metrics.histogram(
+    'http_request_db_seconds', 'Time spent in the database per HTTP request.',
+    labelnames=('view', 'method'))
+REQUEST_SERIALIZE_SECONDS = metrics.histogram(
+    'http_request_serialize_seconds',
+    'Time spent serializing response data per HTTP request.',
+    labelnames=('view', 'method'))
+RESPONSE_BYTES = metrics.histogram(
+    'http_response_size_bytes', 'Size of the HTTP response bodies.',
+    labelnames=('view', 'method'), buckets=SIZE_BUCKETS)
+
+
+class RequestStats:
+    """
+    Statistics of the request being served.
+    Statements are kept up to `max_statements` so slow requests can be logged
+    with their SQL.
+    """
+
+    def __init__(self, max_statements=50):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases = {}
+        self.statements = []
+        self.max_statements = max_statements
+        self._open_phases = set()
+
+    def add_query(self, sql, elapsed, alias):
+        self.queries += 1
+        self.db_seconds += elapsed
+        if len(self.statements) < self.max_statements:
+            self.statements.append((alias, elapsed, sql))
+
+    def add_phase(self, name, elapsed):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+_stats = ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def request_stats(**kwargs):
+    """
+    Collect the statistics of the code run in this context.
+    :return: The RequestStats of the context.
+    """
+    stats = RequestStats(**kwargs)
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+def get_request_stats():
+    return _stats.get()
+
+
+@contextmanager
+def phase(name):
+    """
+    Add the time spent in this context to the named phase of the current
+    request. Nested phases of the same name are only counted once.
+    """
+    stats = _stats.get()
+    if stats is None or name in stats._open_phases:
+        yield
+        return
+    stats._open_phases.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._open_phases.discard(name)
+        stats.add_phase(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing every query run in a request.
+    """
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(
+            sql, time.perf_counter() - started, context['connection'].alias)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding the time spent in `to_representation` to the
+    `serialize` phase of the current request.
+    """
+
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,191 @@
+import json
+import logging
+import platform
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.benchmark import (
+    BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, Stopwatch, bench_users,
+    delete_bench_data, random_name, seed_friend_requests, seed_users, summarize)
+from friends.models import FriendRequest
+
+ENDPOINTS = ('register', 'login', 'search', 'send-request', 'respond-request',
+             'friend-list', 'pending-list')
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic social graph and measure latency percentiles, '
+            'throughput and query counts of every API endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10000,
+            help='Number of synthetic users in the graph.')
+        parser.add_argument(
+            '--avg-degree', type=float, default=10,
+            help='Average number of friend requests sent per user.')
+        parser.add_argument(
+            '--exponent', type=float, default=2.1,
+            help='Exponent of the power law friend degree distribution.')
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Number of calls per endpoint.')
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help='Comma separated endpoints to measure.')
+        parser.add_argument(
+            '--page-size', type=int, default=10,
+            help='Page size of the list endpoints.')
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Keep the response caches enabled (cold by default).')
+        parser.add_argument(
+            '--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument(
+            '--output', help='Write the JSON results to this file.')
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Delete the synthetic graph afterwards.')
+
+    def seed(self, rng, options):
+        with Stopwatch() as watch:
+            user_ids = seed_users(rng, options['users'], password=BENCH_PASSWORD)
+            if not FriendRequest.objects.filter(
+                    created_by__email__endswith='@' + BENCH_EMAIL_DOMAIN).exists():
+                seed_friend_requests(
+                    rng, user_ids, options['avg_degree'], options['exponent'])
+        self.stderr.write('Seeded %d users in %.1fs.' % (len(user_ids), watch.elapsed))
+        return user_ids
+
+    def client_for(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def call(self, method, path, user=None, **kwargs):
+        client = self.client_for(user)
+        with CaptureQueriesContext(connection) as queries, Stopwatch() as watch:
+            response = getattr(client, method)(path, format='json', **kwargs)
+        if response.status_code >= 500:
+            raise CommandError('%s %s failed with %d: %s' % (
+                method.upper(), path, response.status_code, response.content[:200]))
+        return watch.elapsed, len(queries)
+
+    def requests_for(self, endpoint, rng, users, options):
+        """
+        Yield (method, path, user, kwargs) of every call made to `endpoint`.
+        """
+        page = {'page_size': options['page_size']}
+        for number in range(options['iterations']):
+            user = rng.choice(users)
+            if endpoint == 'register':
+                password = 'Bench-%d-pass' % number
+                yield 'post', reverse('user-registration'), None, {'data': {
+                    'email': 'register%d-%s@%s' % (
+                        number, timezone.now().timestamp(), BENCH_EMAIL_DOMAIN),
+                    'password': password, 'password2': password,
+                    'first_name': random_name(rng)}}
+            elif endpoint == 'login':
+                yield 'post', reverse('user-login'), None, {'data': {
+                    'email': user.email, 'password': BENCH_PASSWORD}}
+            elif endpoint == 'search':
+                keyword = random_name(rng)[:rng.randint(2, 5)]
+                yield 'get', reverse('user-search'), user, {
+                    'data': dict(page, q=keyword)}
+            elif endpoint == 'send-request':
+                yield 'post', reverse('send-friend-request'), user, {
+                    'data': {'to_user': rng.choice(users).pk}}
+            elif endpoint == 'respond-request':
+                friend_request = FriendRequest.objects.filter(
+                    to_user=user, status=FriendRequest.REQUEST_PENDING
+                ).only('pk').first()
+                if friend_request is None:
+                    continue
+                yield 'put', reverse('respond-request', args=[friend_request.pk]), user, {
+                    'data': {'status': rng.choice(
+                        (FriendRequest.REQUEST_ACCEPTED, FriendRequest.REQUEST_REJECTED))}}
+            elif endpoint == 'friend-list':
+                yield 'get', reverse('list-friends'), user, {'data': page}
+            elif endpoint == 'pending-list':
+                yield 'get', reverse('list-pending-requests'), user, {'data': page}
+
+    def measure(self, endpoint, rng, users, options):
+        timings = []
+        query_counts = []
+        with Stopwatch() as watch:
+            for method, path, user, kwargs in self.requests_for(
+                    endpoint, rng, users, options):
+                elapsed, queries = self.call(method, path, user, **kwargs)
+                timings.append(elapsed)
+                query_counts.append(queries)
+        return summarize(
+            timings, watch.elapsed, endpoint=endpoint,
+            queries_mean=round(sum(query_counts) / len(query_counts), 2)
+            if query_counts else 0,
+            queries_max=max(query_counts, default=0))
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'].split(',')
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError('Unknown endpoints: %s' % ', '.join(sorted(unknown)))
+
+        rng = random.Random(options['seed'])
+        user_ids = self.seed(rng, options)
+        sample = rng.sample(user_ids, min(len(user_ids), 1000))
+        users = list(bench_users().filter(pk__in=sample))
+
+        overrides = {'RATE_LIMITS': {}}
+        if not options['cache']:
+            overrides['CACHES'] = dict(settings.CACHES, default={
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'})
+            overrides['FRIENDS_CACHE_ALIAS'] = 'default'
+
+        # Rejected calls (e.g. duplicate requests) are expected, do not log them.
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+
+        results = []
+        with override_settings(**overrides):
+            for endpoint in endpoints:
+                result = self.measure(endpoint, rng, users, options)
+                results.append(result)
+                self.stderr.write(
+                    '{endpoint:16} p50={p50_ms}ms p95={p95_ms}ms '
+                    'p99={p99_ms}ms rps={throughput_rps} '
+                    'queries={queries_mean}'.format(**result))
+        request_logger.setLevel(log_level)
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'users': len(user_ids),
+                'friend_requests': FriendRequest.objects.filter(
+                    created_by__email__endswith='@' + BENCH_EMAIL_DOMAIN).count(),
+                'avg_degree': options['avg_degree'],
+                'iterations': options['iterations'],
+                'page_size': options['page_size'],
+                'cache': options['cache'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['cleanup']:
+            delete_bench_data()
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import platform
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import (
+    BENCH_EMAIL_DOMAIN, Stopwatch, bench_users, random_name,
+    seed_friend_requests, seed_users, summarize)
+from friends.models import FriendRequest
+from user_profile.v1.views.user_registration import LoginView
+
+# Endpoint name: (sync url name, async url name).
+ENDPOINTS = {
+    'friend-list': ('list-friends', 'async-list-friends'),
+    'pending-list': ('list-pending-requests', 'async-list-pending-requests'),
+    'search': ('user-search', 'async-user-search'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the sync views on a thread pool with '
+            'the async views on the event loop at increasing concurrency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=2000,
+            help='Number of synthetic users in the graph.')
+        parser.add_argument(
+            '--avg-degree', type=float, default=10,
+            help='Average number of friend requests sent per user.')
+        parser.add_argument(
+            '--requests', type=int, default=300,
+            help='Number of calls per endpoint, mode and concurrency.')
+        parser.add_argument(
+            '--concurrency', default='1,10,50',
+            help='Comma separated numbers of concurrent clients.')
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help='Comma separated endpoints to measure.')
+        parser.add_argument(
+            '--page-size', type=int, default=10,
+            help='Page size of the list endpoints.')
+        parser.add_argument(
+            '--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument(
+            '--output', help='Write the JSON results to this file.')
+
+    def seed(self, rng, options):
+        user_ids = seed_users(rng, options['users'])
+        if not FriendRequest.objects.filter(
+                created_by__email__endswith='@' + BENCH_EMAIL_DOMAIN).exists():
+            seed_friend_requests(rng, user_ids, options['avg_degree'])
+        return user_ids
+
+    def requests_for(self, endpoint, rng, tokens, options):
+        """
+        Return the (sync path, async path, query, token) of every call, so
+        both stacks serve the same workload.
+        """
+        sync_name, async_name = ENDPOINTS[endpoint]
+        calls = []
+        for _ in range(options['requests']):
+            query = {'page_size': options['page_size']}
+            if endpoint == 'search':
+                query['q'] = random_name(rng)[:rng.randint(2, 5)]
+            calls.append((reverse(sync_name), reverse(async_name), query,
+                          'Bearer ' + rng.choice(tokens)))
+        return calls
+
+    @staticmethod
+    def check_response(path, response):
+        if response.status_code != 200:
+            raise CommandError('GET %s failed with %d: %s' % (
+                path, response.status_code, response.content[:200]))
+
+    def run_sync(self, calls, concurrency):
+        """
+        Serve the calls with the sync views, one thread per client as a
+        threaded WSGI server would.
+        """
+        def call(item):
+            path, _, query, token = item
+            with Stopwatch() as watch:
+                response = Client().get(path, query, HTTP_AUTHORIZATION=token)
+            self.check_response(path, response)
+            return watch.elapsed
+
+        with Stopwatch() as watch:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                timings = list(executor.map(call, calls))
+        return timings, watch.elapsed
+
+    def run_async(self, calls, concurrency):
+        """
+        Serve the calls with the async views, `concurrency` clients sharing
+        one event loop. Every request gets its own thread sensitive context,
+        as under Django's ASGI handler.
+        """
+        async def client(queue, timings):
+            http = AsyncClient()
+            while queue:
+                _, path, query, token = queue.pop()
+                async with ThreadSensitiveContext():
+                    with Stopwatch() as watch:
+                        response = await http.get(
+                            path, query, headers={'Authorization': token})
+                self.check_response(path, response)
+                timings.append(watch.elapsed)
+
+        async def main():
+            queue = list(reversed(calls))
+            timings = []
+            await asyncio.gather(*(
+                client(queue, timings) for _ in range(concurrency)))
+            return timings
+
+        with Stopwatch() as watch:
+            timings = asyncio.run(main())
+        return timings, watch.elapsed
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'].split(',')
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError('Unknown endpoints: %s' % ', '.join(sorted(unknown)))
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        rng = random.Random(options['seed'])
+        user_ids = self.seed(rng, options)
+        sample = rng.sample(user_ids, min(len(user_ids), 200))
+        tokens = [LoginView.get_tokens_for_user(user)['access']
+                  for user in bench_users().filter(pk__in=sample)]
+
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+
+        results = []
+        # Cold caches, so every call reaches the database.
+        with override_settings(CACHES=dict(settings.CACHES, default={
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}),
+                FRIENDS_CACHE_ALIAS='default'):
+            for endpoint in endpoints:
+                calls = self.requests_for(endpoint, rng, tokens, options)
+                for concurrency in levels:
+                    for mode, run in (('sync', self.run_sync),
+                                      ('async', self.run_async)):
+                        timings, elapsed = run(calls, concurrency)
+                        result = summarize(
+                            timings, elapsed, endpoint=endpoint, mode=mode,
+                            concurrency=concurrency)
+                        results.append(result)
+                        self.stderr.write(
+                            '{endpoint:14} {mode:5} c={concurrency:<4} '
+                            'p50={p50_ms}ms p99={p99_ms}ms '
+                            'rps={throughput_rps}'.format(**result))
+        request_logger.setLevel(log_level)
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'users': len(user_ids),
+                'requests': options['requests'],
+                'concurrency': levels,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.benchmark import Stopwatch, summarize
+
+
+class Command(BaseCommand):
+    help = ('Measure the cost of opening a database connection against '
+            'running a trivial query on a persistent one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Number of connections opened and queries run.')
+        parser.add_argument(
+            '--database', default='default', help='Database alias to use.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        iterations = options['iterations']
+
+        connect_timings = []
+        for _ in range(iterations):
+            connection.close()
+            with Stopwatch() as watch:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            connect_timings.append(watch.elapsed)
+
+        reuse_timings = []
+        for _ in range(iterations):
+            with Stopwatch() as watch:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            reuse_timings.append(watch.elapsed)
+        connection.close()
+
+        results = [
+            summarize(connect_timings, mode='new-connection'),
+            summarize(reuse_timings, mode='persistent-connection'),
+        ]
+        for result in results:
+            self.stderr.write(
+                '{mode:22} p50={p50_ms}ms p95={p95_ms}ms p99={p99_ms}ms'.format(**result))
+        self.stdout.write(json.dumps({
+            'database': connection.vendor,
+            'alias': options['database'],
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,145 @@
+import json
+import platform
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.benchmark import (
+    BENCH_EMAIL_DOMAIN, Stopwatch, bench_users, seed_friend_requests,
+    seed_users, summarize)
+from core.renderers import FastJSONRenderer
+from friends.models import FriendRequest
+from friends.v1.serializers.friend_request_serializer import (
+    FriendRequestRowFormatter, FriendRequestSerializer)
+from user_profile.v1.serializers.user_registration_serializer import (
+    UserSearchRowFormatter, UserSearchSerializer)
+
+# Modes: (fetch `values()` rows, renderer class).
+MODES = {
+    'serializer': (False, JSONRenderer),
+    'formatter': (True, JSONRenderer),
+    'formatter+orjson': (True, FastJSONRenderer),
+}
+
+
+def friend_requests():
+    return FriendRequest.objects.filter(
+        created_by__email__endswith='@' + BENCH_EMAIL_DOMAIN
+    ).select_related('to_user', 'created_by').only(
+        'id', 'status', 'created_on', 'modified_on',
+        'to_user__email', 'created_by__email').order_by('id')
+
+
+# Payload name: (queryset factory, serializer class, row formatter class).
+PAYLOADS = {
+    'users': (lambda: bench_users().order_by('id'),
+              UserSearchSerializer, UserSearchRowFormatter),
+    'friend-requests': (friend_requests,
+                        FriendRequestSerializer, FriendRequestRowFormatter),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare serializing list pages with the DRF serializers and '
+            'JSONRenderer against the values() row formatters and the '
+            'orjson renderer, checking that the output is identical.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', default='100,1000',
+            help='Comma separated page sizes to measure.')
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Number of pages serialized per payload, size and mode.')
+        parser.add_argument(
+            '--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument(
+            '--output', help='Write the JSON results to this file.')
+
+    def seed(self, rng, rows):
+        user_ids = seed_users(rng, max(rows, 200))
+        if friend_requests().count() < rows:
+            seed_friend_requests(rng, user_ids, max(10, 2 * rows / len(user_ids)))
+
+    def serialize(self, mode, payload, rows):
+        """
+        Fetch and render one page.
+        :return: Tuple of (rendered bytes, fetch, format and render seconds).
+        """
+        use_values, renderer_class = MODES[mode]
+        get_queryset, serializer_class, formatter_class = PAYLOADS[payload]
+        queryset = get_queryset()
+        with Stopwatch() as fetch:
+            if use_values:
+                page = list(queryset.values(*formatter_class.fields)[:rows])
+            else:
+                page = list(queryset[:rows])
+        with Stopwatch() as format_:
+            if use_values:
+                data = formatter_class().format(page)
+            else:
+                data = serializer_class(page, many=True).data
+        with Stopwatch() as render:
+            content = renderer_class().render(data)
+        return content, fetch.elapsed, format_.elapsed, render.elapsed
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['rows'].split(',')]
+        rng = random.Random(options['seed'])
+        self.seed(rng, max(sizes))
+        if renderers.orjson is None:
+            self.stderr.write('orjson is not installed, FastJSONRenderer '
+                              'falls back to the stdlib encoder.')
+
+        results = []
+        for payload in PAYLOADS:
+            for rows in sizes:
+                expected = None
+                for mode in MODES:
+                    timings = {'fetch': [], 'format': [], 'render': [], 'total': []}
+                    for _ in range(options['repeat']):
+                        content, fetch, format_, render = self.serialize(
+                            mode, payload, rows)
+                        if expected is None:
+                            expected = content
+                        elif content != expected:
+                            raise CommandError(
+                                '%s output of %d %s differs from the serializer.'
+                                % (mode, rows, payload))
+                        timings['fetch'].append(fetch)
+                        timings['format'].append(format_)
+                        timings['render'].append(render)
+                        timings['total'].append(fetch + format_ + render)
+                    result = {
+                        'payload': payload, 'rows': rows, 'mode': mode,
+                        'bytes': len(content),
+                    }
+                    for stage, stage_timings in timings.items():
+                        result[stage] = summarize(stage_timings)
+                    results.append(result)
+                    self.stderr.write(
+                        '{payload:16} rows={rows:<5} {mode:17} '
+                        'fetch={fetch}ms format={format}ms render={render}ms '
+                        'total={total}ms'.format(**dict(result, **{
+                            stage: result[stage]['p50_ms'] for stage in timings})))
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'orjson': renderers.orjson is not None,
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.routers import get_pin_cache, get_pin_key, get_replicas
+from friends.models import FriendRequest
+from user_profile.models import UserProfile
+from user_profile.v1.views.user_registration import LoginView
+
+EMAIL_DOMAIN = 'routingcheck.invalid'
+
+
+class Command(BaseCommand):
+    help = ('Call the API as two users and fail unless their reads go to the '
+            'replicas, except right after their own writes. Locally, copy '
+            'the migrated primary SQLite file to stand in for the replica.')
+
+    def _call(self, method, name, user, args=(), data=None):
+        """
+        Call an endpoint as `user` and return the aliases which ran queries.
+        """
+        token = LoginView.get_tokens_for_user(user)['access']
+        path = reverse(name, args=args)
+        if method == 'get':
+            # A distinct URL misses the cached list responses.
+            self.calls += 1
+            data = dict(data or {}, call=self.calls)
+        aliases = [DEFAULT_DB_ALIAS, *get_replicas()]
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in aliases]
+        for context in contexts:
+            context.__enter__()
+        try:
+            response = getattr(Client(), method)(
+                path, data, content_type='application/json',
+                HTTP_AUTHORIZATION='Bearer ' + token)
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+        if response.status_code >= 500:
+            raise CommandError('%s returned %d: %s' % (
+                name, response.status_code, response.content[:200]))
+        return {alias for alias, context in zip(aliases, contexts)
+                if len(context)}
+
+    def handle(self, *args, **options):
+        replicas = set(get_replicas())
+        if not replicas:
+            raise CommandError(
+                'No replica configured, set DATABASE_REPLICA_URLS.')
+
+        self.calls = 0
+        sender = UserProfile.objects.create_user('sender@%s' % EMAIL_DOMAIN)
+        receiver = UserProfile.objects.create_user('receiver@%s' % EMAIL_DOMAIN)
+        try:
+            checks = [
+                ('sender lists friends', 'replica',
+                 self._call('get', 'list-friends', sender)),
+                ('sender sends a request', 'primary',
+                 self._call('post', 'send-friend-request', sender,
+                            data={'to_user': receiver.pk})),
+                ('sender lists friends right after writing', 'primary',
+                 self._call('get', 'list-friends', sender)),
+                ('receiver searches users', 'replica',
+                 self._call('get', 'user-search', receiver, data={'q': 'routing'})),
+            ]
+            get_pin_cache().delete(get_pin_key(sender.pk))
+            checks.append(('sender lists friends once unpinned', 'replica',
+                           self._call('get', 'list-friends', sender)))
+        finally:
+            FriendRequest.objects.filter(created_by=sender).delete()
+            UserProfile.objects.filter(pk__in=[sender.pk, receiver.pk]).delete()
+
+        failures = []
+        for label, expected, aliases in checks:
+            if expected == 'primary':
+                ok = aliases == {DEFAULT_DB_ALIAS}
+            else:
+                ok = bool(aliases) and aliases <= replicas
+            self.stdout.write('%s: %s (%s)' % (
+                label, 'OK' if ok else 'FAIL', ', '.join(sorted(aliases))))
+            if not ok:
+                failures.append(label)
+        if failures:
+            raise CommandError('Misrouted: %s' % ', '.join(failures))
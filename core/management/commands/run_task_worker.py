@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run a worker processing the database backed task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of tasks claimed at a time.')
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=60,
+            help='Seconds after which an unfinished claimed task is retried.')
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='Number of attempts before a task is marked as failed.')
+        parser.add_argument(
+            '--sleep', type=float, default=0.5,
+            help='Seconds to wait between polls when the queue is empty.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is drained.')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        total = 0
+        while True:
+            claimed = run_pending(
+                options['batch_size'], options['visibility_timeout'],
+                options['max_attempts'])
+            total += claimed
+            if claimed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('Processed %d tasks.' % total))
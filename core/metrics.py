@@ -0,0 +1,159 @@
+import threading
+from bisect import bisect_left
+
+# Latency buckets in seconds, from half a millisecond to ten seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """
+    Base class of the in-process metrics.
+    Values are kept per set of label values and are local to the process, so
+    every worker process reports its own series.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get_key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('%s expects labels %s, got %s' % (
+                self.name, self.labelnames, tuple(labels)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count, e.g. of opened connections.
+    """
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self.get_key(labels), 0)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets, e.g. latencies.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per bucket counts (the last one is +Inf), sum and count.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get(self, **labels):
+        """
+        Return the cumulative bucket counts, sum and count of a series.
+        """
+        state = self._values.get(self.get_key(labels))
+        if state is None:
+            return {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+        counts, total, count = state
+        cumulative, running = [], 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric_class, name, documentation, **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = metric_class(name, documentation, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError('Metric %s is already registered as a %s.' % (
+                name, metric.type))
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """
+    Return the counter registered under `name`, creating it if needed.
+    """
+    return _register(Counter, name, documentation, labelnames=labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """
+    Return the histogram registered under `name`, creating it if needed.
+    """
+    return _register(Histogram, name, documentation,
+                     labelnames=labelnames, buckets=buckets)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_text():
+    """
+    Render every registered metric in the Prometheus text exposition format.
+    :return: The exposition as a string.
+    """
+    lines = []
+    for name in sorted(REGISTRY):
+        metric = REGISTRY[name]
+        lines.append('# HELP %s %s' % (name, metric.documentation))
+        lines.append('# TYPE %s %s' % (name, metric.type))
+        with metric._lock:
+            series = sorted(metric._values.items())
+        for key, value in series:
+            if metric.type == 'counter':
+                lines.append('%s%s %s' % (
+                    name, _format_labels(metric.labelnames, key),
+                    _format_value(value)))
+                continue
+            state = metric.get(**dict(zip(metric.labelnames, key)))
+            bounds = [repr(float(bound)) for bound in metric.buckets] + ['+Inf']
+            for bound, count in zip(bounds, state['buckets']):
+                lines.append('%s_bucket%s %d' % (
+                    name, _format_labels(metric.labelnames, key, [('le', bound)]),
+                    count))
+            labels = _format_labels(metric.labelnames, key)
+            lines.append('%s_sum%s %s' % (name, labels, repr(float(state['sum']))))
+            lines.append('%s_count%s %d' % (name, labels, state['count']))
+    return '\n'.join(lines) + '\n'
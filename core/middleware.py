@@ -0,0 +1,165 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from core.instrumentation import (
+    REQUEST_DB_SECONDS, REQUEST_QUERIES, REQUEST_SECONDS,
+    REQUEST_SERIALIZE_SECONDS, REQUESTS, RESPONSE_BYTES, request_stats)
+from core.routers import (
+    ais_pinned, apin_user, get_replicas, is_pinned, pin_user, routing_context)
+
+logger = logging.getLogger('core.requests')
+
+METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def get_token_user_id(request):
+    """
+    Read the user id claim of the request's access token without verifying
+    it. Only used to route queries; the views still authenticate the token.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return UntypedToken(raw_token, verify=False).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Run safe requests in a routing context so their reads go to the
+    replicas, unless the user wrote within the last `REPLICA_PIN_SECONDS`.
+    Requests which write pin their user to the primary for that window.
+    Does nothing when no replica is configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def get_writer_id(request, token_user_id):
+        """
+        Return the id of the user to pin after a write. Requests without a
+        token may have been authenticated by DRF, which sets `request.user`.
+        """
+        if token_user_id is not None:
+            return token_user_id
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+
+        user_id = get_token_user_id(request)
+        use_primary = request.method not in SAFE_METHODS or (
+            user_id is not None and is_pinned(user_id))
+        with routing_context(use_primary) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            writer_id = self.get_writer_id(request, user_id)
+            if writer_id is not None:
+                pin_user(writer_id)
+        return response
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+
+        user_id = get_token_user_id(request)
+        use_primary = request.method not in SAFE_METHODS or (
+            user_id is not None and await ais_pinned(user_id))
+        with routing_context(use_primary) as state:
+            response = await self.get_response(request)
+        # The async views only authenticate with tokens.
+        if state.wrote and user_id is not None:
+            await apin_user(user_id)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the duration, query count, database time, serialization time and
+    response size of every request per view. They are exported by the metrics
+    endpoint, sent back in a `Server-Timing` header, and requests slower than
+    `SLOW_REQUEST_MS` are logged with their SQL.
+    Should be the first middleware so the whole request is measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_stats(max_statements=settings.SLOW_REQUEST_MAX_STATEMENTS) as stats:
+            response = self.get_response(request)
+        self.record(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        with request_stats(max_statements=settings.SLOW_REQUEST_MAX_STATEMENTS) as stats:
+            response = await self.get_response(request)
+        self.record(request, response, stats)
+        return response
+
+    @staticmethod
+    def get_view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name
+
+    def record(self, request, response, stats):
+        elapsed = stats.elapsed
+        serialize_seconds = stats.phases.get('serialize', 0.0)
+        labels = {
+            'view': self.get_view_name(request),
+            'method': request.method if request.method in METHODS else 'other',
+        }
+        REQUESTS.inc(status=response.status_code, **labels)
+        REQUEST_SECONDS.observe(elapsed, **labels)
+        REQUEST_QUERIES.observe(stats.queries, **labels)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, **labels)
+        REQUEST_SERIALIZE_SECONDS.observe(serialize_seconds, **labels)
+        if not response.streaming:
+            RESPONSE_BYTES.observe(len(response.content), **labels)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = (
+                'db;dur=%.2f;desc="%d queries", serialize;dur=%.2f, '
+                'total;dur=%.2f' % (
+                    stats.db_seconds * 1000, stats.queries,
+                    serialize_seconds * 1000, elapsed * 1000))
+
+        if elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning(
+                'Slow request %s %s (%s): %.1fms, %d queries, %.1fms in the '
+                'database\n%s', request.method, request.path, labels['view'],
+                elapsed * 1000, stats.queries, stats.db_seconds * 1000,
+                '\n'.join('  [%s] %.1fms %s' % (alias, seconds * 1000, sql)
+                          for alias, seconds, sql in stats.statements))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-17 19:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_on', models.DateTimeField(auto_now_add=True, help_text='Date and time when the entry was created')),
+                ('modified_on', models.DateTimeField(auto_now=True, help_text='Date and time when the entry was updated')),
+                ('name', models.CharField(help_text='Registered name of the task.', max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_on', models.DateTimeField(default=django.utils.timezone.now, help_text='The task is not picked up before this time; for running tasks this is when their visibility timeout expires.')),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ('queued', 'running'))), fields=['available_on', 'id'], name='core_task_available_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 class AbstractDateBase(models.Model):
@@ -26,3 +27,39 @@ class AbstractUserBase(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(AbstractDateBase):
+    """
+    Model to store the jobs of the database backed task queue.
+    See core/tasks.py for enqueueing and the `run_task_worker` command for
+    processing them.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+    STATUSES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    name = models.CharField(max_length=100, help_text='Registered name of the task.')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    available_on = models.DateTimeField(
+        default=timezone.now,
+        help_text='The task is not picked up before this time; for running '
+                  'tasks this is when their visibility timeout expires.')
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_on', 'id'],
+                condition=models.Q(status__in=('queued', 'running')),
+                name='core_task_available_idx'),
+        ]
+
+    def __str__(self):
+        return '%s #%s' % (self.name, self.pk)
@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+PERIOD_NAMES = {'s': 'second', 'm': 'minute', 'h': 'hour', 'd': 'day'}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as '3/m' or '100/hour'.
+    :param rate: The rate string.
+    :return: Tuple of (number of requests, period in seconds, period name).
+    """
+    num, period = rate.split('/')
+    unit = period[0]
+    return int(num), PERIODS[unit], PERIOD_NAMES[unit]
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window rate limiter backed by the Django cache.
+    Keeps one counter per fixed window and weights the previous window by
+    how much of it still overlaps the sliding window, so only two cache keys
+    are touched per hit. Counters are updated with `incr`, which is atomic on
+    the locmem, memcached and redis backends.
+    """
+
+    def __init__(self, scope, rate, cache_alias='default'):
+        self.scope = scope
+        self.rate = rate
+        self.num_requests, self.period, self.period_name = parse_rate(rate)
+        self.cache = caches[cache_alias]
+
+    def get_cache_key(self, ident, window):
+        return 'ratelimit:%s:%s:%d' % (self.scope, ident, window)
+
+    def _incr(self, key, delta):
+        self.cache.add(key, 0, timeout=self.period * 2)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # The key expired between add() and incr().
+            self.cache.set(key, delta, timeout=self.period * 2)
+            return delta
+
+    def hit(self, ident, cost=1):
+        """
+        Record a request for `ident` if it is within the limit.
+        :param ident: Identifier of the caller, e.g. the user id.
+        :param cost: Number of requests this hit accounts for.
+        :return: True if the request is allowed, False otherwise.
+        """
+        now = time.time()
+        window, offset = divmod(now, self.period)
+        window = int(window)
+        key = self.get_cache_key(ident, window)
+
+        current = self._incr(key, cost)
+        previous = self.cache.get(self.get_cache_key(ident, window - 1), 0)
+        weighted = previous * (1 - offset / self.period) + current
+        if weighted > self.num_requests:
+            # Rejected requests do not count towards the limit.
+            self.cache.decr(key, cost)
+            return False
+        return True
+
+    def refund(self, ident, cost=1):
+        """
+        Give back a hit whose request failed, e.g. a duplicate.
+        :param ident: Identifier of the caller.
+        :param cost: Number of requests to give back.
+        """
+        key = self.get_cache_key(ident, int(time.time() // self.period))
+        try:
+            remaining = self.cache.decr(key, cost)
+        except ValueError:
+            # The hit was counted in a window which already expired.
+            return
+        if remaining < 0:
+            # The window turned after the hit, which counted in the previous one.
+            self.cache.incr(key, -remaining)
+
+
+def get_rate_limiter(scope):
+    """
+    Return a rate limiter for `scope` as configured in `RATE_LIMITS`.
+    :param scope: Name of the limited endpoint.
+    :return: SlidingWindowRateLimiter or None if the scope is not limited.
+    """
+    rate = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if not rate:
+        return None
+    return SlidingWindowRateLimiter(
+        scope, rate, getattr(settings, 'RATE_LIMIT_CACHE', 'default'))
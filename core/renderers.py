@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    # Dates and dataclasses go through the DRF encoder, which formats them
+    # differently from orjson.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` encoding with orjson when it is installed.
+    The output is byte for byte the one of `JSONRenderer` with the default
+    compact, unicode, strict settings; anything else, and data orjson cannot
+    encode (e.g. integers beyond 64 bits), falls back to the stdlib encoder.
+    The only remaining differences are in floats: exponents are written
+    without padding (1e16 rather than 1e+16) and non-finite values become
+    null instead of raising. The API renders neither.
+    """
+
+    def can_use_orjson(self, accepted_media_type, renderer_context):
+        return (orjson is not None and self.compact and not self.ensure_ascii
+                and self.strict
+                and self.get_indent(accepted_media_type, renderer_context) is None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.can_use_orjson(accepted_media_type, renderer_context):
+            try:
+                ret = orjson.dumps(
+                    data, default=self.encoder_class().default,
+                    option=ORJSON_OPTIONS)
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                # Escaped by JSONRenderer for JavaScript compatibility.
+                return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                    b'\xe2\x80\xa9', b'\\u2029')
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,132 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+class RoutingState:
+    """
+    Routing decisions of the current request.
+    `use_primary` sends every read to the primary; it is set for unsafe
+    requests, for users who wrote recently and after the first write.
+    """
+
+    def __init__(self, use_primary=False):
+        self.use_primary = use_primary
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def routing_context(use_primary=False):
+    """
+    Let the router send the reads made in this context to the replicas.
+    Reads made outside of a routing context always go to the primary, so
+    workers and management commands never act on stale data.
+    :param use_primary: Whether to read from the primary from the start.
+    :return: The RoutingState of the context.
+    """
+    state = RoutingState(use_primary)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def get_pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def get_pin_key(user_id):
+    return 'replica-pin:%s' % user_id
+
+
+def pin_user(user_id):
+    """
+    Send the reads of a user to the primary for `REPLICA_PIN_SECONDS`, which
+    should exceed the replication lag, so the user reads their own writes.
+    :param user_id: Id of the user who wrote.
+    """
+    get_pin_cache().set(
+        get_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def pin_users_on_commit(user_ids, using=None):
+    """
+    Pin users whose data another user's write changed, e.g. both sides of an
+    accepted friend request, once the current transaction commits.
+    Nothing is pinned without replicas.
+    :param user_ids: Ids of the users.
+    """
+    if not get_replicas() or not user_ids:
+        return
+    timeout = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    keys = {get_pin_key(user_id): True for user_id in user_ids}
+    transaction.on_commit(
+        lambda: get_pin_cache().set_many(keys, timeout), using=using)
+
+
+async def apin_user(user_id):
+    """
+    Async version of `pin_user`.
+    """
+    await get_pin_cache().aset(
+        get_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    return bool(get_pin_cache().get(get_pin_key(user_id)))
+
+
+async def ais_pinned(user_id):
+    return bool(await get_pin_cache().aget(get_pin_key(user_id)))
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending writes to `default` and the reads of requests
+    running in a routing context to a random alias of `DATABASE_REPLICAS`.
+    Reads stay on the primary inside transactions and once the request wrote,
+    and instances keep reading related objects from the database they were
+    loaded from.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = get_replicas()
+        if state is None or state.use_primary or not replicas:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.use_primary = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
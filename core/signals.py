@@ -0,0 +1,13 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.instrumentation import install_query_recorder
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """
+    Signal to time the queries of every connection for the request metrics.
+    The wrapper outlives reconnections of the same connection object.
+    """
+    install_query_recorder(connection)
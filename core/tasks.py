@@ -0,0 +1,143 @@
+"""
+Lightweight database backed task queue.
+
+Tasks are registered with the `task` decorator in a `tasks` module of an
+installed app and enqueued with `enqueue`. Task rows are written in the
+caller's transaction, so they are only visible to workers if that transaction
+commits. Workers (`manage.py run_task_worker`) claim batches of tasks, run
+batch handlers once per claimed batch and retry failures with exponential
+backoff. A claimed task that is not finished within the visibility timeout
+is picked up again.
+"""
+import logging
+import traceback
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class RegisteredTask:
+
+    def __init__(self, name, func, batch):
+        self.name = name
+        self.func = func
+        self.batch = batch
+
+    def run(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(name, batch=False):
+    """
+    Register a task handler.
+    :param name: Unique name the task is enqueued with.
+    :param batch: When True the handler is called once with the list of
+    payloads of every claimed task of this name, instead of once per task
+    with the payload as keyword arguments.
+    """
+    def decorator(func):
+        _registry[name] = RegisteredTask(name, func, batch)
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(name, payload=None, delay=None):
+    """
+    Enqueue a task.
+    With `TASK_QUEUE_EAGER` the task runs immediately instead, which is
+    meant for tests and local development.
+    :param name: Registered name of the task.
+    :param payload: JSON serializable dict passed to the handler.
+    :param delay: Optional timedelta before the task may run.
+    """
+    payload = payload or {}
+    if getattr(settings, 'TASK_QUEUE_EAGER', False):
+        get_task(name).run([payload])
+        return None
+    available_on = timezone.now() + (delay or timedelta())
+    return Task.objects.create(name=name, payload=payload, available_on=available_on)
+
+
+def claim_tasks(batch_size, visibility_timeout):
+    """
+    Claim up to `batch_size` available tasks, including running tasks whose
+    visibility timeout expired.
+    :return: List of claimed Task instances.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                status__in=(Task.STATUS_QUEUED, Task.STATUS_RUNNING),
+                available_on__lte=now,
+            ).order_by('available_on', 'id')[:batch_size])
+        if tasks:
+            Task.objects.filter(id__in=[task.id for task in tasks]).update(
+                status=Task.STATUS_RUNNING, attempts=F('attempts') + 1,
+                available_on=now + timedelta(seconds=visibility_timeout))
+    return tasks
+
+
+def _fail(tasks, error, max_attempts):
+    now = timezone.now()
+    for claimed in tasks:
+        attempts = claimed.attempts + 1
+        if attempts >= max_attempts:
+            changes = {'status': Task.STATUS_FAILED}
+        else:
+            changes = {'status': Task.STATUS_QUEUED,
+                       'available_on': now + timedelta(seconds=2 ** attempts)}
+        Task.objects.filter(id=claimed.id).update(last_error=error, **changes)
+
+
+def run_tasks(tasks, max_attempts=5):
+    """
+    Run claimed tasks, grouped by name so batch handlers see the whole batch.
+    Finished tasks are deleted; failed tasks are retried with exponential
+    backoff until `max_attempts` is reached.
+    :return: Number of tasks that succeeded.
+    """
+    groups = OrderedDict()
+    for claimed in tasks:
+        groups.setdefault(claimed.name, []).append(claimed)
+
+    succeeded = 0
+    for name, group in groups.items():
+        try:
+            with transaction.atomic():
+                get_task(name).run([claimed.payload for claimed in group])
+                Task.objects.filter(id__in=[claimed.id for claimed in group]).delete()
+            succeeded += len(group)
+        except Exception:
+            logger.exception('Task %s failed for %d payloads.', name, len(group))
+            _fail(group, traceback.format_exc(), max_attempts)
+    return succeeded
+
+
+def run_pending(batch_size=100, visibility_timeout=60, max_attempts=5):
+    """
+    Claim and run one batch of tasks.
+    :return: Number of claimed tasks.
+    """
+    tasks = claim_tasks(batch_size, visibility_timeout)
+    if tasks:
+        run_tasks(tasks, max_attempts)
+    return len(tasks)
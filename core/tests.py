@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from core.checks import check_shared_caches
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def error_ids(self):
+        return [error.id for error in check_shared_caches(None)]
+
+    def test_shared_caches_pass(self):
+        self.assertEqual(self.error_ids(), [])
+
+    @override_settings(RATE_LIMIT_CACHE='default')
+    def test_process_local_rate_limit_cache_is_refused(self):
+        self.assertEqual(self.error_ids(), ['core.E001'])
+
+    @override_settings(RATE_LIMIT_CACHE='default', RATE_LIMITS={})
+    def test_rate_limit_cache_is_unused_without_limits(self):
+        self.assertEqual(self.error_ids(), [])
+
+    @override_settings(FRIENDS_CACHE_ALIAS='default')
+    def test_process_local_friends_cache_is_refused(self):
+        self.assertEqual(self.error_ids(), ['core.E002'])
+
+    @override_settings(JWT_AUTHENTICATION='stateless', TOKEN_REVOCATION_CACHE='default')
+    def test_stateless_tokens_need_a_shared_revocation_cache(self):
+        self.assertEqual(self.error_ids(), ['core.E003'])
+
+    @override_settings(JWT_AUTHENTICATION='database', TOKEN_REVOCATION_CACHE='default')
+    def test_revocation_cache_is_unused_with_database_tokens(self):
+        self.assertEqual(self.error_ids(), [])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_CACHE='default')
+    def test_replicas_need_a_shared_pin_cache(self):
+        self.assertEqual(self.error_ids(), ['core.E004'])
+
+    @override_settings(DATABASE_REPLICAS=[], REPLICA_PIN_CACHE='default')
+    def test_pin_cache_is_unused_without_replicas(self):
+        self.assertEqual(self.error_ids(), [])
+
+
+class ServerTimingHeaderTests(TestCase):
+
+    def test_header_follows_the_setting(self):
+        for enabled in (True, False):
+            with self.subTest(enabled=enabled), \
+                    override_settings(SERVER_TIMING_HEADER=enabled):
+                response = self.client.get(reverse('user-search'))
+                self.assertEqual('Server-Timing' in response, enabled)
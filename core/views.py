@@ -1,3 +1,169 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
 
-# Create your views here.
+from core.instrumentation import phase
+from core.metrics import render_text
+from core.renderers import FastJSONRenderer
+
+
+class MetricsView(View):
+    """
+    Serve the metrics of this process in the Prometheus text format.
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`; without
+    a token the endpoint only exists in DEBUG.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        if not token:
+            if not settings.DEBUG:
+                raise Http404
+        elif not constant_time_compare(
+                request.headers.get('Authorization', ''), 'Bearer ' + token):
+            return HttpResponse(status=401)
+        return HttpResponse(
+            render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RowFormatterMixin:
+    """
+    Mixin serializing list pages from `values()` rows with a hand written
+    formatter instead of `serializer_class`, producing the same data.
+    Views set `row_formatter_class` to a class with the `fields` to select
+    and a `format(rows)` method. The `keyset_ordering` fields are selected
+    too, for the pagination cursor. `FAST_LIST_SERIALIZATION = False` goes
+    back to the serializer.
+    """
+    row_formatter_class = None
+
+    def use_row_formatter(self):
+        return (self.row_formatter_class is not None
+                and settings.FAST_LIST_SERIALIZATION)
+
+    def get_row_fields(self):
+        fields = list(self.row_formatter_class.fields)
+        for field in getattr(self, 'keyset_ordering', ()):
+            field = field.lstrip('-')
+            if field not in fields:
+                fields.append(field)
+        return fields
+
+    def get_row_queryset(self, queryset):
+        """
+        Project the queryset on the formatter fields, if it is used.
+        """
+        if not self.use_row_formatter():
+            return queryset
+        return queryset.values(*self.get_row_fields())
+
+    def format_rows(self, rows):
+        """
+        Format a page of rows from `get_row_queryset`.
+        :return: List of dicts, as `serializer_class(rows, many=True).data`.
+        """
+        if not self.use_row_formatter():
+            return self.serializer_class(rows, many=True).data
+        with phase('serialize'):
+            return self.row_formatter_class().format(rows)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_row_formatter():
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_row_queryset(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.format_rows(page))
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the views running natively on the event loop under ASGI.
+    DRF 3.14 views are synchronous, so this covers the part of `APIView`
+    the async views need: requests are wrapped in DRF's `Request` for
+    `query_params` and JSON `data`, authenticated with the class selected by
+    `JWT_AUTHENTICATION` and answered with the same JSON renderer as the
+    sync views.
+    Handlers are `async def` methods named after the HTTP method and must only
+    use the async ORM, or `sync_to_async` for transactions.
+    """
+    authentication_class = None
+    renderer_class = FastJSONRenderer
+    parser_classes = [JSONParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like the DRF views, which are CSRF exempt too.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get_authenticator(self):
+        """
+        Return an instance of `authentication_class`, by default the class the
+        sync views use.
+        """
+        authentication_class = self.authentication_class or import_string(
+            settings.JWT_AUTHENTICATION_CLASSES[settings.JWT_AUTHENTICATION])
+        return authentication_class()
+
+    def render(self, data=None, status=status.HTTP_200_OK, headers=None):
+        """
+        Render `data` as a JSON response.
+        :param data: The response data, None for an empty body.
+        :param status: The response status code.
+        :param headers: Extra response headers.
+        :return: HttpResponse object.
+        """
+        content = b'' if data is None else self.renderer_class().render(data)
+        response = HttpResponse(
+            content, status=status, content_type='application/json')
+        for header, value in (headers or {}).items():
+            response[header] = value
+        return response
+
+    def render_exception(self, exc):
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        headers = None
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            headers = {'WWW-Authenticate': self.get_authenticator(
+            ).authenticate_header(self.request)}
+            exc.status_code = status.HTTP_401_UNAUTHORIZED
+        return self.render(detail, status=exc.status_code, headers=headers)
+
+    async def authenticate(self, request):
+        """
+        Authenticate the request, setting `request.user` and `request.auth`.
+        Classes without `aauthenticate`, which load the user from the
+        database, run in a thread.
+        :raises NotAuthenticated: If the request carries no token.
+        """
+        authenticator = self.get_authenticator()
+        if hasattr(authenticator, 'aauthenticate'):
+            result = await authenticator.aauthenticate(request)
+        else:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request, parsers=[parser() for parser in self.parser_classes])
+        self.request = request
+        handler = None
+        if request.method.lower() in self.http_method_names:
+            handler = getattr(self, request.method.lower(), None)
+        try:
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            await self.authenticate(request)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.render_exception(exc)
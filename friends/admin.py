@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import FriendRequest
+from .models import FriendRequest, Friendship
 
 
 class FriendRequestAdmin(admin.ModelAdmin):
@@ -15,3 +15,11 @@ class FriendRequestAdmin(admin.ModelAdmin):
 
 
 admin.site.register(FriendRequest, FriendRequestAdmin)
+
+
+class FriendshipAdmin(admin.ModelAdmin):
+    list_display = ('user', 'friend', 'created_on')
+    raw_id_fields = ('user', 'friend')
+
+
+admin.site.register(Friendship, FriendshipAdmin)
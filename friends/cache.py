@@ -0,0 +1,96 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from friends.models import FriendRequest
+
+FRIEND_LIST = 'friend-list'
+PENDING_INBOX = 'pending-inbox'
+
+
+def get_cache():
+    return caches[getattr(settings, 'FRIENDS_CACHE_ALIAS', 'default')]
+
+
+def get_cache_timeout():
+    return getattr(settings, 'FRIENDS_CACHE_TIMEOUT', 300)
+
+
+def _version_key(scope, user_id):
+    return 'friends:version:%s:%s' % (scope, user_id)
+
+
+def get_version(scope, user_id):
+    """
+    Return the current version of a user's cached `scope` responses.
+    A missing version (first use, eviction or invalidation) gets a new random
+    value, so stale entries can never be served again.
+    """
+    cache = get_cache()
+    key = _version_key(scope, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(scope, user_ids):
+    """
+    Invalidate the cached `scope` responses of the given users.
+    """
+    get_cache().delete_many([_version_key(scope, user_id) for user_id in user_ids])
+
+
+def invalidate_all(affected):
+    """
+    Invalidate the cached responses of {scope: user ids}.
+    """
+    for scope, user_ids in affected.items():
+        if user_ids:
+            invalidate(scope, user_ids)
+
+
+def invalidate_on_commit(affected, using=None):
+    """
+    Invalidate the cached responses of {scope: user ids} once the current
+    transaction commits, right away outside of transactions.
+    Invalidating earlier would let a concurrent request cache the rows of
+    before the commit under the new version.
+    """
+    transaction.on_commit(lambda: invalidate_all(affected), using=using)
+
+
+def get_etag(scope, user_id, url):
+    """
+    Build the ETag of a cached response from the user's version and the URL,
+    which carries the page size and cursor.
+    """
+    digest = hashlib.md5(
+        ('%s:%s' % (get_version(scope, user_id), url)).encode('utf-8'))
+    return '"%s"' % digest.hexdigest()
+
+
+def get_response_key(scope, user_id, etag):
+    return 'friends:response:%s:%s:%s' % (scope, user_id, etag.strip('"'))
+
+
+def affected_users(transitions):
+    """
+    Map status transitions to the cache scopes and users they invalidate.
+    Returns:
+    dict: {scope: set of user ids}.
+    """
+    affected = {FRIEND_LIST: set(), PENDING_INBOX: set()}
+    for transition in transitions:
+        statuses = (transition.old_status, transition.new_status)
+        if FriendRequest.REQUEST_PENDING in statuses:
+            affected[PENDING_INBOX].add(transition.to_user_id)
+        if FriendRequest.REQUEST_ACCEPTED in statuses:
+            affected[FRIEND_LIST].update(
+                user_id for user_id in (transition.created_by_id, transition.to_user_id)
+                if user_id is not None)
+    return affected
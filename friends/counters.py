@@ -0,0 +1,54 @@
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from friends.models import FriendRequest
+from user_profile.models import UserProfile
+
+
+# Status of the received friend requests each user counter counts.
+COUNTER_STATUSES = {
+    'request_count': FriendRequest.REQUEST_PENDING,
+    'followers_count': FriendRequest.REQUEST_ACCEPTED,
+}
+
+
+def received_count(status):
+    """
+    Subquery counting the requests in `status` received by the outer user.
+    """
+    return Coalesce(Subquery(
+        FriendRequest.objects.filter(to_user=OuterRef('pk'), status=status)
+        .order_by().values('to_user').annotate(total=Count('id'))
+        .values('total')[:1]
+    ), Value(0))
+
+
+def affected_users(transitions):
+    """
+    Return the ids of the users whose counters are changed by status
+    transitions.
+    param:
+    transitions (iterable): StatusTransition tuples.
+    Returns:
+    set: User ids.
+    """
+    statuses = set(COUNTER_STATUSES.values())
+    return {
+        transition.to_user_id for transition in transitions
+        if transition.old_status != transition.new_status
+        and statuses.intersection((transition.old_status, transition.new_status))
+    }
+
+
+def refresh_counters(user_ids):
+    """
+    Recompute the counters of users from their received friend requests with
+    one UPDATE statement.
+    Unlike applying deltas this is idempotent: a task delivered twice, or
+    two tasks racing, leave the same counts, and any drift is repaired.
+    param:
+    user_ids (iterable): Ids of the users.
+    """
+    # A stable order keeps concurrent batches from deadlocking each other.
+    UserProfile.objects.filter(pk__in=sorted(user_ids)).update(**{
+        field: received_count(status) for field, status in COUNTER_STATUSES.items()})
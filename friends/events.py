@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.utils import timezone
+
+from friends import suggestions
+from friends.models import FriendRequestEvent
+from friends.transitions import StatusTransition
+
+
+def record_transitions(transitions):
+    """
+    Write the transitions to the outbox. Must run inside the transaction that
+    changed the friend requests.
+    """
+    FriendRequestEvent.objects.bulk_create([
+        FriendRequestEvent(
+            friend_request_id=transition.friend_request_id,
+            created_by_id=transition.created_by_id,
+            to_user_id=transition.to_user_id,
+            old_status=transition.old_status,
+            new_status=transition.new_status)
+        for transition in transitions
+    ])
+
+
+def update_suggestions(transitions):
+    pairs = suggestions.changed_friendships(transitions)
+    if pairs:
+        suggestions.refresh_suggestions(suggestions.affected_users(pairs))
+
+
+# Called with the transitions of every drained batch, in order.
+EVENT_HANDLERS = (
+    update_suggestions,
+)
+
+
+def process_pending_events(batch_size=500):
+    """
+    Drain one batch of unprocessed events and update the derived data.
+    Concurrent consumers skip each other's rows where the database supports
+    SKIP LOCKED.
+    Returns:
+    int: Number of processed events.
+    """
+    with transaction.atomic():
+        events = list(
+            FriendRequestEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_on__isnull=True).order_by('id')[:batch_size])
+        if not events:
+            return 0
+        transitions = [
+            StatusTransition(
+                event.friend_request_id, event.created_by_id, event.to_user_id,
+                event.old_status, event.new_status)
+            for event in events]
+        for handler in EVENT_HANDLERS:
+            handler(transitions)
+        FriendRequestEvent.objects.filter(
+            id__in=[event.id for event in events]
+        ).update(processed_on=timezone.now())
+    return len(events)
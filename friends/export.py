@@ -0,0 +1,162 @@
+"""
+Streaming export of the friendship graph for analytics and offline jobs.
+Rows are read in chunks and streamed out as they are read, so memory use
+does not depend on the size of the tables.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from django.db import connections
+
+from friends.models import FriendRequest
+from user_profile.models import UserProfile
+
+USERS = 'users'
+FRIENDSHIPS = 'friendships'
+KINDS = (USERS, FRIENDSHIPS)
+
+CSV = 'csv'
+JSONL = 'jsonl'
+EDGELIST = 'edgelist'
+FORMATS = (CSV, JSONL, EDGELIST)
+
+CONTENT_TYPES = {
+    CSV: 'text/csv; charset=utf-8',
+    JSONL: 'application/x-ndjson',
+    EDGELIST: 'text/plain; charset=utf-8',
+}
+
+# Exported columns: (column name, `values_list()` field).
+COLUMNS = {
+    USERS: (
+        ('id', 'id'),
+        ('email', 'email'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('date_of_birth', 'date_of_birth'),
+        ('date_joined', 'date_joined'),
+        ('is_active', 'is_active'),
+        ('followers_count', 'followers_count'),
+    ),
+    # One edge per accepted friend request, from the sender to the recipient.
+    FRIENDSHIPS: (
+        ('id', 'id'),
+        ('source', 'created_by_id'),
+        ('target', 'to_user_id'),
+        ('requested_on', 'created_on'),
+        ('accepted_on', 'modified_on'),
+    ),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def get_queryset(kind):
+    if kind == USERS:
+        return UserProfile.objects.all()
+    return FriendRequest.objects.filter(
+        status=FriendRequest.REQUEST_ACCEPTED, created_by__isnull=False)
+
+
+def iter_rows(queryset, fields, chunk_size):
+    """
+    Yield the `values_list()` rows of a queryset, ordered by primary key,
+    `chunk_size` rows at a time.
+    Server-side cursors stream the result with `iterator()`. When they are
+    disabled (e.g. behind PgBouncer in transaction pooling mode) the
+    driver would buffer the whole result, so the rows are read in keyset
+    batches on the primary key instead.
+    """
+    queryset = queryset.order_by('pk')
+    database = connections[queryset.db]
+    if not database.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+        return
+
+    # The primary key is selected first to seek the next batch.
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(batch.values_list('pk', *fields)[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export(kind, output_format, chunk_size=2000, using=None):
+    """
+    Stream an export of the graph.
+    :param kind: `USERS` or `FRIENDSHIPS`.
+    :param output_format: `CSV`, `JSONL` or `EDGELIST` (friendships only,
+    one "source target" line per edge).
+    :param chunk_size: Number of rows fetched from the database at once.
+    :param using: Database alias to read from, the router's choice by default.
+    :return: Iterator of text blocks made of whole lines.
+    :raises ExportError: If the kind or format is unknown.
+    """
+    if kind not in KINDS:
+        raise ExportError('Unknown export %r, expected one of: %s.' % (
+            kind, ', '.join(KINDS)))
+    if output_format not in FORMATS:
+        raise ExportError('Unknown format %r, expected one of: %s.' % (
+            output_format, ', '.join(FORMATS)))
+    if output_format == EDGELIST and kind != FRIENDSHIPS:
+        raise ExportError('The edgelist format only exports friendships.')
+
+    queryset = get_queryset(kind)
+    if using is not None:
+        queryset = queryset.using(using)
+    names = [name for name, _ in COLUMNS[kind]]
+    fields = [field for _, field in COLUMNS[kind]]
+    if output_format == EDGELIST:
+        fields = ['created_by_id', 'to_user_id']
+    return _blocks(_lines(
+        iter_rows(queryset, fields, chunk_size), names, output_format))
+
+
+def _blocks(lines, size=64 * 1024):
+    # Joined into blocks so responses and files are not written line by line.
+    block = []
+    length = 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(block)
+            block = []
+            length = 0
+    if block:
+        yield ''.join(block)
+
+
+def _lines(rows, names, output_format):
+    if output_format == EDGELIST:
+        for source, target in rows:
+            yield '%d %d\n' % (source, target)
+    elif output_format == JSONL:
+        for row in rows:
+            yield json.dumps(dict(zip(names, map(_value, row)))) + '\n'
+    else:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(names)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([_value(value) for value in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
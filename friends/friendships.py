@@ -0,0 +1,80 @@
+from django.db.models import Q
+
+from friends.models import FriendRequest, Friendship
+
+
+def are_friends(user_id, other_user_id):
+    """
+    Check whether two users are friends.
+    """
+    return Friendship.objects.filter(
+        user_id=user_id, friend_id=other_user_id).exists()
+
+
+def friend_ids(user_id):
+    """
+    Return the ids of a user's friends.
+    """
+    return set(Friendship.objects.filter(
+        user_id=user_id).values_list('friend_id', flat=True))
+
+
+def add_friendships(pairs):
+    """
+    Store the given friendships in both directions.
+    param:
+    pairs (iterable): (user_id, friend_id) tuples.
+    """
+    edges = set()
+    for user_id, friend_id in pairs:
+        edges.add((user_id, friend_id))
+        edges.add((friend_id, user_id))
+    Friendship.objects.bulk_create(
+        [Friendship(user_id=user_id, friend_id=friend_id)
+         for user_id, friend_id in sorted(edges)],
+        ignore_conflicts=True)
+
+
+def remove_friendships(pairs):
+    """
+    Remove the given friendships unless an accepted friend request still
+    exists in either direction.
+    param:
+    pairs (iterable): (user_id, friend_id) tuples.
+    """
+    condition = Q()
+    for user_id, friend_id in pairs:
+        accepted = FriendRequest.objects.filter(
+            Q(created_by_id=user_id, to_user_id=friend_id) |
+            Q(created_by_id=friend_id, to_user_id=user_id),
+            status=FriendRequest.REQUEST_ACCEPTED)
+        if not accepted.exists():
+            condition |= (Q(user_id=user_id, friend_id=friend_id) |
+                          Q(user_id=friend_id, friend_id=user_id))
+    if condition:
+        Friendship.objects.filter(condition).delete()
+
+
+def apply_transitions(transitions):
+    """
+    Add or remove friendships for friend requests entering or leaving the
+    accepted status.
+    """
+    added = set()
+    removed = set()
+    for transition in transitions:
+        if transition.created_by_id is None:
+            continue
+        pair = (transition.created_by_id, transition.to_user_id)
+        was_accepted = transition.old_status == FriendRequest.REQUEST_ACCEPTED
+        is_accepted = transition.new_status == FriendRequest.REQUEST_ACCEPTED
+        if is_accepted and not was_accepted:
+            added.add(pair)
+            removed.discard(pair)
+        elif was_accepted and not is_accepted:
+            removed.add(pair)
+            added.discard(pair)
+    if added:
+        add_friendships(added)
+    if removed:
+        remove_friendships(removed)
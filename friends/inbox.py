@@ -0,0 +1,147 @@
+from friends.models import FriendRequest, PendingInboxEntry
+
+# Sender fields copied into the inbox entries: (entry field, user field).
+SENDER_FIELDS = (
+    ('sender_email', 'email'),
+    ('sender_first_name', 'first_name'),
+    ('sender_last_name', 'last_name'),
+)
+
+# User fields whose changes have to be copied to the inbox entries; they
+# are also the fields of a friend whose changes the cached friend lists show.
+SYNCED_USER_FIELDS = frozenset(['is_active'] + [field for _, field in SENDER_FIELDS])
+
+
+def pending_count(user_id):
+    """
+    Return the exact number of pending friend requests received by a user
+    from active senders.
+    """
+    return PendingInboxEntry.objects.filter(user_id=user_id).count()
+
+
+def add_entries(friend_requests):
+    """
+    Create the missing inbox entries of pending friend requests from active
+    senders.
+    param:
+    friend_requests (QuerySet): Friend requests to consider.
+    Returns:
+    list: The entries considered for insertion.
+    """
+    rows = friend_requests.filter(
+        status=FriendRequest.REQUEST_PENDING, created_by__is_active=True
+    ).values_list(
+        'id', 'to_user_id', 'created_by_id', 'created_on',
+        *['created_by__%s' % field for _, field in SENDER_FIELDS])
+    entries = [
+        PendingInboxEntry(
+            friend_request_id=friend_request_id, user_id=user_id,
+            sender_id=sender_id, created_on=created_on,
+            **dict(zip([field for field, _ in SENDER_FIELDS], summary)))
+        for friend_request_id, user_id, sender_id, created_on, *summary in rows]
+    PendingInboxEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return entries
+
+
+def apply_transitions(transitions):
+    """
+    Add or remove inbox entries for friend requests entering or leaving the
+    pending status. Must run in the transaction that changed the requests.
+    """
+    final_statuses = {}
+    for transition in transitions:
+        if transition.friend_request_id is not None:
+            final_statuses[transition.friend_request_id] = transition.new_status
+    added = [
+        friend_request_id for friend_request_id, status in final_statuses.items()
+        if status == FriendRequest.REQUEST_PENDING]
+    removed = [
+        friend_request_id for friend_request_id, status in final_statuses.items()
+        if status != FriendRequest.REQUEST_PENDING]
+    if removed:
+        PendingInboxEntry.objects.filter(friend_request_id__in=removed).delete()
+    if added:
+        add_entries(FriendRequest.objects.filter(pk__in=added))
+
+
+def changed_user_fields(user, update_fields=None):
+    """
+    Return the synced fields of a saved user which differ from the values it
+    was loaded with, as remembered by `remember_synced_fields`.
+    Fields deferred or never loaded count as changed.
+    param:
+    user (UserProfile): The saved user.
+    update_fields (iterable): The saved fields, None when all were saved.
+    Returns:
+    set: Names of the changed fields.
+    """
+    fields = SYNCED_USER_FIELDS if update_fields is None else \
+        SYNCED_USER_FIELDS.intersection(update_fields)
+    original = getattr(user, '_synced_fields', {})
+    return {
+        field for field in fields
+        if field not in original or original[field] != getattr(user, field)}
+
+
+def remember_synced_fields(user, update_fields=None):
+    """
+    Remember the synced field values a user was loaded or saved with.
+    param:
+    user (UserProfile): The loaded or saved user.
+    update_fields (iterable): The saved fields, None when all were saved.
+    """
+    fields = SYNCED_USER_FIELDS if update_fields is None else \
+        SYNCED_USER_FIELDS.intersection(update_fields)
+    original = user.__dict__.setdefault('_synced_fields', {})
+    # Read from __dict__ so deferred fields are not fetched.
+    original.update(
+        (field, user.__dict__[field]) for field in fields if field in user.__dict__)
+
+
+def sync_sender(user, changed_fields):
+    """
+    Bring the inbox entries of the requests sent by a user in line with the
+    user: drop them when the user is deactivated, otherwise refresh the
+    sender summary and restore the entries of a reactivated user.
+    param:
+    user (UserProfile): The saved user.
+    changed_fields (set): The changed fields, from `changed_user_fields`.
+    Returns:
+    set: Ids of the recipients whose inbox entries changed.
+    """
+    entries = PendingInboxEntry.objects.filter(sender_id=user.pk)
+    if not user.is_active:
+        if 'is_active' not in changed_fields:
+            # An inactive sender has no entries to refresh.
+            return set()
+        user_ids = set(entries.values_list('user_id', flat=True))
+        if user_ids:
+            entries.delete()
+        return user_ids
+    user_ids = set()
+    if changed_fields.intersection(field for _, field in SENDER_FIELDS):
+        user_ids.update(entries.values_list('user_id', flat=True))
+        if user_ids:
+            entries.update(**{
+                entry_field: getattr(user, user_field)
+                for entry_field, user_field in SENDER_FIELDS})
+    if 'is_active' in changed_fields:
+        added = add_entries(FriendRequest.objects.filter(
+            created_by_id=user.pk, inbox_entry__isnull=True))
+        user_ids.update(entry.user_id for entry in added)
+    return user_ids
+
+
+def rebuild(user_ids):
+    """
+    Rebuild the inbox entries of the given recipients from the friend
+    requests.
+    param:
+    user_ids (iterable): Ids of the recipients.
+    Returns:
+    int: Number of entries after the rebuild.
+    """
+    user_ids = list(user_ids)
+    PendingInboxEntry.objects.filter(user_id__in=user_ids).delete()
+    return len(add_entries(FriendRequest.objects.filter(to_user_id__in=user_ids)))
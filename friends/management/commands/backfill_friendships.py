@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from friends.friendships import add_friendships
+from friends.models import FriendRequest, Friendship
+
+
+class Command(BaseCommand):
+    help = 'Build the Friendship table from the accepted friend requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of friend requests inserted per batch.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete all friendships before rebuilding them.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['clear']:
+            Friendship.objects.all().delete()
+
+        pairs = FriendRequest.objects.filter(
+            status=FriendRequest.REQUEST_ACCEPTED, created_by__isnull=False
+        ).order_by('pk').values_list('created_by_id', 'to_user_id')
+
+        total = 0
+        batch = []
+        for pair in pairs.iterator(chunk_size=batch_size):
+            batch.append(pair)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    add_friendships(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                add_friendships(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Backfilled friendships from %d accepted friend requests.' % total))
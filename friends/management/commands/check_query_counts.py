@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from friends.models import FriendRequest
+from user_profile.models import UserProfile
+
+# (url name, query params) of every list endpoint whose query count must not
+# depend on the size of the page.
+LIST_ENDPOINTS = (
+    ('list-friends', {}),
+    ('list-pending-requests', {}),
+    ('user-search', {'q': 'querycheck'}),
+    ('user-search', {'q': 'querycheck', 'cursor': ''}),
+)
+
+EMAIL_DOMAIN = 'querycheck.invalid'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Call every list endpoint with growing page sizes on synthetic '
+            'data and fail if the number of queries grows with the page.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes', default='1,10,50',
+            help='Comma separated page sizes to compare.')
+
+    def _seed(self, size):
+        """
+        Create a user with `size` friends and `size` pending requests.
+        """
+        user = UserProfile.objects.create_user(
+            'owner@%s' % EMAIL_DOMAIN, first_name='Querycheck')
+        for number in range(size * 2):
+            other = UserProfile.objects.create_user(
+                'user%d@%s' % (number, EMAIL_DOMAIN),
+                first_name='Querycheck', last_name=str(number))
+            friend_request = FriendRequest.objects.create(
+                created_by=other, modified_by=other, to_user=user)
+            if number % 2:
+                friend_request.status = FriendRequest.REQUEST_ACCEPTED
+                friend_request.save()
+        return user
+
+    def _count_queries(self, client, name, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(name), params)
+        if response.status_code != 200:
+            raise CommandError('%s returned %d: %s' % (
+                name, response.status_code, response.content[:200]))
+        return len(queries)
+
+    def handle(self, *args, **options):
+        page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        failures = []
+        try:
+            with transaction.atomic():
+                user = self._seed(max(page_sizes))
+                client = APIClient()
+                client.force_authenticate(user)
+                for name, params in LIST_ENDPOINTS:
+                    # Warm up lazily built indexes and caches.
+                    self._count_queries(client, name, params)
+                    counts = [
+                        self._count_queries(
+                            client, name, dict(params, page_size=page_size))
+                        for page_size in page_sizes]
+                    label = '%s %s' % (name, params or '')
+                    summary = ', '.join(
+                        'page_size=%d: %d' % pair
+                        for pair in zip(page_sizes, counts))
+                    if len(set(counts)) > 1:
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(
+                            '%s: FAIL (%s)' % (label, summary)))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(
+                            '%s: OK (%s)' % (label, summary)))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(
+                'Query count depends on page size: %s' % '; '.join(failures))
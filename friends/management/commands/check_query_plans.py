@@ -0,0 +1,96 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from friends.v1.views.friend_request import (
+    ListFriendsView, ListPendingFriendRequestsView)
+from friends.v1.views.friend_suggestion import ListFriendSuggestionsView
+from user_profile.models import UserProfile
+from user_profile.v1.views.user_registration import UserSearchView
+
+# (name, view class, query params) of every list endpoint whose query plan
+# is checked.
+HOT_QUERIES = (
+    ('list-friends', ListFriendsView, {}),
+    ('list-pending-requests', ListPendingFriendRequestsView, {}),
+    ('list-friend-suggestions', ListFriendSuggestionsView, {}),
+    ('user-search', UserSearchView, {'q': 'ali'}),
+    ('user-search-email', UserSearchView, {'q': 'someone@example.com'}),
+)
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)'),
+}
+
+
+def build_queryset(view_class, user, params, page_size=10):
+    """
+    Build the queryset a list view runs for `user`, including the ordering
+    and limit applied by its paginator.
+    """
+    http_request = APIRequestFactory().get('/', params)
+    force_authenticate(http_request, user=user)
+    view = view_class()
+    view.setup(http_request)
+    view.request = Request(http_request)
+    view.request.user = user
+    view.format_kwarg = None
+    queryset = view.get_queryset()
+    ordering = getattr(view, 'keyset_ordering', None)
+    if ordering and not queryset.query.is_empty():
+        queryset = queryset.order_by(*ordering)
+    return queryset[:page_size + 1]
+
+
+class Command(BaseCommand):
+    help = ('Print the EXPLAIN output of the queries run by every list '
+            'endpoint and fail if any of them scans a whole table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Email of the user to build the queries for.')
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan of every query.')
+
+    def handle(self, *args, **options):
+        pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                'Query plans cannot be checked on %s.' % connection.vendor)
+
+        if options['user']:
+            user = UserProfile.objects.get(email=options['user'])
+        else:
+            # The plan does not depend on who the user is.
+            user = UserProfile(pk=0, email='plan-check@example.com')
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables are scanned sequentially because it is cheaper;
+                # what matters is that an index path exists.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, view_class, params in HOT_QUERIES:
+                queryset = build_queryset(view_class, user, params)
+                if queryset.query.is_empty():
+                    self.stdout.write('%s: skipped, no query is run' % name)
+                    continue
+                plan = queryset.explain()
+                scanned = pattern.findall(plan)
+                if options['verbose_plans']:
+                    self.stdout.write('%s:\n%s\n' % (name, plan))
+                if scanned:
+                    failures.append('%s scans %s' % (name, ', '.join(scanned)))
+                    self.stdout.write(self.style.ERROR('%s: FAIL' % name))
+                else:
+                    self.stdout.write(self.style.SUCCESS('%s: OK' % name))
+
+        if failures:
+            raise CommandError(
+                'Sequential scans found: %s' % '; '.join(failures))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from friends import export
+
+
+class Command(BaseCommand):
+    help = ('Stream the users or the friendships (accepted friend requests) '
+            'as CSV, JSON lines or an edge list, in constant memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=export.KINDS, help='What to export.')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default=export.CSV,
+            help='Output format; edgelist writes "source target" lines.')
+        parser.add_argument(
+            '--output', help='Write to this file instead of stdout.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of rows fetched from the database at once.')
+        parser.add_argument(
+            '--database',
+            help='Database alias to read from, e.g. a replica.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive.')
+        try:
+            blocks = export.export(
+                options['kind'], options['format'], options['chunk_size'],
+                using=options['database'])
+        except export.ExportError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for block in blocks:
+                output.write(block)
+        self.stderr.write(self.style.SUCCESS(
+            'Exported %s to %s.' % (options['kind'], options['output'])))
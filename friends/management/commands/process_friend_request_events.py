@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from friends.events import process_pending_events
+from friends.models import FriendRequestEvent
+
+
+class Command(BaseCommand):
+    help = ('Drain the friend request event outbox in batches and update the '
+            'derived graph data (friend suggestions).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of events processed per transaction.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for new events instead of exiting when drained.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait between polls when the outbox is empty.')
+        parser.add_argument(
+            '--purge-days', type=int,
+            help='Delete events processed more than this many days ago.')
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            deleted, _ = FriendRequestEvent.objects.filter(
+                processed_on__lt=timezone.now() - timedelta(days=options['purge_days'])
+            ).delete()
+            self.stdout.write('Purged %d processed events.' % deleted)
+
+        total = 0
+        while True:
+            processed = process_pending_events(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS('Processed %d events.' % total))
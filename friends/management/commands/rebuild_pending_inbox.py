@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from friends import inbox
+from user_profile.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the pending inbox entries of every user from the '
+            'pending friend requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = UserProfile.objects.order_by('pk').values_list('pk', flat=True)
+
+        total = 0
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    total += inbox.rebuild(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                total += inbox.rebuild(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt the pending inboxes with %d entries.' % total))
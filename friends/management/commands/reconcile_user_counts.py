@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from friends.counters import received_count
+from friends.models import FriendRequest
+from user_profile.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ('Recompute followers_count and request_count of every user from '
+            'the friend requests and repair any drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of user ids checked per statement.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many users have drifted counters.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = UserProfile.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        repaired = 0
+        for start in range(0, last_id + 1, batch_size):
+            drifted = UserProfile.objects.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).annotate(
+                expected_requests=received_count(FriendRequest.REQUEST_PENDING),
+                expected_followers=received_count(FriendRequest.REQUEST_ACCEPTED),
+            ).exclude(
+                request_count=F('expected_requests'),
+                followers_count=F('expected_followers'),
+            )
+            if options['dry_run']:
+                repaired += drifted.count()
+                continue
+            repaired += UserProfile.objects.filter(
+                pk__in=list(drifted.values_list('pk', flat=True))
+            ).update(
+                request_count=received_count(FriendRequest.REQUEST_PENDING),
+                followers_count=received_count(FriendRequest.REQUEST_ACCEPTED),
+            )
+
+        verb = 'have drifted counters' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS('%d users %s.' % (repaired, verb)))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from friends.models import Friendship, FriendSuggestion
+from friends.suggestions import refresh_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored friend suggestions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help='Only refresh these user ids (default: every user with friends).')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users refreshed per transaction.')
+
+    def handle(self, *args, **options):
+        if options['users']:
+            user_ids = options['users']
+        else:
+            # Users without friends cannot have suggestions.
+            FriendSuggestion.objects.exclude(
+                user_id__in=Friendship.objects.values('user_id')).delete()
+            user_ids = Friendship.objects.order_by('user_id').values_list(
+                'user_id', flat=True).distinct().iterator()
+
+        batch_size = options['batch_size']
+        total = 0
+        batch = []
+        for user_id in user_ids:
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                refresh_suggestions(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            refresh_suggestions(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Refreshed friend suggestions of %d users.' % total))
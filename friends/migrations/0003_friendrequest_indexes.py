@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friends', '0002_friendship'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['to_user', '-created_on', '-id'], name='friendreq_pending_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'status'], name='friendreq_to_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-17 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('friends', '0003_friendrequest_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mutual_count', models.PositiveIntegerField(help_text='Number of mutual friends.')),
+                ('computed_on', models.DateTimeField(auto_now=True)),
+                ('suggested', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='friendsuggestion',
+            index=models.Index(fields=['user', '-mutual_count', 'suggested'], name='friendsuggestion_rank_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='friendsuggestion',
+            unique_together={('user', 'suggested')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-17 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friends', '0004_friendsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendRequestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('friend_request_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('to_user_id', models.BigIntegerField()),
+                ('old_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], max_length=20, null=True)),
+                ('new_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], max_length=20, null=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('processed_on', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='friendrequestevent',
+            index=models.Index(condition=models.Q(('processed_on__isnull', True)), fields=['id'], name='friendreqevent_unprocessed_idx'),
+        ),
+    ]
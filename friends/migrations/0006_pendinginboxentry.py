@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-17 20:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_pending_inbox(apps, schema_editor):
+    FriendRequest = apps.get_model('friends', 'FriendRequest')
+    PendingInboxEntry = apps.get_model('friends', 'PendingInboxEntry')
+    rows = FriendRequest.objects.filter(
+        status='pending', created_by__is_active=True
+    ).order_by('pk').values_list(
+        'id', 'to_user_id', 'created_by_id', 'created_on', 'created_by__email',
+        'created_by__first_name', 'created_by__last_name')
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        batch.append(PendingInboxEntry(
+            friend_request_id=row[0], user_id=row[1], sender_id=row[2],
+            created_on=row[3], sender_email=row[4], sender_first_name=row[5],
+            sender_last_name=row[6]))
+        if len(batch) >= 5000:
+            PendingInboxEntry.objects.bulk_create(batch)
+            batch = []
+    PendingInboxEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('friends', '0005_friendrequestevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingInboxEntry',
+            fields=[
+                ('friend_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox_entry', serialize=False, to='friends.friendrequest')),
+                ('sender_email', models.EmailField(max_length=254)),
+                ('sender_first_name', models.CharField(blank=True, max_length=30)),
+                ('sender_last_name', models.CharField(blank=True, max_length=30)),
+                ('created_on', models.DateTimeField(help_text='When the friend request was sent.')),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pendinginboxentry',
+            index=models.Index(fields=['user', '-created_on', '-friend_request'], name='pendinginbox_user_idx'),
+        ),
+        migrations.RunPython(fill_pending_inbox, migrations.RunPython.noop),
+    ]
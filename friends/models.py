@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 from core.models import AbstractDateBase, AbstractUserBase
 from user_profile.models import UserProfile
@@ -23,3 +24,94 @@ class FriendRequest(AbstractDateBase, AbstractUserBase):
 
     class Meta:
         unique_together = ('created_by', 'to_user')
+        indexes = [
+            # Pending inbox of a user, newest first.
+            models.Index(
+                fields=['to_user', '-created_on', '-id'],
+                condition=Q(status='pending'),
+                name='friendreq_pending_inbox_idx'),
+            # Requests received by a user per status (counters, reconciling).
+            models.Index(
+                fields=['to_user', 'status'], name='friendreq_to_user_status_idx'),
+        ]
+
+
+class Friendship(AbstractDateBase):
+    """
+    Model to store friendships as directed edges.
+    Every friendship is stored in both directions, so the friends of a user
+    and "are these two users friends?" checks are range scans on the
+    (user, friend) index.
+    """
+    user = models.ForeignKey(UserProfile, related_name='friendships', on_delete=models.CASCADE)
+    friend = models.ForeignKey(UserProfile, related_name='friend_of', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('user', 'friend')
+
+
+class FriendSuggestion(models.Model):
+    """
+    Model to store precomputed "people you may know" suggestions.
+    Rows are rebuilt per user by `friends.suggestions.refresh_suggestions`.
+    """
+    user = models.ForeignKey(UserProfile, related_name='friend_suggestions', on_delete=models.CASCADE)
+    suggested = models.ForeignKey(UserProfile, related_name='+', on_delete=models.CASCADE)
+    mutual_count = models.PositiveIntegerField(help_text='Number of mutual friends.')
+    computed_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'suggested')
+        indexes = [
+            models.Index(
+                fields=['user', '-mutual_count', 'suggested'],
+                name='friendsuggestion_rank_idx'),
+        ]
+
+
+class FriendRequestEvent(models.Model):
+    """
+    Model to store the outbox of friend request status transitions.
+    Rows are written in the same transaction as the friend request change and
+    drained in batches by the `process_friend_request_events` command, which
+    updates the derived graph data.
+    """
+    friend_request_id = models.BigIntegerField(null=True, blank=True)
+    created_by_id = models.BigIntegerField(null=True, blank=True)
+    to_user_id = models.BigIntegerField()
+    old_status = models.CharField(max_length=20, choices=FriendRequest.REQUESTS, null=True, blank=True)
+    new_status = models.CharField(max_length=20, choices=FriendRequest.REQUESTS, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    processed_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'], condition=Q(processed_on__isnull=True),
+                name='friendreqevent_unprocessed_idx'),
+        ]
+
+
+class PendingInboxEntry(models.Model):
+    """
+    Model to store the pending friend requests received by each user, with a
+    summary of their sender.
+    Rows are kept in sync with the friend requests and their senders by
+    `friends.inbox`, so the inbox size is an exact indexed count. Requests
+    from inactive senders have no entry, like in the pending list.
+    """
+    friend_request = models.OneToOneField(
+        FriendRequest, primary_key=True, related_name='inbox_entry', on_delete=models.CASCADE)
+    user = models.ForeignKey(UserProfile, related_name='pending_inbox', on_delete=models.CASCADE)
+    sender = models.ForeignKey(UserProfile, related_name='+', on_delete=models.CASCADE)
+    sender_email = models.EmailField()
+    sender_first_name = models.CharField(max_length=30, blank=True)
+    sender_last_name = models.CharField(max_length=30, blank=True)
+    created_on = models.DateTimeField(help_text='When the friend request was sent.')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-created_on', '-friend_request'],
+                name='pendinginbox_user_idx'),
+        ]
@@ -1,26 +1,162 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
+from core.routers import pin_users_on_commit
+from core.tasks import enqueue
+from friends import cache, counters, events, friendships, inbox, tasks
 from friends.models import FriendRequest
+from friends.transitions import status_changed, transition_for
 from user_profile.models import UserProfile
 
 
+@receiver(post_init, sender=FriendRequest)
+def remember_status(sender, instance, **kwargs):
+    """
+    Signal to remember the status a friend request was loaded with, so that
+    saves can tell real status transitions apart from other updates.
+    """
+    # Read from __dict__ so a deferred status is not fetched.
+    instance._original_status = instance.__dict__.get('status')
+
+
 @receiver(post_save, sender=FriendRequest)
-def update_user_counts(sender, instance, created, **kwargs):
+def send_status_changed_on_save(sender, instance, created, update_fields=None,
+                                **kwargs):
+    """
+    Signal to announce a status transition when a friend request is created
+    or its status is updated.
+    """
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    old_status = None if created else instance._original_status
+    if old_status != instance.status:
+        status_changed.send(sender=sender, transitions=[
+            transition_for(instance, old_status, instance.status)])
+    instance._original_status = instance.status
+
+
+@receiver(post_delete, sender=FriendRequest)
+def send_status_changed_on_delete(sender, instance, **kwargs):
+    """
+    Signal to announce that a deleted friend request left its status.
+    """
+    status_changed.send(sender=sender, transitions=[
+        transition_for(instance, instance._original_status, None)])
+
+
+@receiver(status_changed)
+def update_user_counts(sender, transitions, **kwargs):
     """
-    Signal to update the pending request count and followers count in the user table
-    when a friend request is created or its status is updated.
+    Signal to queue the update of the pending request count and followers count
+    in the user table when friend requests are created or their status is updated.
+    The task recomputes the counts, so running it twice is harmless.
     """
-    from_user = instance.created_by
-    to_user = instance.to_user
+    user_ids = counters.affected_users(transitions)
+    if user_ids:
+        enqueue(tasks.REFRESH_USER_COUNTERS, {'user_ids': sorted(user_ids)})
 
+
+@receiver(status_changed)
+def update_friendships(sender, transitions, **kwargs):
+    """
+    Signal to keep the symmetric Friendship edges in sync with accepted
+    friend requests.
+    """
+    friendships.apply_transitions(transitions)
+
+
+@receiver(status_changed)
+def update_pending_inbox(sender, transitions, **kwargs):
+    """
+    Signal to keep the pending inbox entries in sync with the pending
+    friend requests, in the same transaction.
+    """
+    inbox.apply_transitions(transitions)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_synced_fields(sender, instance, **kwargs):
+    """
+    Signal to remember the user fields copied into inbox entries, so that
+    saves which leave them alone skip the inbox.
+    """
+    inbox.remember_synced_fields(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_sender_inbox_entries(sender, instance, created, update_fields=None,
+                              **kwargs):
+    """
+    Signal to update the inbox entries of the requests sent by a user when
+    the user is deactivated, reactivated or renamed, and to invalidate the
+    cached pending lists whose entries changed once the change commits.
+    """
     if created:
-        to_user.request_count += 1
-        to_user.save()
+        return
+    changed_fields = inbox.changed_user_fields(instance, update_fields)
+    if not changed_fields:
+        return
+    user_ids = inbox.sync_sender(instance, changed_fields)
+    if user_ids:
+        cache.invalidate_on_commit({cache.PENDING_INBOX: user_ids})
+        pin_users_on_commit(user_ids)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_friend_lists(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """
+    Signal to invalidate the cached friend lists of a user's friends once
+    the user is deactivated, reactivated, renamed or changes email, and the
+    change commits.
+    """
+    if created or not inbox.changed_user_fields(instance, update_fields):
+        return
+    user_ids = friendships.friend_ids(instance.pk)
+    if user_ids:
+        cache.invalidate_on_commit({cache.FRIEND_LIST: user_ids})
+        pin_users_on_commit(user_ids)
+
+
+@receiver(post_save, sender=UserProfile)
+def remember_saved_synced_fields(sender, instance, update_fields=None,
+                                 **kwargs):
+    """
+    Signal to remember the synced field values a user was saved with.
+    Connected after the receivers comparing them with the loaded values.
+    """
+    inbox.remember_synced_fields(instance, update_fields)
+
+
+@receiver(status_changed)
+def invalidate_cached_lists(sender, transitions, **kwargs):
+    """
+    Signal to invalidate the cached friend lists and pending inboxes of the
+    users affected by the transitions, in this process once the transaction
+    commits.
+    """
+    affected = cache.affected_users(transitions)
+    if any(affected.values()):
+        cache.invalidate_on_commit(affected)
 
-    if instance.status == 'accepted':
-        to_user.followers_count += 1
-        to_user.save()
 
-        to_user.request_count -= 1
-        to_user.save()
+@receiver(status_changed)
+def pin_affected_users(sender, transitions, **kwargs):
+    """
+    Signal to send the reads of every user whose lists the transitions
+    changed to the primary for a while, not only those of the writer, so
+    the other side of a request does not read stale lists from a replica.
+    """
+    affected = cache.affected_users(transitions)
+    pin_users_on_commit(set().union(*affected.values()))
+
+
+@receiver(status_changed)
+def record_friend_request_events(sender, transitions, **kwargs):
+    """
+    Signal to write the transitions to the event outbox, in the same
+    transaction as the friend request change. The derived graph data is
+    updated by the `process_friend_request_events` command.
+    """
+    if transitions:
+        events.record_transitions(transitions)
@@ -0,0 +1,148 @@
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from friends.models import FriendRequest, Friendship, FriendSuggestion
+
+# Number of ids sent per IN (...) lookup.
+LOOKUP_BATCH_SIZE = 500
+
+
+def _batches(values, size=LOOKUP_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_adjacency(user_ids):
+    """
+    Load the friends of the given users as sorted integer arrays.
+    param:
+    user_ids (iterable): Ids of the users to load.
+    Returns:
+    dict: {user_id: array('q') of friend ids in ascending order}.
+    """
+    adjacency = {user_id: array('q') for user_id in user_ids}
+    for batch in _batches(adjacency):
+        rows = Friendship.objects.filter(user_id__in=batch).order_by(
+            'user_id', 'friend_id').values_list('user_id', 'friend_id')
+        for user_id, friend_id in rows.iterator(chunk_size=5000):
+            adjacency[user_id].append(friend_id)
+    return adjacency
+
+
+def intersect(first, second):
+    """
+    Intersect two ascending integer arrays with a linear merge.
+    Returns:
+    list: The common values in ascending order.
+    """
+    common = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            common.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return common
+
+
+def mutual_friend_ids(user_id, other_user_id):
+    """
+    Return the ids of the friends two users have in common.
+    """
+    adjacency = load_adjacency((user_id, other_user_id))
+    return intersect(adjacency[user_id], adjacency[other_user_id])
+
+
+def _requested_ids(user_id):
+    """
+    Ids of users with a friend request from or to `user_id`, in any status.
+    """
+    rows = FriendRequest.objects.filter(
+        Q(created_by_id=user_id) | Q(to_user_id=user_id)
+    ).values_list('created_by_id', 'to_user_id')
+    return {other for pair in rows for other in pair} - {user_id}
+
+
+def compute_suggestions(user_id, adjacency, limit):
+    """
+    Rank the friends of friends of a user by their number of mutual friends.
+    param:
+    user_id (int): The user to compute suggestions for.
+    adjacency (dict): Adjacency arrays of the user and all of their friends.
+    limit (int): Maximum number of suggestions.
+    Returns:
+    list: (suggested_id, mutual_count) tuples, best first.
+    """
+    friends = adjacency[user_id]
+    mutual_counts = Counter()
+    for friend_id in friends:
+        mutual_counts.update(adjacency[friend_id])
+    excluded = set(friends)
+    excluded.add(user_id)
+    excluded.update(_requested_ids(user_id))
+    ranked = sorted(
+        (item for item in mutual_counts.items() if item[0] not in excluded),
+        key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
+
+
+def refresh_suggestions(user_ids):
+    """
+    Recompute and store the suggestions of the given users.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    limit = getattr(settings, 'FRIEND_SUGGESTIONS_LIMIT', 50)
+    adjacency = load_adjacency(user_ids)
+    friend_ids = {
+        friend_id for friends in adjacency.values() for friend_id in friends}
+    adjacency.update(load_adjacency(friend_ids - user_ids))
+
+    suggestions = [
+        FriendSuggestion(user_id=user_id, suggested_id=suggested_id,
+                         mutual_count=mutual_count)
+        for user_id in sorted(user_ids)
+        for suggested_id, mutual_count in compute_suggestions(
+            user_id, adjacency, limit)
+    ]
+    with transaction.atomic():
+        for batch in _batches(user_ids):
+            FriendSuggestion.objects.filter(user_id__in=batch).delete()
+        FriendSuggestion.objects.bulk_create(suggestions, batch_size=5000)
+
+
+def affected_users(pairs):
+    """
+    Return the users whose suggestions change when the friendship of the
+    given (user_id, friend_id) pairs changes: both users and their friends.
+    """
+    user_ids = {user_id for pair in pairs for user_id in pair}
+    adjacency = load_adjacency(user_ids)
+    affected = set(user_ids)
+    for friends in adjacency.values():
+        affected.update(friends)
+    return affected
+
+
+def changed_friendships(transitions):
+    """
+    Return the (created_by_id, to_user_id) pairs whose friendship was created
+    or removed by the transitions.
+    """
+    pairs = set()
+    for transition in transitions:
+        statuses = (transition.old_status, transition.new_status)
+        if (transition.created_by_id is not None and
+                statuses.count(FriendRequest.REQUEST_ACCEPTED) == 1):
+            pairs.add((transition.created_by_id, transition.to_user_id))
+    return pairs
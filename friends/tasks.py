@@ -0,0 +1,13 @@
+from core.tasks import task
+from friends import counters
+
+REFRESH_USER_COUNTERS = 'friends.refresh_user_counters'
+
+
+@task(REFRESH_USER_COUNTERS, batch=True)
+def refresh_user_counters(payloads):
+    """
+    Recompute the counters of every user of a batch of tasks at once.
+    """
+    counters.refresh_counters({
+        user_id for payload in payloads for user_id in payload['user_ids']})
@@ -1,3 +1,601 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.routers import is_pinned
+from friends import cache, counters, suggestions
+from friends.friendships import add_friendships
+from friends.management.commands.check_query_plans import (
+    HOT_QUERIES, SEQUENTIAL_SCAN_PATTERNS, build_queryset)
+from friends.models import (
+    FriendRequest, FriendRequestEvent, FriendSuggestion, Friendship,
+    PendingInboxEntry)
+from friends.v1.serializers.friend_request_serializer import (
+    FriendRequestRowFormatter, FriendRequestSerializer)
+from friends.v1.views.friend_request import RespondFriendRequestView
+from user_profile.models import UserProfile
+from user_profile.v1.views.user_registration import LoginView
+
+
+class FriendsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = UserProfile.objects.create_user(
+            'alice@example.com', 'password', first_name='Alice')
+        cls.bob = UserProfile.objects.create_user(
+            'bob@example.com', 'password', first_name='Bob')
+        cls.carol = UserProfile.objects.create_user(
+            'carol@example.com', 'password', first_name='Carol')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def token_client_for(self, user):
+        token = LoginView.get_tokens_for_user(user)['access']
+        return Client(HTTP_AUTHORIZATION='Bearer ' + token)
+
+    def send_request(self, sender, to_user):
+        return FriendRequest.objects.create(
+            created_by=sender, modified_by=sender, to_user=to_user)
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class RespondFriendRequestTests(FriendsTestCase):
+
+    def setUp(self):
+        self.friend_request = self.send_request(self.bob, self.alice)
+        self.url = reverse('respond-request', args=[self.friend_request.pk])
+
+    def test_accept(self):
+        response = self.client_for(self.alice).put(
+            self.url, {'status': 'accepted'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, FriendRequest.REQUEST_ACCEPTED)
+        self.assertTrue(Friendship.objects.filter(
+            user=self.alice, friend=self.bob).exists())
+
+    def test_unknown_status_is_rejected(self):
+        response = self.client_for(self.alice).put(
+            self.url, {'status': 'bogus'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data['errors'])
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, FriendRequest.REQUEST_PENDING)
+
+    def test_unknown_status_is_rejected_by_the_async_view(self):
+        response = self.token_client_for(self.alice).put(
+            reverse('async-respond-request', args=[self.friend_request.pk]),
+            {'status': 'bogus'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, FriendRequest.REQUEST_PENDING)
+
+    def test_accepted_request_cannot_be_reverted_to_pending(self):
+        self.client_for(self.alice).put(self.url, {'status': 'accepted'}, format='json')
+        for data in ({}, {'status': 'pending'}):
+            with self.subTest(view='sync', data=data):
+                response = self.client_for(self.alice).put(self.url, data, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('status', response.data['errors'])
+            with self.subTest(view='async', data=data):
+                response = self.token_client_for(self.alice).put(
+                    reverse('async-respond-request', args=[self.friend_request.pk]),
+                    data, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, FriendRequest.REQUEST_ACCEPTED)
+        self.assertTrue(Friendship.objects.filter(
+            user=self.alice, friend=self.bob).exists())
+        self.assertFalse(PendingInboxEntry.objects.filter(
+            friend_request=self.friend_request).exists())
+
+    def test_only_the_recipient_can_respond(self):
+        response = self.client_for(self.carol).put(
+            self.url, {'status': 'accepted'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_repeated_accept_records_one_transition(self):
+        # Both responses were started while the request was pending.
+        for _ in range(2):
+            RespondFriendRequestView.save_status(
+                self.friend_request.pk, FriendRequest.REQUEST_ACCEPTED, self.alice)
+        self.assertEqual(FriendRequestEvent.objects.filter(
+            friend_request_id=self.friend_request.pk,
+            new_status=FriendRequest.REQUEST_ACCEPTED).count(), 1)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.followers_count, 1)
+        self.assertEqual(self.alice.request_count, 0)
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class CachedListInvalidationTests(FriendsTestCase):
+
+    def pending_ids(self, client):
+        response = client.get(reverse('list-pending-requests'))
+        return [row['id'] for row in response.data['data']['results']]
+
+    def test_lists_are_invalidated_once_the_transition_commits(self):
+        client = self.client_for(self.alice)
+        self.assertEqual(self.pending_ids(client), [])
+        version = cache.get_version(cache.PENDING_INBOX, self.alice.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            friend_request = self.send_request(self.bob, self.alice)
+        # Not before the commit, or the old rows could be cached again.
+        self.assertEqual(cache.get_version(cache.PENDING_INBOX, self.alice.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.pending_ids(client), [friend_request.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RespondFriendRequestView.save_status(
+                friend_request.pk, FriendRequest.REQUEST_ACCEPTED, self.alice)
+        self.assertEqual(self.pending_ids(client), [])
+        response = client.get(reverse('list-friends'))
+        self.assertEqual(len(response.data['data']['results']), 1)
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class PendingInboxSyncTests(FriendsTestCase):
+
+    def setUp(self):
+        self.friend_request = self.send_request(self.bob, self.alice)
+
+    def pending(self, client):
+        listed = client.get(reverse('list-pending-requests')).data['data']['results']
+        count = client.get(reverse('pending-requests-count')).data['data']['count']
+        return [row['from_user'] for row in listed], count
+
+    def save_bob(self, **changes):
+        bob = UserProfile.objects.get(pk=self.bob.pk)
+        for field, value in changes.items():
+            setattr(bob, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            bob.save()
+
+    def test_count_matches_the_cached_list(self):
+        client = self.client_for(self.alice)
+        self.assertEqual(self.pending(client), (['bob@example.com'], 1))
+        self.save_bob(is_active=False)
+        self.assertEqual(self.pending(client), ([], 0))
+        self.save_bob(is_active=True)
+        self.assertEqual(self.pending(client), (['bob@example.com'], 1))
+
+    def test_rename_updates_the_entries(self):
+        self.save_bob(first_name='Robert')
+        self.assertEqual(PendingInboxEntry.objects.get(
+            friend_request=self.friend_request).sender_first_name, 'Robert')
+
+    def test_saves_without_synced_changes_skip_the_inbox(self):
+        bob = UserProfile.objects.get(pk=self.bob.pk)
+        bob.date_of_birth = None
+        with self.assertNumQueries(1):
+            bob.save()
+        bob.first_name = 'Robert'
+        bob.save(update_fields=['last_login'])
+        # The unsaved rename is still synced by the next full save.
+        bob.save()
+        self.assertEqual(PendingInboxEntry.objects.get(
+            friend_request=self.friend_request).sender_first_name, 'Robert')
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class FriendListInvalidationTests(FriendsTestCase):
+
+    def setUp(self):
+        friend_request = self.send_request(self.bob, self.alice)
+        RespondFriendRequestView.save_status(
+            friend_request.pk, FriendRequest.REQUEST_ACCEPTED, self.alice)
+
+    def friends(self, client):
+        response = client.get(reverse('list-friends'))
+        return [(row['email'], row['first_name']) for row in response.data['data']['results']]
+
+    def save_bob(self, **changes):
+        bob = UserProfile.objects.get(pk=self.bob.pk)
+        for field, value in changes.items():
+            setattr(bob, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            bob.save()
+
+    def test_friend_changes_reach_the_cached_lists(self):
+        client = self.client_for(self.alice)
+        self.assertEqual(self.friends(client), [('bob@example.com', 'Bob')])
+        self.save_bob(first_name='Robert', email='robert@example.com')
+        self.assertEqual(self.friends(client), [('robert@example.com', 'Robert')])
+        self.save_bob(is_active=False)
+        self.assertEqual(self.friends(client), [])
+
+    def test_other_changes_keep_the_cached_lists(self):
+        version = cache.get_version(cache.FRIEND_LIST, self.alice.pk)
+        self.save_bob(date_of_birth=None)
+        self.assertEqual(cache.get_version(cache.FRIEND_LIST, self.alice.pk), version)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaPinTests(FriendsTestCase):
+
+    def test_both_sides_of_an_accepted_request_are_pinned(self):
+        friend_request = self.send_request(self.bob, self.alice)
+        self.assertFalse(is_pinned(self.bob.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            RespondFriendRequestView.save_status(
+                friend_request.pk, FriendRequest.REQUEST_ACCEPTED, self.alice)
+        self.assertTrue(is_pinned(self.alice.pk))
+        self.assertTrue(is_pinned(self.bob.pk))
+        self.assertFalse(is_pinned(self.carol.pk))
+
+
+class CounterRefreshTests(FriendsTestCase):
+
+    def test_refresh_is_idempotent_and_repairs_drift(self):
+        self.send_request(self.bob, self.alice)
+        accepted = self.send_request(self.carol, self.alice)
+        FriendRequest.objects.filter(pk=accepted.pk).update(
+            status=FriendRequest.REQUEST_ACCEPTED)
+        UserProfile.objects.filter(pk=self.alice.pk).update(
+            request_count=7, followers_count=7)
+        # A redelivered task runs the same refresh again.
+        for _ in range(2):
+            counters.refresh_counters([self.alice.pk, self.bob.pk])
+        self.alice.refresh_from_db()
+        self.assertEqual((self.alice.request_count, self.alice.followers_count), (1, 1))
+        self.bob.refresh_from_db()
+        self.assertEqual((self.bob.request_count, self.bob.followers_count), (0, 0))
+
+
+class AsyncAuthenticationTests(FriendsTestCase):
+
+    def count(self, client):
+        return client.get(reverse('async-pending-requests-count'))
+
+    def test_every_authentication_mode_is_used(self):
+        self.send_request(self.bob, self.alice)
+        for mode in settings.JWT_AUTHENTICATION_CLASSES:
+            with self.subTest(mode), self.settings(JWT_AUTHENTICATION=mode):
+                response = self.count(self.token_client_for(self.alice))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['data']['count'], 1)
+
+    @override_settings(JWT_AUTHENTICATION='database')
+    def test_database_mode_rejects_deactivated_users(self):
+        client = self.token_client_for(self.alice)
+        UserProfile.objects.filter(pk=self.alice.pk).update(is_active=False)
+        response = self.count(client)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_missing_token_is_rejected(self):
+        self.assertEqual(self.count(Client()).status_code, 401)
+
+
+class FriendSuggestionTests(FriendsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.dave, cls.erin, cls.frank = [
+            UserProfile.objects.create_user('%s@example.com' % name)
+            for name in ('dave', 'erin', 'frank')]
+        add_friendships((user.pk, friend.pk) for user, friend in (
+            (cls.alice, cls.bob), (cls.alice, cls.carol),
+            (cls.bob, cls.dave), (cls.bob, cls.erin),
+            (cls.carol, cls.dave), (cls.carol, cls.frank)))
+
+    def stored(self, user):
+        return list(FriendSuggestion.objects.filter(user=user).order_by(
+            '-mutual_count', 'suggested_id').values_list('suggested_id', 'mutual_count'))
+
+    def test_mutual_friends(self):
+        self.assertEqual(suggestions.mutual_friend_ids(self.alice.pk, self.dave.pk),
+                         sorted([self.bob.pk, self.carol.pk]))
+        self.assertEqual(suggestions.mutual_friend_ids(self.alice.pk, self.erin.pk),
+                         [self.bob.pk])
+
+    def test_friends_self_and_requested_users_are_excluded(self):
+        self.send_request(self.alice, self.frank)
+        adjacency = suggestions.load_adjacency(
+            [self.alice.pk, self.bob.pk, self.carol.pk])
+        self.assertEqual(suggestions.compute_suggestions(self.alice.pk, adjacency, 10), [
+            (self.dave.pk, 2), (self.erin.pk, 1)])
+        self.assertEqual(suggestions.compute_suggestions(self.alice.pk, adjacency, 1), [
+            (self.dave.pk, 2)])
+
+    def test_refresh_command(self):
+        # A user who lost every friend keeps no suggestions.
+        lonely = UserProfile.objects.create_user('lonely@example.com')
+        FriendSuggestion.objects.create(user=lonely, suggested=self.dave, mutual_count=1)
+        call_command('refresh_friend_suggestions', stdout=io.StringIO())
+        self.assertEqual(self.stored(self.alice), [
+            (self.dave.pk, 2), (self.erin.pk, 1), (self.frank.pk, 1)])
+        self.assertEqual(self.stored(self.dave), [
+            (self.alice.pk, 2), (self.erin.pk, 1), (self.frank.pk, 1)])
+        self.assertEqual(self.stored(lonely), [])
+
+        self.send_request(self.alice, self.frank)
+        call_command('refresh_friend_suggestions', users=[self.alice.pk],
+                     stdout=io.StringIO())
+        self.assertEqual(self.stored(self.alice), [(self.dave.pk, 2), (self.erin.pk, 1)])
+
+
+class ExportGraphTests(FriendsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.accepted = FriendRequest.objects.create(
+            created_by=cls.bob, modified_by=cls.bob, to_user=cls.alice,
+            status=FriendRequest.REQUEST_ACCEPTED)
+        FriendRequest.objects.create(
+            created_by=cls.carol, modified_by=cls.carol, to_user=cls.alice)
+
+    def export(self, *args, **options):
+        stdout = io.StringIO()
+        call_command('export_graph', *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('friendships', format='csv'))))
+        self.assertEqual(rows, [
+            ['id', 'source', 'target', 'requested_on', 'accepted_on'],
+            [str(self.accepted.pk), str(self.bob.pk), str(self.alice.pk),
+             self.accepted.created_on.isoformat(),
+             self.accepted.modified_on.isoformat()]])
+
+    def test_jsonl(self):
+        lines = self.export('users', format='jsonl').splitlines()
+        users = [json.loads(line) for line in lines]
+        self.assertEqual([user['email'] for user in users], [
+            'alice@example.com', 'bob@example.com', 'carol@example.com'])
+        self.assertEqual(list(users[0]), [
+            'id', 'email', 'first_name', 'last_name', 'date_of_birth',
+            'date_joined', 'is_active', 'followers_count'])
+        self.assertEqual(users[0]['first_name'], 'Alice')
+
+    def test_edgelist(self):
+        self.assertEqual(self.export('friendships', format='edgelist'),
+                         '%d %d\n' % (self.bob.pk, self.alice.pk))
+
+    def test_keyset_batches_without_server_side_cursors(self):
+        expected = self.export('users', format='csv')
+        with mock.patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            self.assertEqual(self.export('users', format='csv', chunk_size=2), expected)
+
+    def test_users_have_no_edgelist(self):
+        with self.assertRaises(CommandError):
+            self.export('users', format='edgelist')
+
+
+@override_settings(
+    CACHES=dict(settings.CACHES, uncached={
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}),
+    FRIENDS_CACHE_ALIAS='uncached')
+class RowFormatterTests(FriendsTestCase):
+    """
+    The row formatters produce exactly the output of the serializers,
+    empty pages included.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        FriendRequest.objects.create(
+            created_by=cls.bob, modified_by=cls.bob, to_user=cls.alice)
+        for sender, recipient in ((cls.carol, cls.alice), (cls.carol, cls.bob)):
+            FriendRequest.objects.create(
+                created_by=sender, modified_by=sender, to_user=recipient,
+                status=FriendRequest.REQUEST_ACCEPTED)
+
+    def assert_views_agree(self, name, *args):
+        for user in (self.alice, self.bob):
+            client = self.client_for(user)
+            pages = []
+            for fast in (True, False):
+                with self.subTest(name, user=user.email, fast=fast), \
+                        self.settings(FAST_LIST_SERIALIZATION=fast):
+                    response = client.get(reverse(name, args=args))
+                    self.assertEqual(response.status_code, 200)
+                    pages.append(response.json())
+            self.assertEqual(pages[0], pages[1])
+
+    def test_pending_list(self):
+        queryset = FriendRequest.objects.select_related('created_by', 'to_user')
+        for page in (queryset.order_by('id'), queryset.none()):
+            self.assertEqual(
+                FriendRequestRowFormatter().format(
+                    page.values(*FriendRequestRowFormatter.fields)),
+                FriendRequestSerializer(page, many=True).data)
+        self.assert_views_agree('list-pending-requests')
+
+    def test_friend_list(self):
+        self.assert_views_agree('list-friends')
+
+    def test_mutual_friend_list(self):
+        # Carol is the only friend Alice and Bob have in common.
+        self.assert_views_agree('list-mutual-friends', self.bob.pk)
+        self.assert_views_agree('list-mutual-friends', self.carol.pk)
+
+
+class SendFriendRequestRateLimitTests(FriendsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.others = [
+            UserProfile.objects.create_user('user%d@example.com' % number, 'password')
+            for number in range(4)]
+
+    def send(self, client, to_user):
+        return client.post(reverse('send-friend-request'), {'to_user': to_user}, format='json')
+
+    def test_limit(self):
+        client = self.client_for(self.alice)
+        for user in self.others[:3]:
+            self.assertEqual(self.send(client, user.pk).status_code, 200)
+        self.assertEqual(self.send(client, self.others[3].pk).status_code, 400)
+        self.assertEqual(FriendRequest.objects.filter(created_by=self.alice).count(), 3)
+
+    def test_invalid_and_duplicate_requests_are_not_charged(self):
+        client = self.client_for(self.alice)
+        self.assertEqual(self.send(client, self.others[0].pk).status_code, 200)
+        for _ in range(3):
+            self.assertEqual(self.send(client, 0).status_code, 400)
+            self.assertEqual(self.send(client, self.others[0].pk).status_code, 400)
+        for user in self.others[1:3]:
+            self.assertEqual(self.send(client, user.pk).status_code, 200)
+
+    def test_async_duplicate_requests_are_not_charged(self):
+        client = self.token_client_for(self.alice)
+        url = reverse('async-send-friend-request')
+        for _ in range(3):
+            response = client.post(
+                url, {'to_user': self.others[0].pk}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        for user in self.others[1:3]:
+            response = client.post(
+                url, {'to_user': user.pk}, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+    def test_bulk_requests_are_charged_to_the_send_limit(self):
+        client = self.client_for(self.alice)
+        url = reverse('bulk-send-friend-request')
+        response = client.post(
+            url, {'to_users': [user.pk for user in self.others]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FriendRequest.objects.filter(created_by=self.alice).exists())
+
+        response = client.post(
+            url, {'to_users': [self.others[0].pk, self.others[1].pk, 0]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.send(client, self.others[2].pk).status_code, 200)
+        self.assertEqual(self.send(client, self.others[3].pk).status_code, 400)
+
+    def test_rejected_bulk_items_are_not_charged(self):
+        client = self.client_for(self.alice)
+        url = reverse('bulk-send-friend-request')
+        self.assertEqual(self.send(client, self.others[0].pk).status_code, 200)
+        # Only the new request is charged: not the unknown user, the user
+        # themselves or the request already sent.
+        response = client.post(url, {'to_users': [
+            self.others[1].pk, 0, self.alice.pk, self.others[0].pk]}, format='json')
+        self.assertEqual([item['result'] for item in response.data['data']], [
+            'sent', 'not_found', 'invalid', 'already_sent'])
+        # Requests sent concurrently fail the whole insert and are refunded.
+        with mock.patch.object(FriendRequest.objects, 'bulk_create',
+                               side_effect=IntegrityError):
+            response = client.post(url, {'to_users': [self.others[2].pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.send(client, self.others[2].pk).status_code, 200)
+        self.assertEqual(self.send(client, self.others[3].pk).status_code, 400)
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class BulkRespondFriendRequestTests(FriendsTestCase):
+
+    def test_accepted_request_cannot_be_reverted_to_pending(self):
+        friend_request = self.send_request(self.bob, self.alice)
+        client = self.client_for(self.alice)
+        url = reverse('bulk-respond-request')
+        response = client.put(url, {'requests': [
+            {'id': friend_request.pk, 'status': 'accepted'}]}, format='json')
+        self.assertEqual(response.data['data'], [{'id': friend_request.pk, 'result': 'updated'}])
+
+        response = client.put(url, {'requests': [
+            {'id': friend_request.pk, 'status': 'pending'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        friend_request.refresh_from_db()
+        self.assertEqual(friend_request.status, FriendRequest.REQUEST_ACCEPTED)
+        self.assertTrue(Friendship.objects.filter(user=self.alice, friend=self.bob).exists())
+
+
+class IndexTests(FriendsTestCase):
+
+    def get_indexes(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table)
+        return {
+            name: constraint['columns'] for name, constraint in constraints.items()
+            if constraint['index']}
+
+    def test_indexes_exist(self):
+        for model, name, columns in (
+                (FriendRequest, 'friendreq_pending_inbox_idx',
+                 ['to_user_id', 'created_on', 'id']),
+                (FriendRequest, 'friendreq_to_user_status_idx',
+                 ['to_user_id', 'status']),
+                (FriendSuggestion, 'friendsuggestion_rank_idx',
+                 ['user_id', 'mutual_count', 'suggested_id']),
+                (PendingInboxEntry, 'pendinginbox_user_idx',
+                 ['user_id', 'created_on', 'friend_request_id'])):
+            self.assertEqual(self.get_indexes(model).get(name), columns, name)
+
+    def test_friend_requests_are_unique_per_pair(self):
+        self.assertIn(['created_by_id', 'to_user_id'],
+                      list(self.get_indexes(FriendRequest).values()))
+
+    @skipUnless(connection.vendor in SEQUENTIAL_SCAN_PATTERNS, 'Plans are checked on PostgreSQL and SQLite.')
+    def test_hot_queries_do_not_scan_tables(self):
+        pattern = SEQUENTIAL_SCAN_PATTERNS[connection.vendor]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # The test tables are tiny; what matters is that an index path exists.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, view_class, params in HOT_QUERIES:
+            with self.subTest(name):
+                queryset = build_queryset(view_class, self.alice, params)
+                if queryset.query.is_empty():
+                    continue
+                plan = queryset.explain()
+                self.assertEqual(pattern.findall(plan), [], plan)
+
+
+@override_settings(
+    CACHES=dict(settings.CACHES, uncached={
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}),
+    FRIENDS_CACHE_ALIAS='uncached')
+class ListQueryCountTests(FriendsTestCase):
+    """
+    Every list page is a single query, whatever its size, with both the row
+    formatters and the serializers.
+    """
+    page_sizes = (1, 10, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(2 * max(cls.page_sizes)):
+            other = UserProfile.objects.create_user('user%d@example.com' % number)
+            friend_request = FriendRequest.objects.create(
+                created_by=other, modified_by=other, to_user=cls.alice)
+            if number % 2:
+                friend_request.status = FriendRequest.REQUEST_ACCEPTED
+                friend_request.save()
+
+    def assert_queries_per_page(self, name, queries):
+        client = self.client_for(self.alice)
+        for fast in (True, False):
+            for page_size in self.page_sizes:
+                with self.subTest(fast=fast, page_size=page_size), \
+                        self.settings(FAST_LIST_SERIALIZATION=fast), \
+                        self.assertNumQueries(queries):
+                    response = client.get(reverse(name), {'page_size': page_size})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['data']['results']), page_size)
+
+    def test_friend_list(self):
+        self.assert_queries_per_page('list-friends', 1)
+
+    def test_pending_list(self):
+        self.assert_queries_per_page('list-pending-requests', 1)
@@ -0,0 +1,26 @@
+from collections import namedtuple
+
+from django.dispatch import Signal
+
+
+StatusTransition = namedtuple('StatusTransition', (
+    'friend_request_id', 'created_by_id', 'to_user_id',
+    'old_status', 'new_status'))
+StatusTransition.__doc__ = """
+Change of a friend request status. A status of None stands for a request
+that does not exist (before it is created or after it is deleted).
+"""
+
+# Sent with `transitions`, a list of StatusTransition, whenever friend
+# requests are created, change status or are deleted, either one at a time
+# through the model signals or in bulk.
+status_changed = Signal()
+
+
+def transition_for(friend_request, old_status, new_status):
+    """
+    Build the StatusTransition of a friend request instance.
+    """
+    return StatusTransition(
+        friend_request.pk, friend_request.created_by_id,
+        friend_request.to_user_id, old_status, new_status)
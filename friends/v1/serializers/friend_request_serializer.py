@@ -1,21 +1,26 @@
 from rest_framework import serializers
 
-from datetime import timedelta
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
+from core.formatters import (
+    DATETIME_FORMAT, format_datetime, get_output_timezone)
+from core.instrumentation import TimedSerializerMixin
 from friends.models import FriendRequest
+from friends.transitions import status_changed, transition_for
+from user_profile.models import UserProfile
 
 
-class FriendRequestSerializer(serializers.ModelSerializer):
+class FriendRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for handling friend requests.
     """
     to_user_name = serializers.CharField(source='to_user.email', required=False)
     from_user = serializers.CharField(source='created_by.email', required=False)
     created_on = serializers.DateTimeField(
-        format='%d/%m/%Y %H:%M:%S', required=False, allow_null=True)
+        format=DATETIME_FORMAT, required=False, allow_null=True)
     modified_on = serializers.DateTimeField(
-        format='%d/%m/%Y %H:%M:%S', required=False, allow_null=True)
+        format=DATETIME_FORMAT, required=False, allow_null=True)
     class Meta:
         model = FriendRequest
         fields = ('id', 'status', 'created_by', 'to_user', 'to_user_name','from_user',
@@ -25,7 +30,9 @@ class FriendRequestSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         Create a new friend request.
-        Ensures that a duplicate friend request is not created.
+        Ensures that a duplicate friend request is not created; duplicates are
+        rejected by the unique constraint on (created_by, to_user) rather than
+        by a separate lookup.
         param:
         validated_data (dict): The validated data for creating a friend request.
         Returns:
@@ -35,23 +42,192 @@ class FriendRequestSerializer(serializers.ModelSerializer):
         """
         created_by = self.context['request'].user
         modified_by = self.context['request'].user
-        to_user = validated_data['to_user']
-        
-        request_exist = FriendRequest.objects.filter(
-            created_by=created_by, to_user=to_user, 
-            status=FriendRequest.REQUEST_PENDING
-            ).exists()
-        if request_exist:
+
+        try:
+            with transaction.atomic():
+                created_object = FriendRequest.objects.create(
+                    created_by=created_by,
+                    modified_by=modified_by,
+                    **validated_data)
+        except IntegrityError:
             raise serializers.ValidationError("Friend request already sent.")
-        
-        last_minute = timezone.now() - timedelta(minutes=1)
-        request_count = FriendRequest.objects.filter(
-            created_by=created_by, created_on__gte=last_minute).count()
-        if request_count >= 3:
-            raise serializers.ValidationError("You can only send 3 friend requests per minute.")
-
-        created_object = FriendRequest.objects.create(
-            created_by=created_by, 
-            modified_by=modified_by,
-            **validated_data)
-        return created_object
\ No newline at end of file
+        return created_object
+
+
+# Answers only: a request cannot be put back to pending.
+RESPONSE_STATUSES = (
+    (FriendRequest.REQUEST_ACCEPTED, 'Accepted'),
+    (FriendRequest.REQUEST_REJECTED, 'Rejected'),
+)
+
+
+def validate_response_status(data):
+    """
+    Validate the status a friend request is responded with.
+    param:
+    data (dict): The request data, with the required status.
+    Returns:
+    str: One of the `RESPONSE_STATUSES`.
+    Raises:
+    serializers.ValidationError: If the status is missing or not an answer.
+    """
+    field = serializers.ChoiceField(choices=RESPONSE_STATUSES)
+    try:
+        return field.run_validation(data.get('status', serializers.empty))
+    except serializers.ValidationError as e:
+        raise serializers.ValidationError({'status': e.detail})
+
+
+class FriendRequestRowFormatter:
+    """
+    Format `values()` rows of friend requests exactly like
+    `FriendRequestSerializer`, without the per-field serializer machinery.
+    """
+    fields = ('id', 'status', 'created_by', 'to_user', 'to_user__email',
+              'created_by__email', 'created_on', 'modified_on')
+
+    def format(self, rows):
+        """
+        :param rows: The `values()` rows, with at least `fields`.
+        :return: List of dicts in the serializer's field order.
+        """
+        tz = get_output_timezone()
+        return [{
+            'id': row['id'],
+            'status': row['status'],
+            'created_by': row['created_by'],
+            'to_user': row['to_user'],
+            'to_user_name': row['to_user__email'],
+            'from_user': row['created_by__email'],
+            'created_on': format_datetime(row['created_on'], DATETIME_FORMAT, tz),
+            'modified_on': format_datetime(row['modified_on'], DATETIME_FORMAT, tz),
+        } for row in rows]
+
+
+MAX_BULK_ITEMS = 100
+
+
+class BulkFriendRequestSerializer(serializers.Serializer):
+    """
+    Serializer for sending friend requests to many users at once.
+    """
+    to_users = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False,
+        max_length=MAX_BULK_ITEMS)
+
+    def create(self, validated_data):
+        """
+        Create friend requests to every valid target user with a single
+        bulk insert. The number of requests to create is passed to the
+        `charge_requests` context callable first, if any, which may reject
+        the call, and to `refund_requests` if the insert fails.
+        param:
+        validated_data (dict): The validated list of target user ids.
+        Returns:
+        list: One result dict per target user, in request order.
+        """
+        user = self.context['request'].user
+        to_user_ids = list(dict.fromkeys(validated_data['to_users']))
+
+        active_ids = set(UserProfile.objects.filter(
+            id__in=to_user_ids, is_active=True).values_list('id', flat=True))
+        requested_ids = set(FriendRequest.objects.filter(
+            created_by=user, to_user_id__in=to_user_ids
+        ).values_list('to_user_id', flat=True))
+
+        results = []
+        new_requests = []
+        for to_user_id in to_user_ids:
+            if to_user_id == user.pk:
+                result = 'invalid'
+            elif to_user_id not in active_ids:
+                result = 'not_found'
+            elif to_user_id in requested_ids:
+                result = 'already_sent'
+            else:
+                result = 'sent'
+                new_requests.append(FriendRequest(
+                    created_by=user, modified_by=user, to_user_id=to_user_id))
+            results.append({'to_user': to_user_id, 'result': result})
+
+        charge_requests = self.context.get('charge_requests')
+        if charge_requests is not None and new_requests:
+            charge_requests(len(new_requests))
+
+        try:
+            with transaction.atomic():
+                created = FriendRequest.objects.bulk_create(new_requests)
+                status_changed.send(sender=FriendRequest, transitions=[
+                    transition_for(friend_request, None, friend_request.status)
+                    for friend_request in created])
+        except IntegrityError:
+            refund_requests = self.context.get('refund_requests')
+            if refund_requests is not None and new_requests:
+                refund_requests(len(new_requests))
+            raise serializers.ValidationError(
+                "Some friend requests were sent concurrently, please retry.")
+
+        request_ids = {
+            friend_request.to_user_id: friend_request.pk
+            for friend_request in created}
+        for result in results:
+            if result['result'] == 'sent':
+                result['id'] = request_ids[result['to_user']]
+        return results
+
+
+class FriendRequestStatusSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=RESPONSE_STATUSES)
+
+
+class BulkRespondFriendRequestSerializer(serializers.Serializer):
+    """
+    Serializer for accepting or rejecting many received friend requests at
+    once.
+    """
+    requests = serializers.ListField(
+        child=FriendRequestStatusSerializer(), allow_empty=False,
+        max_length=MAX_BULK_ITEMS)
+
+    def create(self, validated_data):
+        """
+        Update the status of the friend requests with a single bulk update.
+        Requests not sent to the authenticated user are reported as not found.
+        param:
+        validated_data (dict): The validated list of {id, status} items.
+        Returns:
+        list: One result dict per item, in request order.
+        """
+        user = self.context['request'].user
+        items = validated_data['requests']
+        now = timezone.now()
+
+        with transaction.atomic():
+            friend_requests = FriendRequest.objects.select_for_update().filter(
+                id__in=[item['id'] for item in items], to_user=user
+            ).only('id', 'status', 'created_by_id', 'to_user_id').in_bulk()
+
+            results = []
+            transitions = []
+            changed = {}
+            for item in items:
+                friend_request = friend_requests.get(item['id'])
+                if friend_request is None:
+                    result = 'not_found'
+                elif friend_request.status == item['status']:
+                    result = 'unchanged'
+                else:
+                    result = 'updated'
+                    transitions.append(transition_for(
+                        friend_request, friend_request.status, item['status']))
+                    friend_request.status = item['status']
+                    friend_request.modified_by = user
+                    friend_request.modified_on = now
+                    changed[friend_request.pk] = friend_request
+                results.append({'id': item['id'], 'result': result})
+
+            FriendRequest.objects.bulk_update(
+                changed.values(), ['status', 'modified_by', 'modified_on'])
+            status_changed.send(sender=FriendRequest, transitions=transitions)
+        return results
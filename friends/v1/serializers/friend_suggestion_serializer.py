@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from friends.models import FriendSuggestion
+
+
+class FriendSuggestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for friend suggestions.
+    """
+    id = serializers.IntegerField(source='suggested_id')
+    email = serializers.CharField(source='suggested.email')
+    first_name = serializers.CharField(source='suggested.first_name')
+    last_name = serializers.CharField(source='suggested.last_name')
+
+    class Meta:
+        model = FriendSuggestion
+        fields = ('id', 'email', 'first_name', 'last_name', 'mutual_count')
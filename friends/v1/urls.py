@@ -1,13 +1,35 @@
 from django.urls import path
 
+from friends.v1.views.friend_export import ExportGraphView
 from friends.v1.views.friend_request import (
-    ListFriendsView, ListPendingFriendRequestsView, 
-    RespondFriendRequestView, SendFriendRequestView)
+    BulkRespondFriendRequestView, BulkSendFriendRequestView,
+    ListFriendsView, ListPendingFriendRequestsView,
+    PendingFriendRequestCountView, RespondFriendRequestView,
+    SendFriendRequestView)
+from friends.v1.views.friend_request_async import (
+    AsyncListFriendsView, AsyncListPendingFriendRequestsView,
+    AsyncPendingFriendRequestCountView, AsyncRespondFriendRequestView,
+    AsyncSendFriendRequestView)
+from friends.v1.views.friend_suggestion import (
+    ListFriendSuggestionsView, ListMutualFriendsView)
 
 
 urlpatterns = [
     path('send-request/', SendFriendRequestView.as_view(), name='send-friend-request'),
+    path('send-request/bulk/', BulkSendFriendRequestView.as_view(), name='bulk-send-friend-request'),
     path('respond-request/<int:id>/', RespondFriendRequestView.as_view(), name='respond-request'),
+    path('respond-request/bulk/', BulkRespondFriendRequestView.as_view(), name='bulk-respond-request'),
     path('friend-list/', ListFriendsView.as_view(), name='list-friends'),
     path('request-pending/', ListPendingFriendRequestsView.as_view(), name='list-pending-requests'),
+    path('request-pending/count/', PendingFriendRequestCountView.as_view(), name='pending-requests-count'),
+    path('suggestions/', ListFriendSuggestionsView.as_view(), name='list-friend-suggestions'),
+    path('mutual-friends/<int:user_id>/', ListMutualFriendsView.as_view(), name='list-mutual-friends'),
+    path('export/', ExportGraphView.as_view(), name='export-graph'),
+
+    # Async views, for deployments served by an ASGI server.
+    path('async/send-request/', AsyncSendFriendRequestView.as_view(), name='async-send-friend-request'),
+    path('async/respond-request/<int:id>/', AsyncRespondFriendRequestView.as_view(), name='async-respond-request'),
+    path('async/friend-list/', AsyncListFriendsView.as_view(), name='async-list-friends'),
+    path('async/request-pending/', AsyncListPendingFriendRequestsView.as_view(), name='async-list-pending-requests'),
+    path('async/request-pending/count/', AsyncPendingFriendRequestCountView.as_view(), name='async-pending-requests-count'),
 ]
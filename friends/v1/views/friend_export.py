@@ -0,0 +1,58 @@
+from django.db import router
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from friends import export
+from user_profile.permissions import IsStaffUser
+
+
+class ExportGraphView(APIView):
+    """
+    Admin-only API streaming the users or the friendships (accepted friend
+    requests) as CSV, JSON lines or an edge list.
+    Query parameters: `kind` (users, friendships), `output` (csv, jsonl,
+    edgelist) and `chunk_size`.
+    The response is produced while the rows are read, which needs a WSGI
+    server: Django 4.2 buffers synchronous streaming responses under ASGI,
+    where the `export_graph` command should be used instead.
+    """
+    permission_classes = [IsStaffUser]
+    max_chunk_size = 10000
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET request streaming an export.
+        param:
+        request (Request): The request object with the export parameters.
+        Returns:
+        StreamingHttpResponse: The export, or a Response with error messages.
+        """
+        kind = request.query_params.get('kind', export.FRIENDSHIPS)
+        output_format = request.query_params.get('output', export.CSV)
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', 2000))
+        except ValueError:
+            chunk_size = 0
+        if not 0 < chunk_size <= self.max_chunk_size:
+            return Response({
+                    "errors": "chunk_size must be between 1 and %d." % self.max_chunk_size,
+                    "status": "F"
+                }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # The rows are read after the view returned, outside the request's
+            # read routing, so the database is picked now.
+            lines = export.export(
+                kind, output_format, chunk_size,
+                using=router.db_for_read(export.get_queryset(kind).model))
+        except export.ExportError as e:
+            return Response({"errors": str(e), "status": "F"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            lines, content_type=export.CONTENT_TYPES[output_format])
+        extension = 'txt' if output_format == export.EDGELIST else output_format
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (
+            kind, extension)
+        return response
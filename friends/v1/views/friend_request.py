@@ -3,21 +3,64 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 
-from django.db.models import Q
+from django.db import transaction
+from django.utils.http import parse_etags
 
+from core.ratelimit import get_rate_limiter
+from core.views import RowFormatterMixin
+from friends import cache, inbox
 from friends.models import FriendRequest
 from user_profile.models import UserProfile
-from friends.v1.serializers.friend_request_serializer import FriendRequestSerializer
-from user_profile.v1.serializers.user_registration_serializer import UserSearchSerializer
+from friends.v1.serializers.friend_request_serializer import (
+    BulkFriendRequestSerializer, BulkRespondFriendRequestSerializer,
+    FriendRequestRowFormatter, FriendRequestSerializer, validate_response_status)
+from user_profile.v1.serializers.user_registration_serializer import (
+    UserSearchRowFormatter, UserSearchSerializer)
+from user_profile.v1.pagination import KeysetPagination
 
 
-class SendFriendRequestView(generics.CreateAPIView):
+class RateLimitMixin:
+    """
+    Mixin consulting the rate limiter configured for `rate_limit_scope`.
+    """
+    rate_limit_scope = None
+    rate_limit_message = "You can only send {num} friend requests per {period}."
+
+    def check_rate_limit(self, request, cost=1, scope=None, message=None):
+        """
+        Charge the request to the rate limiter. Called once the request has
+        been validated, so invalid requests do not use up the quota.
+        param:
+        request (Request): The request object.
+        cost (int): Number of requests charged.
+        scope (str): The limited scope, `rate_limit_scope` by default.
+        message (str): The error message, `rate_limit_message` by default.
+        Raises:
+        ValidationError: If the user exceeded the rate limit.
+        """
+        limiter = get_rate_limiter(scope or self.rate_limit_scope)
+        if limiter is not None and not limiter.hit(request.user.pk, cost):
+            raise ValidationError((message or self.rate_limit_message).format(
+                num=limiter.num_requests, period=limiter.period_name))
+
+    def refund_rate_limit(self, request, cost=1, scope=None):
+        """
+        Give back charged requests which failed, e.g. a duplicate.
+        """
+        limiter = get_rate_limiter(scope or self.rate_limit_scope)
+        if limiter is not None:
+            limiter.refund(request.user.pk, cost)
+
+
+class SendFriendRequestView(RateLimitMixin, generics.CreateAPIView):
     """
     API to send a friend request.
-    Ensures that a user cannot send more than 3 friend requests within a minute.
+    Ensures that a user cannot send more friend requests than allowed by the
+    `send-friend-request` rate limit (3 per minute by default).
     """
     serializer_class = FriendRequestSerializer
     permission_classes = [IsAuthenticated]
+    rate_limit_scope = 'send-friend-request'
 
     def create(self, request, *args, **kwargs):
         """
@@ -28,7 +71,15 @@ class SendFriendRequestView(generics.CreateAPIView):
         Response: The response object with created friend request data or error messages.
         """
         try:
-            super().create(request, *args, **kwargs)
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            self.check_rate_limit(request)
+            try:
+                self.perform_create(serializer)
+            except ValidationError:
+                # Duplicates are only detected by the insert.
+                self.refund_rate_limit(request)
+                raise
             return Response({
                     'message': 'Request has been sent successfully',
                     'status': 'S'
@@ -61,17 +112,15 @@ class RespondFriendRequestView(generics.UpdateAPIView):
         """
         
         instance = self.get_object()
-        if instance.to_user != request.user:
+        if instance.to_user_id != request.user.pk:
             return Response(
                 {"error": "You cannot respond to this friend request.",
                  "status": "F"
                  }, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            request_data = request.data
-            if instance.status != request_data.get('status'):
-                instance.status = request_data.get('status', FriendRequest.REQUEST_PENDING)
-                instance.save()
+            new_status = validate_response_status(request.data)
+            self.save_status(instance.pk, new_status, request.user)
             return Response({"status": "S", "message": "Friend request has been updated."}, 
                             status=status.HTTP_200_OK)
         except ValidationError as e:
@@ -80,14 +129,160 @@ class RespondFriendRequestView(generics.UpdateAPIView):
         except Exception as e:
             return Response({"errors": str(e), "status": "F"}, 
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def save_status(friend_request_id, new_status, user):
+        """
+        Set the status of a friend request.
+        The row is locked and read again first, so of two concurrent
+        responses only the first one changes the status and announces the
+        transition.
+        param:
+        friend_request_id (int): The ID of the friend request.
+        new_status (str): The validated new status.
+        user (UserProfile): The responding user.
+        """
+        with transaction.atomic():
+            instance = FriendRequest.objects.select_for_update().get(pk=friend_request_id)
+            if instance.status != new_status:
+                instance.status = new_status
+                instance.modified_by = user
+                instance.save(update_fields=['status', 'modified_by', 'modified_on'])
         
 
-class ListFriendsView(generics.ListAPIView):
+class BulkSendFriendRequestView(RateLimitMixin, generics.GenericAPIView):
+    """
+    API to send friend requests to a list of users in one call.
+    Calls are limited by the `bulk-send-friend-request` rate limit, and every
+    friend request they create is charged to the `send-friend-request` one,
+    so bulk calls cannot send more requests than single ones.
+    """
+    serializer_class = BulkFriendRequestSerializer
+    permission_classes = [IsAuthenticated]
+    rate_limit_scope = 'bulk-send-friend-request'
+    rate_limit_message = "You can only send {num} bulk friend requests per {period}."
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['charge_requests'] = self.charge_requests
+        context['refund_requests'] = self.refund_requests
+        return context
+
+    def charge_requests(self, count):
+        """
+        Charge the friend requests about to be created to the
+        `send-friend-request` rate limit.
+        Raises:
+        ValidationError: If the user would exceed the rate limit.
+        """
+        self.check_rate_limit(
+            self.request, count, scope=SendFriendRequestView.rate_limit_scope,
+            message=SendFriendRequestView.rate_limit_message)
+
+    def refund_requests(self, count):
+        """
+        Give back charged friend requests which could not be created.
+        """
+        self.refund_rate_limit(
+            self.request, count, scope=SendFriendRequestView.rate_limit_scope)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Handle POST request to send friend requests.
+        param:
+        request (Request): The request object with the `to_users` id list.
+        Returns:
+        Response: The response object with a result per target user or error messages.
+        """
+        try:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            self.check_rate_limit(request)
+            try:
+                results = serializer.save()
+            except ValidationError:
+                # Nothing was sent, the call does not count either.
+                self.refund_rate_limit(request)
+                raise
+            return Response({"data": results, "status": "S"},
+                            status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"errors": e.detail, "status": "F"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"errors": str(e), "status": "F"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BulkRespondFriendRequestView(generics.GenericAPIView):
+    """
+    API to accept or reject a list of received friend requests in one call.
+    """
+    serializer_class = BulkRespondFriendRequestSerializer
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, *args, **kwargs):
+        """
+        Handle PUT request to respond to friend requests.
+        param:
+        request (Request): The request object with the `requests` list of
+        {id, status} items.
+        Returns:
+        Response: The response object with a result per item or error messages.
+        """
+        try:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            results = serializer.save()
+            return Response({"data": results, "status": "S"},
+                            status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"errors": e.detail, "status": "F"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"errors": str(e), "status": "F"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CachedListMixin:
+    """
+    Mixin caching the list response of the authenticated user.
+    Cached responses are invalidated by `friends.signals` when friend requests
+    affecting the user change, and an unchanged response is answered with
+    304 Not Modified when the client sends its ETag in If-None-Match.
+    """
+    cache_scope = None
+
+    def list(self, request, *args, **kwargs):
+        etag = cache.get_etag(
+            self.cache_scope, request.user.pk, request.build_absolute_uri())
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response_cache = cache.get_cache()
+        key = cache.get_response_key(self.cache_scope, request.user.pk, etag)
+        data = response_cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            response_cache.set(key, data, cache.get_cache_timeout())
+        return Response({
+                "data": data,
+                'status': 'S'
+            }, status=status.HTTP_200_OK, headers=headers)
+
+
+class ListFriendsView(CachedListMixin, RowFormatterMixin, generics.ListAPIView):
     """
-    API to list friends (accepted friend requests).
+    API to list friends (accepted friend requests in either direction).
+    Results are keyset paginated on the friend id.
     """
     serializer_class = UserSearchSerializer
+    row_formatter_class = UserSearchRowFormatter
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id',)
+    cache_scope = cache.FRIEND_LIST
 
     def get_queryset(self):
         """
@@ -96,42 +291,58 @@ class ListFriendsView(generics.ListAPIView):
         Queryset of active users who are friends with the authenticated user.
         """
         user = self.request.user
-        friend_requests = FriendRequest.objects.filter(
-            Q(created_by=user, status=FriendRequest.REQUEST_ACCEPTED) 
-        )
-        friend_ids = friend_requests.values_list('to_user_id')
-        queryset = UserProfile.objects.filter(id__in=friend_ids, is_active=True)
+        queryset = UserProfile.objects.filter(
+            friend_of__user=user, is_active=True)
         return queryset
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        return Response({
-                "data": response.data,
-                'status': 'S'
-            }, status=status.HTTP_200_OK)
-    
 
-class ListPendingFriendRequestsView(generics.ListAPIView):
+class ListPendingFriendRequestsView(CachedListMixin, RowFormatterMixin,
+                                    generics.ListAPIView):
     """
     API to list pending friend requests (received).
+    Results are keyset paginated, newest first.
     """
     serializer_class = FriendRequestSerializer
+    row_formatter_class = FriendRequestRowFormatter
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_on', '-id')
+    cache_scope = cache.PENDING_INBOX
 
     def get_queryset(self):
         """
         Get the list of pending friend requests for the authenticated user.
         Returns:
-        Queryset of pending friend requests received by the authenticated user from active users.
+        Queryset of pending friend requests received by the authenticated user from active users,
+        with the sender and recipient emails joined in for the serializer.
         """
         user = self.request.user
         queryset = FriendRequest.objects.filter(
-            to_user=user, status=FriendRequest.REQUEST_PENDING, created_by__is_active=True)
+            to_user=user, status=FriendRequest.REQUEST_PENDING, created_by__is_active=True
+        ).select_related('to_user', 'created_by').only(
+            'id', 'status', 'created_on', 'modified_on',
+            'to_user__email', 'created_by__email')
         return queryset
-    
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
+
+
+class PendingFriendRequestCountView(generics.GenericAPIView):
+    """
+    API returning the number of pending friend requests received, the ones
+    `ListPendingFriendRequestsView` lists.
+    Meant for frequent polling: the count is exact and read from the indexed
+    pending inbox entries, without joining the friend requests or the users.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET request counting the pending friend requests.
+        param:
+        request (Request): The request object.
+        Returns:
+        Response: The response object with the `count`.
+        """
         return Response({
-                "data": response.data,
+                "data": {'count': inbox.pending_count(request.user.pk)},
                 'status': 'S'
             }, status=status.HTTP_200_OK)
@@ -0,0 +1,199 @@
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from django.utils.http import parse_etags
+
+from core.views import AsyncAPIView, RowFormatterMixin
+from friends import cache
+from friends.models import FriendRequest, PendingInboxEntry
+from friends.v1.serializers.friend_request_serializer import (
+    FriendRequestSerializer, validate_response_status)
+from friends.v1.views.friend_request import (
+    ListFriendsView, ListPendingFriendRequestsView, RateLimitMixin,
+    RespondFriendRequestView, SendFriendRequestView)
+from user_profile.models import UserProfile
+from user_profile.v1.pagination import KeysetPagination
+
+
+class AsyncSendFriendRequestView(RateLimitMixin, AsyncAPIView):
+    """
+    Async version of `SendFriendRequestView`.
+    """
+    rate_limit_scope = SendFriendRequestView.rate_limit_scope
+
+    async def get_to_user_id(self, data):
+        """
+        Validate the `to_user` id like the serializer's related field does,
+        with an async existence check.
+        Returns:
+        int: The id of the target user.
+        Raises:
+        ValidationError: If the id is missing, malformed or unknown.
+        """
+        field = FriendRequestSerializer().fields['to_user']
+        try:
+            if 'to_user' not in data:
+                field.fail('required')
+            if data['to_user'] in (None, ''):
+                field.fail('null')
+            try:
+                to_user_id = int(data['to_user'])
+            except (TypeError, ValueError):
+                field.fail('incorrect_type', data_type=type(data['to_user']).__name__)
+            if not await UserProfile.objects.filter(pk=to_user_id).aexists():
+                field.fail('does_not_exist', pk_value=data['to_user'])
+        except ValidationError as e:
+            raise ValidationError({'to_user': e.detail})
+        return to_user_id
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Handle POST request to send a friend request.
+        param:
+        request (Request): The request object containing user data.
+        Returns:
+        HttpResponse: The response with a success message or error messages.
+        """
+        try:
+            to_user_id = await self.get_to_user_id(request.data)
+            await sync_to_async(self.check_rate_limit)(request)
+            # The insert and its signal receivers share one transaction, which
+            # has to run in a single synchronous block.
+            serializer = FriendRequestSerializer(context={'request': request})
+            try:
+                await sync_to_async(serializer.create)({'to_user_id': to_user_id})
+            except ValidationError:
+                # Duplicates are only detected by the insert.
+                await sync_to_async(self.refund_rate_limit)(request)
+                raise
+            return self.render({
+                    'message': 'Request has been sent successfully',
+                    'status': 'S'
+                }, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return self.render(
+                {"errors": e.detail, "status": "F"}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return self.render(
+                {"errors": str(e), "status": "F"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncRespondFriendRequestView(AsyncAPIView):
+    """
+    Async version of `RespondFriendRequestView`.
+    """
+
+    async def put(self, request, id, *args, **kwargs):
+        """
+        Handle PUT request to respond to a friend request.
+        param:
+        request (Request): The request object containing user data.
+        id (int): The ID of the friend request to respond to.
+        Returns:
+        HttpResponse: The response with a success message or error messages.
+        """
+        try:
+            instance = await FriendRequest.objects.only('to_user_id').aget(id=id)
+        except FriendRequest.DoesNotExist:
+            return self.render({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if instance.to_user_id != request.user.pk:
+            return self.render(
+                {"error": "You cannot respond to this friend request.",
+                 "status": "F"
+                 }, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            new_status = validate_response_status(request.data)
+            # The locked read and the update share one transaction, which has
+            # to run in a single synchronous block.
+            await sync_to_async(RespondFriendRequestView.save_status)(
+                instance.pk, new_status, request.user)
+            return self.render({"status": "S", "message": "Friend request has been updated."},
+                               status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return self.render({"errors": e.detail, "status": "F"},
+                               status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return self.render({"errors": str(e), "status": "F"},
+                               status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    patch = put
+
+
+class AsyncCachedListView(RowFormatterMixin, AsyncAPIView):
+    """
+    Async version of the `CachedListMixin` list views, sharing their
+    response cache invalidation.
+    Subclasses set `get_queryset`, `serializer_class`, `row_formatter_class`,
+    `keyset_ordering` and `cache_scope`.
+    """
+    pagination_class = KeysetPagination
+    serializer_class = None
+    cache_scope = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Handle GET request listing a page of the queryset.
+        """
+        etag = await sync_to_async(cache.get_etag)(
+            self.cache_scope, request.user.pk, request.build_absolute_uri())
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return self.render(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response_cache = cache.get_cache()
+        key = cache.get_response_key(self.cache_scope, request.user.pk, etag)
+        data = await response_cache.aget(key)
+        if data is None:
+            paginator = self.pagination_class()
+            rows = await paginator.apaginate_queryset(
+                self.get_row_queryset(self.get_queryset()), request, self)
+            data = paginator.get_paginated_response(self.format_rows(rows)).data
+            await response_cache.aset(key, data, cache.get_cache_timeout())
+        return self.render({
+                "data": data,
+                'status': 'S'
+            }, status=status.HTTP_200_OK, headers=headers)
+
+
+class AsyncListFriendsView(AsyncCachedListView):
+    """
+    Async version of `ListFriendsView`.
+    """
+    serializer_class = ListFriendsView.serializer_class
+    row_formatter_class = ListFriendsView.row_formatter_class
+    keyset_ordering = ListFriendsView.keyset_ordering
+    cache_scope = ListFriendsView.cache_scope
+    get_queryset = ListFriendsView.get_queryset
+
+
+class AsyncListPendingFriendRequestsView(AsyncCachedListView):
+    """
+    Async version of `ListPendingFriendRequestsView`.
+    """
+    serializer_class = ListPendingFriendRequestsView.serializer_class
+    row_formatter_class = ListPendingFriendRequestsView.row_formatter_class
+    keyset_ordering = ListPendingFriendRequestsView.keyset_ordering
+    cache_scope = ListPendingFriendRequestsView.cache_scope
+    get_queryset = ListPendingFriendRequestsView.get_queryset
+
+
+class AsyncPendingFriendRequestCountView(AsyncAPIView):
+    """
+    Async version of `PendingFriendRequestCountView`.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Handle GET request counting the pending friend requests.
+        """
+        count = await PendingInboxEntry.objects.filter(
+            user_id=request.user.pk).acount()
+        return self.render({
+                "data": {'count': count},
+                'status': 'S'
+            }, status=status.HTTP_200_OK)
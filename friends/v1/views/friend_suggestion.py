@@ -0,0 +1,70 @@
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.views import RowFormatterMixin
+from friends.models import FriendSuggestion
+from friends.suggestions import mutual_friend_ids
+from friends.v1.serializers.friend_suggestion_serializer import FriendSuggestionSerializer
+from user_profile.models import UserProfile
+from user_profile.v1.pagination import KeysetPagination
+from user_profile.v1.serializers.user_registration_serializer import (
+    UserSearchRowFormatter, UserSearchSerializer)
+
+
+class ListFriendSuggestionsView(generics.ListAPIView):
+    """
+    API to list "people you may know": friends of friends ranked by their
+    number of mutual friends, served from the precomputed suggestions.
+    """
+    serializer_class = FriendSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-mutual_count', 'suggested_id')
+
+    def get_queryset(self):
+        """
+        Get the stored suggestions of the authenticated user.
+        Returns:
+        Queryset of suggestions of active users.
+        """
+        return FriendSuggestion.objects.filter(
+            user=self.request.user, suggested__is_active=True
+        ).select_related('suggested').only(
+            'mutual_count', 'suggested__email', 'suggested__first_name',
+            'suggested__last_name')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        return Response({
+                "data": response.data,
+                'status': 'S'
+            }, status=status.HTTP_200_OK)
+
+
+class ListMutualFriendsView(RowFormatterMixin, generics.ListAPIView):
+    """
+    API to list the friends the authenticated user has in common with another
+    user.
+    """
+    serializer_class = UserSearchSerializer
+    row_formatter_class = UserSearchRowFormatter
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id',)
+
+    def get_queryset(self):
+        """
+        Get the mutual friends by intersecting both adjacency arrays.
+        Returns:
+        Queryset of active users who are friends with both users.
+        """
+        mutual_ids = mutual_friend_ids(self.request.user.pk, self.kwargs['user_id'])
+        return UserProfile.objects.filter(id__in=mutual_ids, is_active=True)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        return Response({
+                "data": response.data,
+                'status': 'S'
+            }, status=status.HTTP_200_OK)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 
+from core.db import database_from_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,13 +45,16 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
 
     # system apps
+    'core',
     'user_profile',
     'friends',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,31 +89,95 @@ AUTH_USER_MODEL = 'user_profile.UserProfile'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
-        'NAME': 'social_network_db',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'db',
-        'PORT': '5432'
-    }
-}
+# DATABASE_URL (e.g. postgres://user:password@db:5432/social_network_db)
+# takes precedence over the individual DB_* variables.
+
+if os.environ.get('DATABASE_URL'):
+    DATABASES = {'default': database_from_url(os.environ['DATABASE_URL'])}
+else:
+    DATABASES = {'default': {
+        'ENGINE': 'core.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'social_network_db'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
+        'HOST': os.environ.get('DB_HOST', 'db'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+    }}
+
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://...@replica1:5432/db,...
+# are added as replica1, replica2, ... and serve the reads of GET requests
+# (see core/routers.py). Tests run them as mirrors of the primary.
+for number, url in enumerate(
+        filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')),
+        start=1):
+    DATABASES['replica%d' % number] = dict(
+        database_from_url(url), TEST={'MIRROR': 'default'})
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# After writing, a user reads from the primary for REPLICA_PIN_SECONDS, which
+# must exceed the replication lag. Every process must see the pins, so the
+# core checks refuse a process-local REPLICA_PIN_CACHE when replicas are set.
+REPLICA_PIN_CACHE = 'shared'
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) and checked before being reused.
+# Django 4.2 has no built-in pool: each worker thread keeps one persistent
+# connection. To share connections between processes put PgBouncer in front
+# of PostgreSQL; in transaction pooling mode also set
+# DB_DISABLE_SERVER_SIDE_CURSORS=1 as `.iterator()` cursors cannot survive
+# across transactions.
+for database in DATABASES.values():
+    database.update({
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get(
+            'DB_DISABLE_SERVER_SIDE_CURSORS', '') == '1',
+    })
+    if database['ENGINE'] == 'core.db.backends.postgresql':
+        database['OPTIONS'] = {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+        }
 
 CORS_ALLOW_CREDENTIALS = True
 CORS_ORIGIN_ALLOW_ALL = True
 TOKEN_COOKIE_DOMAIN = 'http://localhost'
 
 # Rest framework settings
+# 'stateless' trusts the user claims signed into the access token (see
+# user_profile/authentication.py); 'database' loads the user on every request.
+# Stateless mode relies on the revocation list for logouts and deactivations,
+# so the core checks refuse it unless TOKEN_REVOCATION_CACHE is shared.
+JWT_AUTHENTICATION_CLASSES = {
+    'stateless': 'user_profile.authentication.StatelessJWTAuthentication',
+    'database': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+}
+JWT_AUTHENTICATION = os.environ.get('JWT_AUTHENTICATION', 'database')
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        JWT_AUTHENTICATION_CLASSES[JWT_AUTHENTICATION],
     ],
 }
 
+# Whether the list views format pages from `values()` rows instead of
+# running their serializers. The output is the same either way.
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', '1') == '1'
+
+# Revoked tokens and users are kept in this cache; each process remembers
+# tokens which passed the check for TOKEN_USER_CACHE_TTL seconds.
+TOKEN_REVOCATION_CACHE = 'shared'
+TOKEN_USER_CACHE_TTL = 5
+
+# Whether LoginView also creates a Django session. API clients authenticate
+# with the JWT only, so the session row is usually dead weight.
+LOGIN_CREATE_SESSION = os.environ.get('LOGIN_CREATE_SESSION', '1') == '1'
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -124,6 +193,33 @@ SIMPLE_JWT = {
 
 AUTH_COOKIE_REFRESH = 'refresh_token'
 SESSION_COOKIE_SAMESITE = 'Lax'
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# The first hasher is used for new passwords; hashes made by the others are
+# upgraded on the next successful login.
+
+PASSWORD_HASHERS_BY_NAME = {
+    'argon2': 'user_profile.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'user_profile.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PREFERRED_PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+PASSWORD_HASHERS = [PASSWORD_HASHERS_BY_NAME[PREFERRED_PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHERS_BY_NAME.items()
+    if name != PREFERRED_PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Tuned for login throughput: one lane per hash so concurrent logins use
+# separate cores.
+PASSWORD_HASHER_PARAMS = {
+    'argon2': {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+}
+
+# Threads async views offload password hashing to; None uses Python's
+# default.
+PASSWORD_HASHING_WORKERS = None
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -165,3 +261,66 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# User search backend, see user_profile/search.py.
+# When unset the trigram backend is used on PostgreSQL and the in-memory
+# index everywhere else.
+USER_SEARCH_BACKEND = None
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# 'shared' holds the state every process must agree on (rate limits, ...);
+# process-local backends are refused for it by the core checks. The database
+# cache works anywhere once `createcachetable` ran, but its `incr` is not
+# atomic: production should use redis or memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    'shared': {
+        'BACKEND': os.environ.get(
+            'SHARED_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'net_friends_cache'),
+    },
+}
+
+# Per-user cache of the friend list and pending inbox, see friends/cache.py.
+# Every process must see the invalidations, so it lives in the shared cache.
+FRIENDS_CACHE_ALIAS = 'shared'
+FRIENDS_CACHE_TIMEOUT = 300
+
+# Autocomplete suggestions of each prefix are cached for a few seconds, see
+# user_profile/search.py.
+AUTOCOMPLETE_CACHE = 'default'
+AUTOCOMPLETE_CACHE_TIMEOUT = 10
+
+# Number of "people you may know" suggestions stored per user.
+FRIEND_SUGGESTIONS_LIMIT = 50
+
+# Task queue, see core/tasks.py. Eager mode runs tasks inline instead of
+# queueing them for `manage.py run_task_worker`.
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER', '') == '1'
+
+# Request instrumentation, see core/middleware.py. Requests slower than
+# SLOW_REQUEST_MS are logged to `core.requests` with up to
+# SLOW_REQUEST_MAX_STATEMENTS of their SQL statements. /metrics/ requires
+# METRICS_TOKEN as bearer token, or DEBUG when no token is set.
+# The Server-Timing header shows clients the database and serialization
+# time of each response, so it is only sent in DEBUG unless
+# SERVER_TIMING_HEADER=1.
+SERVER_TIMING_HEADER = os.environ.get(
+    'SERVER_TIMING_HEADER', '1' if DEBUG else '0') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_REQUEST_MAX_STATEMENTS = 50
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Rate limits per endpoint scope, see core/ratelimit.py. The windows must be
+# counted in a cache shared by all processes.
+RATE_LIMIT_CACHE = 'shared'
+RATE_LIMITS = {
+    'send-friend-request': '3/m',
+    'bulk-send-friend-request': '10/m',
+}
@@ -17,9 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, re_path, include
 
+from core.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     path('users/', include('user_profile.urls')),
     path('friends/', include('friends.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,248 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from user_profile.models import UserProfile
+
+# Claims copied onto every token so requests can be authenticated without
+# loading the user.
+USER_CLAIMS = ('email', 'is_active')
+
+
+class TokenVerdictCache:
+    """
+    Short-lived in-process cache of tokens which passed the revocation check,
+    so the shared cache is only asked once per token every `ttl` seconds.
+    Revocations made in this process drop their entries immediately; other
+    processes see them after at most `ttl` seconds.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_USER_CACHE_TTL', 5)
+
+    def get(self, jti):
+        entry = self._entries.get(jti)
+        if entry is None:
+            return None
+        expires, user_id = entry
+        if expires < time.monotonic():
+            return None
+        return user_id
+
+    def set(self, jti, user_id):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[jti] = (time.monotonic() + self.ttl, user_id)
+
+    def discard(self, jti):
+        with self._lock:
+            self._entries.pop(jti, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for jti, (expires, cached_id) in list(self._entries.items()):
+                if cached_id == user_id:
+                    del self._entries[jti]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_verdicts = TokenVerdictCache()
+
+
+def get_revocation_cache():
+    return caches[getattr(settings, 'TOKEN_REVOCATION_CACHE', 'default')]
+
+
+def get_token_key(jti):
+    return 'revoked-token:%s' % jti
+
+
+def get_user_key(user_id):
+    return 'revoked-user:%s' % user_id
+
+
+def add_user_claims(token, user):
+    """
+    Copy the user claims trusted by `StatelessJWTAuthentication` onto a token.
+    :param token: The refresh or access token.
+    :param user: The user the token is issued to.
+    :return: The token.
+    """
+    token['email'] = user.email
+    token['is_active'] = user.is_active
+    return token
+
+
+def revoke_token(token):
+    """
+    Revoke a single access token until it expires, e.g. on logout.
+    :param token: The validated access token.
+    """
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti is None:
+        return
+    timeout = max(int(token['exp'] - time.time()), 1)
+    get_revocation_cache().set(get_token_key(jti), True, timeout=timeout)
+    _verdicts.discard(jti)
+
+
+def revoke_user(user_id):
+    """
+    Revoke every access token issued to a user so far, e.g. on deactivation.
+    Only access tokens authenticate requests, so the mark is kept for one
+    access token lifetime.
+    :param user_id: Id of the user.
+    """
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    get_revocation_cache().set(
+        get_user_key(user_id), int(time.time()), timeout=timeout)
+    _verdicts.discard_user(user_id)
+
+
+def _revoked(token, user_id, revoked):
+    if revoked.get(get_token_key(token.get(api_settings.JTI_CLAIM))):
+        return True
+    revoked_at = revoked.get(get_user_key(user_id))
+    return revoked_at is not None and token.get('iat', 0) <= revoked_at
+
+
+def is_revoked(token, user_id):
+    """
+    Check the token against the revocation list in a single cache round trip.
+    :param token: The validated access token.
+    :param user_id: Id of the user the token was issued to.
+    :return: True if the token or all of the user's tokens were revoked.
+    """
+    keys = [get_token_key(token.get(api_settings.JTI_CLAIM)),
+            get_user_key(user_id)]
+    return _revoked(token, user_id, get_revocation_cache().get_many(keys))
+
+
+async def ais_revoked(token, user_id):
+    """
+    Async version of `is_revoked`.
+    """
+    keys = [get_token_key(token.get(api_settings.JTI_CLAIM)),
+            get_user_key(user_id)]
+    return _revoked(
+        token, user_id, await get_revocation_cache().aget_many(keys))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which trusts the user claims signed into the token
+    instead of loading the user on every request.
+    The user is an unsaved `UserProfile` carrying only the id, email and
+    is_active snapshot; views must not save it or read other fields from it.
+    Tokens issued before the claims were added fall back to a database lookup.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+    def is_trusted(self, validated_token, user_id):
+        """
+        Check whether the token passed the revocation check recently.
+        """
+        return _verdicts.get(validated_token.get(api_settings.JTI_CLAIM)) == user_id
+
+    def trust(self, validated_token, user_id, revoked):
+        """
+        Remember a token which passed the revocation check.
+        :raises AuthenticationFailed: If the token was revoked.
+        """
+        if revoked:
+            raise AuthenticationFailed(
+                _('Token has been revoked'), code='token_revoked')
+        _verdicts.set(validated_token.get(api_settings.JTI_CLAIM), user_id)
+
+    def build_user(self, validated_token, user_id):
+        """
+        Build the request user from the token claims.
+        :raises AuthenticationFailed: If the user was inactive when the token
+        was issued.
+        """
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        user = UserProfile(**{
+            api_settings.USER_ID_FIELD: user_id,
+            'email': validated_token['email'],
+            'is_active': validated_token['is_active'],
+        })
+        user._state.adding = False
+        user._state.db = UserProfile.objects.db
+        return user
+
+    def get_user(self, validated_token):
+        """
+        Return the request user backed by the token.
+        :param validated_token: The validated access token.
+        :return: UserProfile instance backed by the token.
+        :raises AuthenticationFailed: If the token was revoked or the user
+        was inactive when it was issued.
+        """
+        user_id = self.get_user_id(validated_token)
+        if not self.is_trusted(validated_token, user_id):
+            self.trust(validated_token, user_id,
+                       is_revoked(validated_token, user_id))
+        if any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+        return self.build_user(validated_token, user_id)
+
+    async def aget_user(self, validated_token):
+        """
+        Async version of `get_user`.
+        """
+        user_id = self.get_user_id(validated_token)
+        if not self.is_trusted(validated_token, user_id):
+            self.trust(validated_token, user_id,
+                       await ais_revoked(validated_token, user_id))
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            return self.build_user(validated_token, user_id)
+        try:
+            user = await self.user_model.objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        Async version of `authenticate`, for views running on the event loop.
+        :param request: The request.
+        :return: Tuple of (user, validated token) or None without a token.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
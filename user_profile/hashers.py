@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, ScryptPasswordHasher)
+from django.db import close_old_connections
+
+
+def _params(name):
+    return getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(name, {})
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 hasher with parameters from `PASSWORD_HASHER_PARAMS['argon2']`.
+    The algorithm name is unchanged, so existing argon2 hashes still verify
+    and are rehashed on login when the parameters change.
+    """
+
+    @property
+    def time_cost(self):
+        return _params('argon2').get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _params('argon2').get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _params('argon2').get('parallelism', Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    Scrypt hasher with parameters from `PASSWORD_HASHER_PARAMS['scrypt']`.
+    """
+
+    @property
+    def work_factor(self):
+        return _params('scrypt').get('work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _params('scrypt').get('block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _params('scrypt').get('parallelism', ScryptPasswordHasher.parallelism)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    """
+    Return the thread pool async views offload password hashing to.
+    hashlib (PBKDF2, scrypt) and argon2-cffi release the GIL while hashing,
+    so the pool hashes in parallel while bounding how many cores a login
+    storm can take (`PASSWORD_HASHING_WORKERS`).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', None),
+                thread_name_prefix='password-hashing')
+    return _executor
+
+
+def _authenticate(request, credentials):
+    try:
+        return authenticate(request, **credentials)
+    finally:
+        # Pool threads live outside the request cycle, so their database
+        # connections are not closed by the request_finished signal.
+        close_old_connections()
+
+
+async def authenticate_async(request=None, **credentials):
+    """
+    Await `authenticate()` on the hashing pool without blocking the event loop.
+    Sync views call `authenticate()` directly: their worker thread would
+    only wait on the pool, which adds a hand-off without freeing anything.
+    Outdated hashes are upgraded by Django's `check_password` on success.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_hashing_executor(), _authenticate, request, credentials)
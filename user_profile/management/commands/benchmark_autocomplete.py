@@ -0,0 +1,89 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.benchmark import (
+    Stopwatch, bench_users, random_name, seed_users, summarize)
+from user_profile.search import get_search_backend
+from user_profile.v1.views.user_registration import LoginView
+
+
+class Command(BaseCommand):
+    help = ('Measure autocomplete latency per keystroke: the search backend '
+            'alone and the endpoint with its prefix cache.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=100000,
+            help='Number of synthetic users.')
+        parser.add_argument(
+            '--queries', type=int, default=2000,
+            help='Number of keystrokes simulated per mode.')
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Number of suggestions per keystroke.')
+        parser.add_argument(
+            '--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument(
+            '--json', action='store_true', help='Print results as JSON.')
+
+    def keystrokes(self, rng, count):
+        """
+        Return the prefixes typed while searching names, one per keystroke.
+        """
+        prefixes = []
+        while len(prefixes) < count:
+            name = random_name(rng)
+            prefixes.extend(
+                name[:length] for length in range(1, rng.randint(2, len(name)) + 1))
+        return prefixes[:count]
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        seed_users(rng, options['users'])
+        prefixes = self.keystrokes(rng, options['queries'])
+        backend = get_search_backend()
+        # Warm up the index and the database caches.
+        backend.autocomplete(prefixes[0], options['limit'])
+
+        timings = []
+        for prefix in prefixes:
+            with Stopwatch() as watch:
+                backend.autocomplete(prefix, options['limit'])
+            timings.append(watch.elapsed)
+        results = [summarize(timings, mode='backend')]
+
+        token = LoginView.get_tokens_for_user(bench_users().first())['access']
+        client = Client(HTTP_AUTHORIZATION='Bearer ' + token)
+        url = reverse('user-autocomplete')
+        request_logger = logging.getLogger('core.requests')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        with override_settings(CACHES=dict(settings.CACHES, default={
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmark-autocomplete'})):
+            caches['default'].clear()
+            timings = []
+            with Stopwatch() as elapsed:
+                for prefix in prefixes:
+                    with Stopwatch() as watch:
+                        client.get(url, {'q': prefix, 'limit': options['limit']})
+                    timings.append(watch.elapsed)
+        request_logger.setLevel(log_level)
+        results.append(summarize(timings, elapsed.elapsed, mode='endpoint'))
+
+        for result in results:
+            result.update(backend=type(backend).__name__, users=options['users'])
+            if not options['json']:
+                self.stdout.write(
+                    '{backend} {mode:8} users={users} p50={p50_ms}ms '
+                    'p99={p99_ms}ms rps={throughput_rps}'.format(**result))
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,78 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher)
+from django.core.management.base import BaseCommand
+
+from core.benchmark import Stopwatch, summarize
+from user_profile.hashers import (
+    TunedArgon2PasswordHasher, TunedScryptPasswordHasher)
+
+HASHERS = (
+    ('pbkdf2 (Django default)', PBKDF2PasswordHasher),
+    ('argon2 (Django default)', Argon2PasswordHasher),
+    ('argon2 (tuned)', TunedArgon2PasswordHasher),
+    ('scrypt (tuned)', TunedScryptPasswordHasher),
+)
+
+
+class Command(BaseCommand):
+    help = ('Measure password verifications (logins) per second per core for '
+            'every supported hasher, sequentially and on a thread pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Number of verifications per hasher and mode.')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Threads used for the pooled measurement.')
+        parser.add_argument(
+            '--json', action='store_true', help='Print results as JSON.')
+
+    def measure(self, hasher, iterations, workers):
+        password = 'correct horse battery staple'
+        encoded = hasher.encode(password, hasher.salt())
+
+        timings = []
+        with Stopwatch() as sequential:
+            for _ in range(iterations):
+                with Stopwatch() as watch:
+                    hasher.verify(password, encoded)
+                timings.append(watch.elapsed)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            with Stopwatch() as pooled:
+                list(executor.map(
+                    lambda _: hasher.verify(password, encoded), range(iterations)))
+
+        return summarize(
+            timings, sequential.elapsed,
+            logins_per_second_per_core=round(iterations / sequential.elapsed, 1),
+            pooled_logins_per_second=round(iterations / pooled.elapsed, 1),
+            workers=workers)
+
+    def handle(self, *args, **options):
+        results = []
+        for label, hasher_class in HASHERS:
+            if getattr(hasher_class, 'library', None):
+                try:
+                    hasher_class()._load_library()
+                except ValueError:
+                    self.stderr.write('%s skipped: library not installed.' % label)
+                    continue
+            result = self.measure(
+                hasher_class(), options['iterations'], options['workers'])
+            result['hasher'] = label
+            results.append(result)
+            if not options['json']:
+                self.stdout.write(
+                    '{hasher:24} {p50_ms}ms/login  '
+                    '{logins_per_second_per_core} logins/s/core  '
+                    '{pooled_logins_per_second} logins/s on {workers} '
+                    'threads'.format(**result))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,76 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import (
+    Stopwatch, bench_email, delete_bench_data, random_name, seed_users,
+    summarize)
+from user_profile.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = ('Seed synthetic users and measure user search latency '
+            'percentiles as the table grows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10000,100000,1000000',
+            help='Comma separated table sizes to measure at.')
+        parser.add_argument(
+            '--queries', type=int, default=200,
+            help='Number of searches to run at each size.')
+        parser.add_argument(
+            '--page-size', type=int, default=10,
+            help='Number of results fetched per search.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of users inserted per bulk_create.')
+        parser.add_argument(
+            '--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument(
+            '--json', action='store_true', help='Print results as JSON.')
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Delete the synthetic users afterwards.')
+
+    def _keywords(self, rng, count):
+        keywords = []
+        for _ in range(count):
+            name = random_name(rng)
+            kind = rng.random()
+            if kind < 0.4:
+                keywords.append(name[:rng.randint(2, len(name))])
+            elif kind < 0.8:
+                keywords.append(name[1:4])
+            else:
+                keywords.append(bench_email(rng.randint(0, 1000)))
+        return keywords
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = get_search_backend()
+        results = []
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        for size in sizes:
+            seed_users(rng, size, options['batch_size'])
+            keywords = self._keywords(rng, options['queries'])
+            # Warm up the index and the database caches.
+            list(backend.search(keywords[0])[:options['page_size']])
+            timings = []
+            for keyword in keywords:
+                with Stopwatch() as watch:
+                    list(backend.search(keyword)[:options['page_size']])
+                timings.append(watch.elapsed)
+            results.append(summarize(
+                timings, backend=type(backend).__name__, users=size))
+            if not options['json']:
+                self.stdout.write(
+                    '{backend} users={users} p50={p50_ms}ms p95={p95_ms}ms '
+                    'p99={p99_ms}ms'.format(**results[-1]))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+
+        if options['cleanup']:
+            delete_bench_data()
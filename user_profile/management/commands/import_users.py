@@ -0,0 +1,420 @@
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from user_profile.models import UserProfile
+from user_profile.search import get_search_backend
+from user_profile.v1.serializers.user_registration_serializer import (
+    UserRegistrationSerializer)
+
+FORMATS = ('csv', 'jsonl')
+# Emails looked up per IN query when deduplicating.
+LOOKUP_BATCH_SIZE = 1000
+DATE_OF_BIRTH_FORMATS = ('%Y-%m-%d',) + tuple(
+    UserRegistrationSerializer._declared_fields['date_of_birth'].input_formats)
+
+
+def hash_passwords(passwords):
+    """
+    Hash a batch of plain text passwords with the preferred hasher.
+    Runs in the worker processes of the hashing pool.
+    """
+    return [make_password(password) for password in passwords]
+
+
+def _setup_worker():
+    import django
+
+    django.setup()
+
+
+def read_records(path, file_format):
+    """
+    Stream the records of an import file as dicts.
+    Malformed JSON lines are yielded as None so they are reported and still
+    counted by the checkpoint.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as import_file:
+        if file_format == 'csv':
+            yield from csv.DictReader(import_file)
+            return
+        for line in import_file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+def _text(record, field, max_length=None):
+    value = record.get(field)
+    value = '' if value is None else str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise InvalidRecord('%s is longer than %d characters' % (field, max_length))
+    return value
+
+
+def _parse_date_of_birth(value):
+    if not value:
+        return None
+    for date_format in DATE_OF_BIRTH_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise InvalidRecord('invalid date_of_birth %r' % value)
+
+
+def _parse_date_joined(value, default):
+    if not value:
+        return default
+    try:
+        date_joined = parse_datetime(value)
+    except ValueError:
+        date_joined = None
+    if date_joined is None:
+        raise InvalidRecord('invalid date_joined %r' % value)
+    if timezone.is_naive(date_joined):
+        date_joined = timezone.make_aware(date_joined)
+    return date_joined
+
+
+def build_user(record, now):
+    """
+    Validate an import record and build the unsaved user.
+    Passwords come either in plain text (`password`), to be hashed, or
+    already hashed by a hasher Django supports (`password_hash`). Users
+    without either get an unusable password.
+    :return: Tuple of (user, plain text password or None).
+    :raises InvalidRecord: If the record cannot be imported.
+    """
+    if record is None:
+        raise InvalidRecord('malformed record')
+    email = _text(record, 'email', 254).lower()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise InvalidRecord('invalid email %r' % email)
+
+    password = record.get('password') or None
+    encoded = _text(record, 'password_hash')
+    if encoded:
+        try:
+            identify_hasher(encoded)
+        except ValueError:
+            raise InvalidRecord('unknown password_hash algorithm')
+    elif password is None:
+        encoded = make_password(None)
+
+    user = UserProfile(
+        email=email, password=encoded,
+        first_name=_text(record, 'first_name', 30),
+        last_name=_text(record, 'last_name', 30),
+        date_of_birth=_parse_date_of_birth(_text(record, 'date_of_birth')),
+        date_joined=_parse_date_joined(_text(record, 'date_joined'), now))
+    return user, None if encoded else str(password)
+
+
+def existing_emails(emails):
+    """
+    Return the subset of `emails` already registered, with batched IN lookups.
+    """
+    emails = list(emails)
+    existing = set()
+    for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+        existing.update(UserProfile.objects.filter(
+            email__in=emails[start:start + LOOKUP_BATCH_SIZE]
+        ).values_list('email', flat=True))
+    return existing
+
+
+class Command(BaseCommand):
+    help = ('Import users in bulk from CSV or JSON lines files with the '
+            'columns email, password or password_hash, first_name, last_name, '
+            'date_of_birth and date_joined. Existing emails are skipped and '
+            'interrupted imports resume from their checkpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='File format; guessed from the extension by default.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of records validated, hashed and inserted at once.')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes hashing plain text passwords; 1 hashes inline.')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Insert with COPY into a staging table (PostgreSQL only) '
+                 'instead of bulk_create.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore existing checkpoints and start from the first record.')
+        parser.add_argument(
+            '--rejects',
+            help='Write the rejected records to this JSON lines file.')
+
+    def get_format(self, path, options):
+        if options['format']:
+            return options['format']
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        if extension == 'json':
+            extension = 'jsonl'
+        if extension not in FORMATS:
+            raise CommandError(
+                'Cannot guess the format of %s, pass --format.' % path)
+        return extension
+
+    @staticmethod
+    def get_checkpoint_path(path):
+        return path + '.import-checkpoint'
+
+    def load_checkpoint(self, path, restart):
+        checkpoint_path = self.get_checkpoint_path(path)
+        if restart or not os.path.exists(checkpoint_path):
+            return {'records': 0, 'created': 0, 'existing': 0, 'rejected': 0}
+        with open(checkpoint_path) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def save_checkpoint(self, path, stats):
+        checkpoint_path = self.get_checkpoint_path(path)
+        with open(checkpoint_path + '.tmp', 'w') as checkpoint_file:
+            json.dump(stats, checkpoint_file)
+        os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+    def reject(self, number, record, error):
+        if self.rejects is not None:
+            email = record.get('email') if isinstance(record, dict) else None
+            self.rejects.write(json.dumps(
+                {'record': number, 'email': email, 'error': error}) + '\n')
+
+    def prepare_chunk(self, chunk, pending_emails):
+        """
+        Validate and deduplicate a chunk of (number, record) pairs and submit
+        its plain text passwords to the hashing pool.
+        :param pending_emails: Emails of the previous chunk, not inserted yet.
+        :return: Tuple of (users by email, password batches, counts).
+        """
+        now = timezone.now()
+        counts = {'existing': 0, 'rejected': 0}
+        users = {}
+        passwords = {}
+        for number, record in chunk:
+            try:
+                user, password = build_user(record, now)
+            except InvalidRecord as e:
+                counts['rejected'] += 1
+                self.reject(number, record, str(e))
+                continue
+            if user.email in users or user.email in pending_emails:
+                counts['existing'] += 1
+                continue
+            users[user.email] = user
+            if password is not None:
+                passwords[user.email] = password
+
+        for email in existing_emails(users):
+            counts['existing'] += 1
+            del users[email]
+            passwords.pop(email, None)
+
+        emails = list(passwords)
+        plain = list(passwords.values())
+        if self.executor is None:
+            return users, [(emails, hash_passwords(plain))], counts
+        step = max(1, -(-len(plain) // (self.workers * 4)))
+        return users, [
+            (emails[start:start + step],
+             self.executor.submit(hash_passwords, plain[start:start + step]))
+            for start in range(0, len(plain), step)], counts
+
+    def insert_chunk(self, users, hashed):
+        """
+        Wait for the password hashes of a prepared chunk and insert it.
+        :return: Number of users inserted, without those registered
+        concurrently.
+        """
+        for emails, result in hashed:
+            if not isinstance(result, list):
+                result = result.result()
+            for email, encoded in zip(emails, result):
+                users[email].password = encoded
+        users = list(users.values())
+        with transaction.atomic():
+            if self.use_copy:
+                return self.copy_users(users)
+            # Users registering concurrently are skipped by the unique
+            # constraint instead of failing the chunk.
+            UserProfile.objects.bulk_create(
+                users, batch_size=1000, ignore_conflicts=True)
+            return self.count_inserted(users)
+
+    @staticmethod
+    def count_inserted(users):
+        """
+        Count the users whose row holds the imported password hash.
+        bulk_create reports no row count with ignore_conflicts, and the
+        hashes are salted, so a row registered concurrently never matches.
+        """
+        passwords = {user.email: user.password for user in users}
+        emails = list(passwords)
+        inserted = 0
+        for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+            inserted += sum(
+                passwords[email] == password
+                for email, password in UserProfile.objects.filter(
+                    email__in=emails[start:start + LOOKUP_BATCH_SIZE]
+                ).values_list('email', 'password'))
+        return inserted
+
+    def copy_users(self, users):
+        """
+        Insert users with COPY through a staging table, skipping emails
+        registered concurrently.
+        :return: Number of users inserted.
+        """
+        table = connection.ops.quote_name(UserProfile._meta.db_table)
+        fields = [field for field in UserProfile._meta.concrete_fields
+                  if not field.primary_key]
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for user in users:
+            writer.writerow([
+                '\\N' if value is None else value for value in (
+                    field.get_db_prep_save(getattr(user, field.attname), connection)
+                    for field in fields)])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_users_staging '
+                '(LIKE %s INCLUDING DEFAULTS) ON COMMIT DROP' % table)
+            cursor.copy_expert(
+                "COPY import_users_staging (%s) FROM STDIN "
+                "WITH (FORMAT csv, NULL '\\N')" % columns, buffer)
+            cursor.execute(
+                'INSERT INTO %s (%s) SELECT %s FROM import_users_staging '
+                'ON CONFLICT (%s) DO NOTHING' % (
+                    table, columns, columns,
+                    connection.ops.quote_name(
+                        UserProfile._meta.get_field('email').column)))
+            return cursor.rowcount
+
+    def report(self, path, stats, started, done=False):
+        elapsed = time.monotonic() - started
+        rate = (stats['records'] - self.resumed_from) / elapsed if elapsed else 0
+        message = ('%s: %d records, %d created, %d existing, %d rejected '
+                   '(%.0f records/s)' % (
+                       path, stats['records'], stats['created'],
+                       stats['existing'], stats['rejected'], rate))
+        if done:
+            self.stdout.write(self.style.SUCCESS('Imported ' + message))
+        else:
+            self.stderr.write(message)
+
+    def import_file(self, path, options):
+        file_format = self.get_format(path, options)
+        stats = self.load_checkpoint(path, options['restart'])
+        self.resumed_from = stats['records']
+        if self.resumed_from:
+            self.stderr.write('%s: resuming after record %d.' % (
+                path, self.resumed_from))
+
+        started = time.monotonic()
+        pending = None
+        chunk = []
+        for number, record in enumerate(read_records(path, file_format), start=1):
+            if number <= self.resumed_from:
+                continue
+            chunk.append((number, record))
+            if len(chunk) >= options['chunk_size']:
+                pending = self.process_chunk(path, chunk, pending, stats, started)
+                chunk = []
+        if chunk:
+            pending = self.process_chunk(path, chunk, pending, stats, started)
+        if pending is not None:
+            self.finish_chunk(path, pending, stats, started)
+
+        self.report(path, stats, started, done=True)
+        checkpoint_path = self.get_checkpoint_path(path)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def process_chunk(self, path, chunk, pending, stats, started):
+        """
+        Prepare a chunk, then insert the previous one while its passwords
+        are hashed.
+        :return: The prepared chunk, pending insertion.
+        """
+        users, hashed, counts = self.prepare_chunk(
+            chunk, pending[1] if pending is not None else ())
+        if pending is not None:
+            self.finish_chunk(path, pending, stats, started)
+        return chunk[-1][0], users, hashed, counts
+
+    def finish_chunk(self, path, pending, stats, started):
+        """
+        Insert a prepared chunk and checkpoint the import after its last
+        record.
+        """
+        last_number, users, hashed, counts = pending
+        created = self.insert_chunk(users, hashed)
+        stats['created'] += created
+        # Emails registered since the chunk was deduplicated.
+        stats['existing'] += counts['existing'] + len(users) - created
+        stats['rejected'] += counts['rejected']
+        stats['records'] = last_number
+        self.save_checkpoint(path, stats)
+        self.report(path, stats, started)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive.')
+        self.use_copy = options['copy']
+        if self.use_copy and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+        for path in options['paths']:
+            if not os.path.exists(path):
+                raise CommandError('%s does not exist.' % path)
+
+        self.workers = max(1, options['workers'] or 1)
+        self.executor = None
+        self.rejects = None
+        if options['rejects']:
+            self.rejects = open(options['rejects'], 'a')
+        if self.workers > 1:
+            # Forked workers must not share the parent's connections.
+            connections.close_all()
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_setup_worker)
+        try:
+            for path in options['paths']:
+                self.import_file(path, options)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+            if self.rejects is not None:
+                self.rejects.close()
+            # The users were inserted without the post_save signals.
+            get_search_backend().reset()
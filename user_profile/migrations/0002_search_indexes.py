@@ -0,0 +1,43 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_INDEXES = (
+    ('user_profile_first_name_trgm_idx',
+     'USING gin (UPPER(first_name) gin_trgm_ops)'),
+    ('user_profile_last_name_trgm_idx',
+     'USING gin (UPPER(last_name) gin_trgm_ops)'),
+    ('user_profile_email_upper_idx', '(UPPER(email))'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Create the indexes backing `email__iexact` and `*_name__icontains`.
+    Only PostgreSQL supports them; other databases use the in-memory index.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('user_profile', 'UserProfile')._meta.db_table
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS %s ON %s %s' % (name, table, definition))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+AUTOCOMPLETE_INDEXES = (
+    ('user_profile_first_name_prefix_idx',
+     '(UPPER(first_name) text_pattern_ops)'),
+    ('user_profile_last_name_prefix_idx',
+     '(UPPER(last_name) text_pattern_ops)'),
+)
+
+
+def create_autocomplete_indexes(apps, schema_editor):
+    """
+    Create the indexes backing the `*_name__istartswith` prefix matches of
+    the autocomplete, which the trigram indexes only serve loosely.
+    Only PostgreSQL supports them; other databases use the in-memory index.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('user_profile', 'UserProfile')._meta.db_table
+    for name, definition in AUTOCOMPLETE_INDEXES:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS %s ON %s %s' % (name, table, definition))
+
+
+def drop_autocomplete_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in AUTOCOMPLETE_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_autocomplete_indexes, drop_autocomplete_indexes),
+    ]
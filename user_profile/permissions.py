@@ -0,0 +1,16 @@
+from rest_framework.permissions import BasePermission
+
+from user_profile.models import UserProfile
+
+
+class IsStaffUser(BasePermission):
+    """
+    Allow access to active staff users only.
+    The user built by `StatelessJWTAuthentication` carries no `is_staff`
+    claim, so the flag is always read from the database.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and UserProfile.objects.filter(
+            pk=user.pk, is_staff=True, is_active=True).exists())
@@ -0,0 +1,370 @@
+import bisect
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Exists, FloatField, OuterRef, Q, Value, When)
+from django.db.models.functions import Cast, Greatest, Least, Upper
+from django.utils.module_loading import import_string
+
+from user_profile.models import UserProfile
+
+
+# Rank of each match tier. Tiers are spaced further apart than the sum of
+# the boosts below, so a boost never lifts a user into a better tier.
+EXACT_EMAIL_RANK = 30.0
+NAME_PREFIX_RANK = 20.0
+NAME_SUBSTRING_RANK = 10.0
+# Boosts within a tier: the follower boost grows towards FOLLOWERS_BOOST as
+# followers_count passes FOLLOWERS_HALF_BOOST; backends may add up to 1.0
+# of their own (e.g. trigram similarity).
+FOLLOWERS_BOOST = 1.0
+FOLLOWERS_HALF_BOOST = 100.0
+FRIEND_OF_FRIEND_BOOST = 1.0
+
+AUTOCOMPLETE_FIELDS = ('id', 'first_name', 'last_name', 'email')
+
+
+def match_condition(keyword):
+    """
+    Build the filter used to match users against a search keyword.
+    :param keyword: The search keyword.
+    :return: Q object matching active users by exact email or a name substring.
+    """
+    return (
+        Q(email__iexact=keyword) | Q(first_name__icontains=keyword) |
+        Q(last_name__icontains=keyword)) & Q(is_active=True)
+
+
+def friend_of_friend(user):
+    """
+    Build the expression telling whether a user is a friend of one of the
+    searching user's friends, other than the searching user.
+    :param user: The searching user.
+    :return: Boolean `Exists` expression on the outer user.
+    """
+    from friends.models import Friendship
+
+    friend_ids = Friendship.objects.filter(user_id=user.pk).values('friend_id')
+    return Exists(Friendship.objects.filter(
+        friend_id=OuterRef('pk'), user_id__in=friend_ids
+    ).exclude(friend_id=user.pk))
+
+
+def rank_expression(keyword, user=None):
+    """
+    Build the SQL expression ranking a matched user.
+    Exact email matches rank above name prefixes, which rank above substrings.
+    Within a tier, users with more followers and friends of the searching
+    user's friends rank higher.
+    :param keyword: The search keyword.
+    :param user: The searching user, None to skip the friend-of-friend boost.
+    :return: Expression annotating a float rank.
+    """
+    rank = Case(
+        When(email__iexact=keyword, then=Value(EXACT_EMAIL_RANK)),
+        When(Q(first_name__istartswith=keyword) |
+             Q(last_name__istartswith=keyword), then=Value(NAME_PREFIX_RANK)),
+        default=Value(NAME_SUBSTRING_RANK),
+        output_field=FloatField())
+    followers = Cast('followers_count', FloatField())
+    rank += Value(FOLLOWERS_BOOST) * followers / (
+        followers + Value(FOLLOWERS_HALF_BOOST))
+    if user is not None and user.is_authenticated:
+        rank += Case(
+            When(friend_of_friend(user), then=Value(FRIEND_OF_FRIEND_BOOST)),
+            default=Value(0.0),
+            output_field=FloatField())
+    return rank
+
+
+def no_results():
+    """
+    Return an empty search result, annotated with `rank` like the results
+    of the backends so that it can be ordered and projected the same way.
+    """
+    return UserProfile.objects.none().annotate(
+        rank=Value(0.0, output_field=FloatField()))
+
+
+class BaseSearchBackend:
+    """
+    Base class for user search backends.
+    Subclasses return ranked querysets and may keep their own index in sync
+    through the `index_user`/`remove_user` hooks.
+    """
+
+    def search(self, keyword, user=None):
+        """
+        Search users matching the keyword.
+        :param keyword: The search keyword.
+        :param user: The searching user, whose friends' friends rank higher.
+        :return: Queryset of active users annotated with `rank`, best match
+        first and by id on ties.
+        """
+        queryset = UserProfile.objects.filter(match_condition(keyword))
+        return queryset.annotate(
+            rank=rank_expression(keyword, user)).order_by('-rank', 'id')
+
+    def autocomplete(self, prefix, limit):
+        """
+        Find active users whose first or last name starts with the prefix,
+        ordered by the matching name and then id.
+        On PostgreSQL the prefix matches use the `text_pattern_ops` indexes
+        on the uppercased names.
+        :param prefix: The typed prefix.
+        :param limit: Maximum number of users returned.
+        :return: List of dicts with the id, first_name, last_name and email.
+        """
+        first = Q(first_name__istartswith=prefix)
+        last = Q(last_name__istartswith=prefix)
+        name_key = Case(
+            When(first & last, then=Least(Upper('first_name'), Upper('last_name'))),
+            When(first, then=Upper('first_name')),
+            default=Upper('last_name'))
+        return list(UserProfile.objects.filter(
+            first | last, is_active=True
+        ).order_by(name_key, 'id').values(*AUTOCOMPLETE_FIELDS)[:limit])
+
+    def index_user(self, user):
+        """Called when a user is created or updated."""
+
+    def remove_user(self, user_id):
+        """Called when a user is deleted."""
+
+    def reset(self):
+        """Called when users were written in bulk, bypassing the signals."""
+
+
+class TrigramSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL backend.
+    Matching uses the `pg_trgm` GIN indexes created in the migrations and
+    results are ranked by trigram similarity within each match tier.
+    """
+
+    def search(self, keyword, user=None):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        queryset = UserProfile.objects.filter(match_condition(keyword))
+        similarity = Greatest(
+            TrigramSimilarity('first_name', keyword),
+            TrigramSimilarity('last_name', keyword))
+        return queryset.annotate(
+            rank=rank_expression(keyword, user) + similarity
+        ).order_by('-rank', 'id')
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    In-process trigram index used when PostgreSQL is not available
+    (e.g. SQLite test runs), with a sorted index of the names of active
+    users for prefix lookups.
+    The index is built lazily on first search and kept up to date from the
+    `UserProfile` signals. The database is only queried for the candidate ids.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._documents = {}
+        self._emails = defaultdict(set)
+        self._trigrams = defaultdict(set)
+        # Sorted (uppercased name, user id) pairs of the active users.
+        self._prefixes = []
+
+    @staticmethod
+    def _grams(value):
+        return {value[i:i + 3] for i in range(len(value) - 2)}
+
+    def _add(self, user_id, first_name, last_name, email, is_active=True):
+        names = ((first_name or '').upper(), (last_name or '').upper())
+        email = (email or '').upper()
+        self._documents[user_id] = (names, email)
+        self._emails[email].add(user_id)
+        for name in names:
+            for gram in self._grams(name):
+                self._trigrams[gram].add(user_id)
+            if name and is_active:
+                if self._built:
+                    bisect.insort(self._prefixes, (name, user_id))
+                else:
+                    self._prefixes.append((name, user_id))
+
+    def _discard(self, user_id):
+        document = self._documents.pop(user_id, None)
+        if document is None:
+            return
+        names, email = document
+        self._emails[email].discard(user_id)
+        for name in names:
+            for gram in self._grams(name):
+                self._trigrams[gram].discard(user_id)
+            position = bisect.bisect_left(self._prefixes, (name, user_id))
+            if self._prefixes[position:position + 1] == [(name, user_id)]:
+                del self._prefixes[position]
+
+    def _build(self):
+        rows = UserProfile.objects.values_list(
+            'id', 'first_name', 'last_name', 'email', 'is_active'
+        ).iterator(chunk_size=2000)
+        for row in rows:
+            self._add(*row)
+        self._prefixes.sort()
+        self._built = True
+
+    def candidates(self, keyword):
+        """
+        Return the ids of users whose names contain the keyword or whose
+        email equals it.
+        :param keyword: The search keyword.
+        :return: Set of candidate user ids.
+        """
+        keyword = keyword.upper()
+        with self._lock:
+            if not self._built:
+                self._build()
+            grams = self._grams(keyword)
+            if grams:
+                ids = set.intersection(
+                    *(self._trigrams.get(gram, set()) for gram in grams))
+            else:
+                ids = self._documents.keys()
+            matched = {
+                user_id for user_id in ids
+                if any(keyword in name
+                       for name in self._documents[user_id][0])}
+            matched.update(self._emails.get(keyword, ()))
+        return matched
+
+    def search(self, keyword, user=None):
+        candidates = self.candidates(keyword)
+        if not candidates:
+            return no_results()
+        queryset = UserProfile.objects.filter(
+            match_condition(keyword), id__in=candidates)
+        return queryset.annotate(
+            rank=rank_expression(keyword, user)).order_by('-rank', 'id')
+
+    def autocomplete(self, prefix, limit):
+        prefix = prefix.upper()
+        user_ids = []
+        with self._lock:
+            if not self._built:
+                self._build()
+            position = bisect.bisect_left(self._prefixes, (prefix,))
+            while len(user_ids) < limit and position < len(self._prefixes):
+                name, user_id = self._prefixes[position]
+                if not name.startswith(prefix):
+                    break
+                # Users matching on both names come first under the smaller.
+                if user_id not in user_ids:
+                    user_ids.append(user_id)
+                position += 1
+        users = {user['id']: user for user in UserProfile.objects.filter(
+            id__in=user_ids, is_active=True).values(*AUTOCOMPLETE_FIELDS)}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+    def index_user(self, user):
+        with self._lock:
+            if self._built:
+                self._discard(user.pk)
+                self._add(user.pk, user.first_name, user.last_name, user.email,
+                          user.is_active)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            if self._built:
+                self._discard(user_id)
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._documents.clear()
+            self._emails.clear()
+            self._trigrams.clear()
+            self._prefixes.clear()
+
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    Return the configured search backend instance.
+    `USER_SEARCH_BACKEND` may name a backend class; otherwise the trigram
+    backend is used on PostgreSQL and the in-memory index elsewhere.
+    """
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'USER_SEARCH_BACKEND', None)
+        if backend_path:
+            backend_class = import_string(backend_path)
+        elif connection.vendor == 'postgresql':
+            backend_class = TrigramSearchBackend
+        else:
+            backend_class = InMemorySearchBackend
+        _backend = backend_class()
+    return _backend
+
+
+# Fields of the suggestions; saving any of them invalidates the cached
+# suggestions.
+AUTOCOMPLETE_USER_FIELDS = frozenset(['first_name', 'last_name', 'email', 'is_active'])
+AUTOCOMPLETE_VERSION_KEY = 'autocomplete:version'
+
+
+def get_autocomplete_cache():
+    return caches[getattr(settings, 'AUTOCOMPLETE_CACHE', 'default')]
+
+
+def get_autocomplete_version(cache):
+    """
+    Return the current version of the cached suggestions, a new random one
+    when missing so stale suggestions can never be served again.
+    """
+    version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    if version is None:
+        cache.add(AUTOCOMPLETE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    return version
+
+
+def invalidate_autocomplete_on_commit():
+    """
+    Invalidate every cached suggestion once the current transaction commits.
+    With a process-local AUTOCOMPLETE_CACHE other processes still serve
+    theirs for up to AUTOCOMPLETE_CACHE_TIMEOUT seconds.
+    """
+    transaction.on_commit(
+        lambda: get_autocomplete_cache().delete(AUTOCOMPLETE_VERSION_KEY))
+
+
+def autocomplete(prefix, limit):
+    """
+    Suggest users for a typed prefix, caching the suggestions of every
+    prefix for AUTOCOMPLETE_CACHE_TIMEOUT seconds as the same prefixes are
+    typed by many users.
+    :param prefix: The typed prefix.
+    :param limit: Maximum number of users returned.
+    :return: List of dicts with the id, name and email of the users.
+    """
+    cache = get_autocomplete_cache()
+    key = 'autocomplete:%s:%s:%d' % (
+        get_autocomplete_version(cache),
+        hashlib.md5(prefix.upper().encode('utf-8')).hexdigest(), limit)
+    suggestions = cache.get(key)
+    if suggestions is None:
+        suggestions = [{
+            'id': user['id'],
+            'name': ('%s %s' % (user['first_name'], user['last_name'])).strip(),
+            'email': user['email'],
+        } for user in get_search_backend().autocomplete(prefix, limit)]
+        cache.set(key, suggestions,
+                  getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 10))
+    return suggestions
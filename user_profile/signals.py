@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user_profile.authentication import revoke_user
+from user_profile.models import UserProfile
+from user_profile.search import (
+    AUTOCOMPLETE_USER_FIELDS, get_search_backend,
+    invalidate_autocomplete_on_commit)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_user_for_search(sender, instance, **kwargs):
+    """
+    Signal to keep the user search index in sync when a user is saved.
+    """
+    get_search_backend().index_user(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_user_from_search(sender, instance, **kwargs):
+    """
+    Signal to drop a deleted user from the user search index.
+    """
+    get_search_backend().remove_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_autocomplete_on_save(sender, instance, update_fields=None,
+                                    **kwargs):
+    """
+    Signal to invalidate the cached autocomplete suggestions when a user's
+    suggested fields may have changed, e.g. not on login.
+    """
+    if update_fields is None or AUTOCOMPLETE_USER_FIELDS.intersection(update_fields):
+        invalidate_autocomplete_on_commit()
+
+
+@receiver(post_delete, sender=UserProfile)
+def invalidate_autocomplete_on_delete(sender, instance, **kwargs):
+    """
+    Signal to invalidate the cached autocomplete suggestions when a user is
+    deleted.
+    """
+    invalidate_autocomplete_on_commit()
+
+
+@receiver(post_save, sender=UserProfile)
+def revoke_inactive_user_tokens(sender, instance, **kwargs):
+    """
+    Signal to revoke the tokens of a deactivated user, whose tokens still
+    carry the is_active claim they were issued with.
+    """
+    if not instance.is_active:
+        revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=UserProfile)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    """
+    Signal to revoke the tokens of a deleted user.
+    """
+    revoke_user(instance.pk)
@@ -1,3 +1,372 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from base64 import urlsafe_b64encode
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user_profile import authentication, hashers
+from user_profile.management.commands import import_users
+from user_profile.models import UserProfile
+from user_profile.search import (
+    BaseSearchBackend, InMemorySearchBackend, get_autocomplete_cache,
+    get_search_backend)
+from user_profile.v1.serializers.user_registration_serializer import (
+    UserSearchRowFormatter, UserSearchSerializer)
+from user_profile.v1.views.user_registration import LoginView
+
+
+def encode_cursor(position):
+    return urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user(
+            'alice@example.com', 'password', first_name='Alice')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_with_wrong_value_types_is_not_found(self):
+        for name, position in (
+                ('list-pending-requests', ['x', 'x']),
+                ('list-pending-requests', [{}, 1]),
+                ('list-friends', ['x'])):
+            response = self.client.get(
+                reverse(name), {'cursor': encode_cursor(position)})
+            self.assertEqual(response.status_code, 404, (name, position))
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ('not-base64!', encode_cursor({'id': 1}), encode_cursor([1, 2])):
+            response = self.client.get(reverse('list-friends'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_valid_cursor_returns_the_next_page(self):
+        response = self.client.get(
+            reverse('list-friends'), {'cursor': encode_cursor([0])})
+        self.assertEqual(response.status_code, 200)
+
+
+class InMemorySearchBackendTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = UserProfile.objects.create_user(
+            'ann@example.com', first_name='Ann', last_name='Lee')
+        cls.joanna = UserProfile.objects.create_user(
+            'joanna@example.com', first_name='Joanna', last_name='Annis')
+        cls.bo = UserProfile.objects.create_user(
+            'bo@example.com', first_name='Bo', last_name='Nguyen')
+        cls.inactive = UserProfile.objects.create_user(
+            'anna@example.com', first_name='Anna', is_active=False)
+
+    def setUp(self):
+        self.backend = InMemorySearchBackend()
+
+    def test_keywords_shorter_than_a_trigram(self):
+        self.assertEqual(self.backend.candidates('bo'), {self.bo.pk})
+        self.assertEqual(self.backend.candidates('n'), {
+            self.ann.pk, self.joanna.pk, self.bo.pk, self.inactive.pk})
+
+    def test_names_are_matched_case_insensitively(self):
+        self.assertEqual(self.backend.candidates('ANN'), {
+            self.ann.pk, self.joanna.pk, self.inactive.pk})
+        self.assertEqual(self.backend.candidates('annis'), {self.joanna.pk})
+
+    def test_exact_email_matches(self):
+        self.assertEqual(self.backend.candidates('Bo@Example.com'), {self.bo.pk})
+        self.assertEqual(self.backend.candidates('bo@example'), set())
+
+    def test_index_updates(self):
+        self.backend.candidates('x')
+        self.bo.first_name = 'Boris'
+        self.backend.index_user(self.bo)
+        self.assertEqual(self.backend.candidates('boris'), {self.bo.pk})
+        self.backend.remove_user(self.bo.pk)
+        self.assertEqual(self.backend.candidates('boris'), set())
+        self.assertEqual(self.backend.candidates('bo@example.com'), set())
+
+    def test_results_match_the_database_backend(self):
+        for keyword in ('ann', 'an', 'annis', 'bo@example.com', 'zzqx'):
+            with self.subTest(keyword):
+                self.assertEqual(
+                    list(self.backend.search(keyword, self.ann).values_list('id', 'rank')),
+                    list(BaseSearchBackend().search(keyword, self.ann).values_list('id', 'rank')))
+
+
+class SearchRankTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from friends.models import Friendship
+
+        create = UserProfile.objects.create_user
+        cls.searcher = create('searcher@example.com', first_name='Searcher')
+        friend = create('friend@example.com', first_name='Friend')
+        cls.expected = [
+            create('kim', first_name='Zed'),
+            create('kimmy@example.com', first_name='Kimmy', followers_count=1000),
+            create('kimberly@example.com', first_name='Kimberly'),
+            # Boosts never lift a user into the next tier.
+            create('pakim@example.com', last_name='Pakim', followers_count=10 ** 6),
+            create('hakim@example.com', last_name='Hakim'),
+            create('akim@example.com', last_name='Akim'),
+            create('okim1@example.com', last_name='Okim'),
+            create('okim2@example.com', last_name='Okim'),
+        ]
+        create('kimo@example.com', first_name='Kimo', is_active=False)
+        Friendship.objects.bulk_create([
+            Friendship(user=cls.searcher, friend=friend),
+            Friendship(user=friend, friend=cls.expected[3]),
+            Friendship(user=friend, friend=cls.expected[4]),
+        ])
+
+    def setUp(self):
+        get_search_backend().reset()
+        self.addCleanup(get_search_backend().reset)
+
+    def test_tiers_boosts_and_ties(self):
+        expected = [user.pk for user in self.expected]
+        for backend in (BaseSearchBackend(), get_search_backend()):
+            with self.subTest(type(backend).__name__):
+                self.assertEqual(list(backend.search('kim', self.searcher).values_list(
+                    'id', flat=True)), expected)
+
+    def test_friend_of_friend_boost_needs_the_searching_user(self):
+        ranks = dict(BaseSearchBackend().search('kim').values_list('id', 'rank'))
+        self.assertEqual(ranks[self.expected[4].pk], ranks[self.expected[5].pk])
+
+
+class AutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create = UserProfile.objects.create_user
+        cls.user = create('owner@example.com')
+        cls.mary = create('mary@example.com', first_name='Mary', last_name='Stone')
+        cls.marten = create('marten@example.com', first_name='Ted', last_name='Marten')
+        # Matches on both names, suggested once.
+        cls.marmar = create('marmar@example.com', first_name='Marla', last_name='Marsh')
+        create('mark@example.com', first_name='Mark', is_active=False)
+
+    def setUp(self):
+        get_search_backend().reset()
+        self.addCleanup(get_search_backend().reset)
+        get_autocomplete_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def suggest(self, prefix, **params):
+        response = self.client.get(reverse('user-autocomplete'), dict(params, q=prefix))
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['id'] for suggestion in response.data['data']]
+
+    def test_first_and_last_name_prefixes(self):
+        self.assertEqual(self.suggest('mar'), [
+            self.marmar.pk, self.marten.pk, self.mary.pk])
+        self.assertEqual(self.suggest('STO'), [self.mary.pk])
+        self.assertEqual(self.suggest('ary'), [])
+        # Inactive users are not suggested.
+        self.assertEqual(self.suggest('mark'), [])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_limit_is_clamped(self):
+        for number in range(25):
+            UserProfile.objects.create_user(
+                'limit%d@example.com' % number, first_name='Limit')
+        self.assertEqual(len(self.suggest('lim', limit=100)), 20)
+        self.assertEqual(len(self.suggest('lim', limit=0)), 1)
+        self.assertEqual(len(self.suggest('lim', limit='many')), 10)
+
+    def test_rename_invalidates_the_cached_suggestions(self):
+        self.assertEqual(self.suggest('sto'), [self.mary.pk])
+        self.mary.last_name = 'Rivers'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mary.save()
+        self.assertEqual(self.suggest('sto'), [])
+        self.assertEqual(self.suggest('riv'), [self.mary.pk])
+
+
+class UserSearchRowFormatterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create_user(
+            'alice@example.com', first_name='Alice', last_name='Smith',
+            date_of_birth='1990-02-03', followers_count=3, request_count=1)
+        UserProfile.objects.create_user('bob@example.com')
+
+    def assert_formats_like_the_serializer(self, queryset):
+        rows = queryset.values(*UserSearchRowFormatter.fields)
+        self.assertEqual(UserSearchRowFormatter().format(rows),
+                         UserSearchSerializer(queryset, many=True).data)
+
+    def test_rows(self):
+        self.assert_formats_like_the_serializer(UserProfile.objects.order_by('id'))
+
+    def test_empty_page(self):
+        self.assert_formats_like_the_serializer(UserProfile.objects.none())
+
+    def test_search_results_with_both_serializations(self):
+        get_search_backend().reset()
+        self.addCleanup(get_search_backend().reset)
+        client = APIClient()
+        client.force_authenticate(UserProfile.objects.get(email='bob@example.com'))
+        for params in ({'q': 'alice'}, {'q': 'alice', 'cursor': ''}, {'q': 'zzqx'}, {}):
+            with self.subTest(params=params):
+                pages = []
+                for fast in (True, False):
+                    with override_settings(FAST_LIST_SERIALIZATION=fast):
+                        pages.append(client.get(reverse('user-search'), params).json())
+                self.assertEqual(pages[0], pages[1])
+
+
+class UserSearchEmptyResultsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user(
+            'alice@example.com', 'password', first_name='Alice')
+
+    def setUp(self):
+        get_search_backend().reset()
+        self.addCleanup(get_search_backend().reset)
+
+    def test_empty_and_unmatched_keywords(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.user)
+        token = LoginView.get_tokens_for_user(self.user)['access']
+        clients = (
+            ('user-search', api_client),
+            ('async-user-search', Client(HTTP_AUTHORIZATION='Bearer ' + token)))
+        for fast in (True, False):
+            for name, client in clients:
+                for params in ({}, {'q': ''}, {'q': 'zzqx'}, {'q': 'zzqx', 'cursor': ''}):
+                    with self.subTest(fast=fast, view=name, params=params), \
+                            override_settings(FAST_LIST_SERIALIZATION=fast):
+                        response = client.get(reverse(name), params)
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual(response.json()['data']['results'], [])
+
+
+class UserSearchQueryCountTests(TestCase):
+    """
+    Search pages run a constant number of queries, whatever their size.
+    """
+    page_sizes = (1, 10, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('owner@example.com')
+        for number in range(2 * max(cls.page_sizes)):
+            UserProfile.objects.create_user(
+                'user%d@example.com' % number, first_name='Querycheck',
+                last_name=str(number))
+
+    def setUp(self):
+        # The in-memory backend outlives the test transactions.
+        get_search_backend().reset()
+        self.addCleanup(get_search_backend().reset)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_queries_per_page(self, params, queries):
+        url = reverse('user-search')
+        # Builds the in-memory index, if that is the backend.
+        self.client.get(url, params)
+        for fast in (True, False):
+            for page_size in self.page_sizes:
+                with self.subTest(fast=fast, page_size=page_size), \
+                        override_settings(FAST_LIST_SERIALIZATION=fast), \
+                        self.assertNumQueries(queries):
+                    response = self.client.get(url, dict(params, page_size=page_size))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['data']['results']), page_size)
+
+    def test_page_number_pagination(self):
+        # The count and the page.
+        self.assert_queries_per_page({'q': 'querycheck'}, 2)
+
+    def test_keyset_pagination(self):
+        self.assert_queries_per_page({'q': 'querycheck', 'cursor': ''}, 1)
+
+
+class LoginTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        UserProfile.objects.create_user('alice@example.com', 'password')
+
+    def login(self, password):
+        return APIClient().post(reverse('user-login'), {
+            'email': 'alice@example.com', 'password': password}, format='json')
+
+    def test_password_is_checked_on_the_request_thread(self):
+        request_thread = threading.current_thread()
+        check_password = UserProfile.check_password
+        threads = []
+
+        def record_thread(user, raw_password):
+            threads.append(threading.current_thread())
+            return check_password(user, raw_password)
+
+        with mock.patch.object(UserProfile, 'check_password', record_thread), \
+                mock.patch.object(hashers, 'get_hashing_executor') as executor:
+            self.assertEqual(self.login('password').status_code, 200)
+            self.assertEqual(self.login('wrong').status_code, 400)
+        self.assertEqual(threads, [request_thread, request_thread])
+        executor.assert_not_called()
+
+
+class TokenRevocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('alice@example.com', 'password')
+
+    def test_revocation_reaches_other_processes(self):
+        token = authentication.add_user_claims(AccessToken.for_user(self.user), self.user)
+        backend = authentication.StatelessJWTAuthentication()
+        self.assertEqual(backend.get_user(token).pk, self.user.pk)
+        authentication.revoke_user(self.user.pk)
+        # Another process only shares the revocation cache, not the verdicts.
+        authentication._verdicts.clear()
+        self.addCleanup(authentication._verdicts.clear)
+        with self.assertRaises(AuthenticationFailed):
+            backend.get_user(token)
+
+
+class ImportUsersTests(TestCase):
+
+    def import_file(self, lines):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'users.jsonl')
+        with open(path, 'w') as import_file:
+            import_file.writelines(json.dumps(line) + '\n' for line in lines)
+        stdout = io.StringIO()
+        call_command('import_users', path, workers=1, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_concurrent_registrations_are_not_counted_as_created(self):
+        UserProfile.objects.create_user('taken@example.com', 'password')
+        # The email is registered after the chunk was deduplicated.
+        with mock.patch.object(import_users, 'existing_emails', return_value=set()):
+            output = self.import_file([
+                {'email': 'taken@example.com', 'password': 'secret'},
+                {'email': 'new@example.com', 'password': 'secret'}])
+        self.assertIn('2 records, 1 created, 1 existing, 0 rejected', output)
+        self.assertTrue(UserProfile.objects.get(
+            email='taken@example.com').check_password('password'))
@@ -1,6 +1,220 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_position_value(value):
+    # DjangoJSONEncoder truncates microseconds, which would skip rows.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination seeking on the ordering columns instead of OFFSET.
+    Every page costs a single indexed range query, however deep it is.
+    Views may set `keyset_ordering` to a tuple of fields ending in a unique
+    column (e.g. ('-created_on', '-id')).
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering = ('id',)
+
+    @classmethod
+    def is_requested(cls, request):
+        """
+        Check whether the client asked for cursor pagination.
+        Sending an empty `cursor` parameter requests the first page.
+        """
+        return cls.cursor_query_param in request.query_params
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, (str, int, float)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, default=_encode_position_value)
+        return urlsafe_b64encode(data.encode('ascii')).decode('ascii')
+
+    def get_position(self, row):
+        """
+        Read the ordering values of a row, which may be a model instance or a
+        dict produced by `values()`.
+        """
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def get_seek_condition(self, position):
+        """
+        Build the filter selecting rows strictly after `position`:
+        (a > x) OR (a = x AND b > y) OR ... with the operator flipped for
+        descending fields.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Prepare the sliced queryset of the requested page, one row longer than
+        the page to detect whether there is a next one.
+        :return: The queryset, or None if it cannot match any row.
+        """
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+        if queryset.query.is_empty():
+            return None
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            # Values of the wrong type for their field are rejected when the
+            # lookups are built.
+            try:
+                queryset = queryset.filter(self.get_seek_condition(position))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.page_size + 1]
+
+    def get_page_rows(self, rows):
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_position = self.get_position(rows[-1])
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return []
+        return self.get_page_rows(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async version of `paginate_queryset`.
+        """
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return []
+        return self.get_page_rows([row async for row in queryset])
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
 
 
 class UserListPagination(PageNumberPagination):
+    """
+    Page number pagination which switches to keyset pagination when the
+    client sends a `cursor` query parameter.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.is_requested(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async version of `paginate_queryset`, counting with `acount()`.
+        """
+        self.keyset = None
+        if self.keyset_class.is_requested(request):
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Count up front so the paginator does not query synchronously.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+        return super().get_previous_link()
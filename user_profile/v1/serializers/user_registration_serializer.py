@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 
+from core.formatters import (
+    DATE_FORMAT, DATETIME_FORMAT, format_date, format_datetime,
+    get_output_timezone)
+from core.instrumentation import TimedSerializerMixin
 from user_profile.models import UserProfile
 
 
@@ -81,15 +85,40 @@ class LoginSerializer(serializers.Serializer):
         return value
 
 
-class UserSearchSerializer(serializers.ModelSerializer):
+class UserSearchSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for searching users by email or name.
     """
     date_joined = serializers.DateTimeField(
-        format='%d/%m/%Y %H:%M:%S', required=False, allow_null=True)
+        format=DATETIME_FORMAT, required=False, allow_null=True)
     date_of_birth = serializers.DateField(
-        format='%d/%m/%Y', required=False, allow_null=True)
+        format=DATE_FORMAT, required=False, allow_null=True)
     class Meta:
         model = UserProfile
         fields = ('id', 'email', 'first_name', 'last_name', 'date_of_birth', 
                   'date_joined', 'followers_count', 'request_count')
+
+
+class UserSearchRowFormatter:
+    """
+    Format `values()` rows of users exactly like `UserSearchSerializer`,
+    without the per-field serializer machinery.
+    """
+    fields = UserSearchSerializer.Meta.fields
+
+    def format(self, rows):
+        """
+        :param rows: The `values()` rows, with at least `fields`.
+        :return: List of dicts in the serializer's field order.
+        """
+        tz = get_output_timezone()
+        return [{
+            'id': row['id'],
+            'email': row['email'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'date_of_birth': format_date(row['date_of_birth'], DATE_FORMAT),
+            'date_joined': format_datetime(row['date_joined'], DATETIME_FORMAT, tz),
+            'followers_count': row['followers_count'],
+            'request_count': row['request_count'],
+        } for row in rows]
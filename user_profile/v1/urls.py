@@ -1,10 +1,16 @@
 from django.urls import path, include
 from user_profile.v1.views.user_registration import (
-    UserRegistrationView, LoginView, LogoutView, UserSearchView)
+    UserRegistrationView, LoginView, LogoutView, UserAutocompleteView,
+    UserSearchView)
+from user_profile.v1.views.user_registration_async import AsyncUserSearchView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-registration'),
     path('login/', LoginView.as_view(), name='user-login'),
     path('logout/', LogoutView.as_view(), name='user-logout'),
     path('search/', UserSearchView.as_view(), name='user-search'),
+    path('autocomplete/', UserAutocompleteView.as_view(), name='user-autocomplete'),
+
+    # Async views, for deployments served by an ASGI server.
+    path('async/search/', AsyncUserSearchView.as_view(), name='async-user-search'),
 ]
\ No newline at end of file
@@ -1,6 +1,5 @@
 from django.conf import settings
-from django.contrib.auth import authenticate, login, logout
-from django.db.models import Q
+from django.contrib.auth import authenticate, login, logout, user_logged_in
 
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
@@ -10,13 +9,17 @@ from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
+from core.views import RowFormatterMixin
 from user_profile.v1.serializers.user_registration_serializer import (
-    UserRegistrationSerializer, LoginSerializer, UserSearchSerializer)
+    UserRegistrationSerializer, LoginSerializer, UserSearchRowFormatter,
+    UserSearchSerializer)
+from user_profile.authentication import add_user_claims, revoke_token
 from user_profile.models import UserProfile
 from user_profile.utils import (
     set_jwt_token_cookie, add_access_token_validity_cookie,
     fetch_token_from_header)
 from user_profile.v1.pagination import UserListPagination
+from user_profile.search import autocomplete, get_search_backend, no_results
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -62,7 +65,7 @@ class LoginView(APIView):
 
     @staticmethod
     def get_tokens_for_user(user):
-        refresh = RefreshToken.for_user(user)
+        refresh = add_user_claims(RefreshToken.for_user(user), user)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -83,7 +86,12 @@ class LoginView(APIView):
                 password=serializer.validated_data.get('password')
             )
             if user and user.is_active:
-                login(request, user)
+                if settings.LOGIN_CREATE_SESSION:
+                    login(request, user)
+                else:
+                    # Keep last_login up to date without a session row.
+                    user_logged_in.send(
+                        sender=user.__class__, request=request, user=user)
                 response = Response(status=status.HTTP_200_OK)
                 token = self.get_tokens_for_user(user)
                 set_jwt_token_cookie(
@@ -131,6 +139,8 @@ class LogoutView(APIView):
                     cookie, samesite='None',
                     domain=settings.TOKEN_COOKIE_DOMAIN
                 )
+            if request.auth is not None:
+                revoke_token(request.auth)
             logout(request)
             response.data = {
                     'message': 'User has been logged out successfully.',
@@ -145,25 +155,27 @@ class LogoutView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
 
-class UserSearchView(generics.ListAPIView):
+class UserSearchView(RowFormatterMixin, generics.ListAPIView):
     """
-    API to search users by email or name.
+    API to search active users by email or name.
+    Results are ranked by relevance: exact email matches first, then name
+    prefixes, then substrings, with popular users and friends of friends
+    first within each tier and the id breaking ties.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = UserSearchSerializer
+    row_formatter_class = UserSearchRowFormatter
     pagination_class = UserListPagination
+    keyset_ordering = ('-rank', 'id')
 
     def get_queryset(self):
         """
-        Get the list of items for this view.
+        Get the list of items for this view, best match first.
         """
         keyword = self.request.query_params.get('q', '')
-        queryset = []
+        queryset = no_results()
         if keyword:
-            filter_condition = (
-                Q(email__iexact=keyword) | Q(first_name__icontains=keyword) | 
-                Q(last_name__icontains=keyword) & Q(is_active=True))
-            queryset = UserProfile.objects.filter(filter_condition)
+            queryset = get_search_backend().search(keyword, self.request.user)
         return queryset
     
     def list(self, request, *args, **kwargs):
@@ -173,4 +185,37 @@ class UserSearchView(generics.ListAPIView):
                 'status': 'S'
             }, status=status.HTTP_200_OK)
 
-        
+
+class UserAutocompleteView(APIView):
+    """
+    API suggesting users as a search is typed.
+    Lighter than `UserSearchView`: it only matches name prefixes, answers
+    with the id, name and email of the first `limit` users by name, and
+    the suggestions of every prefix are cached for a few seconds.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 20
+    # Longer prefixes cannot match the 30 character names.
+    max_prefix_length = 30
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET request suggesting users for the `q` prefix.
+        :param request: The HTTP request with the `q` prefix and optional `limit`.
+        :return: The HTTP response with the suggested users.
+        """
+        prefix = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+
+        suggestions = []
+        if prefix and len(prefix) <= self.max_prefix_length:
+            suggestions = autocomplete(prefix, limit)
+        return Response({
+                "data": suggestions,
+                'status': 'S'
+            }, status=status.HTTP_200_OK)
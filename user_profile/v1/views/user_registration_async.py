@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from rest_framework import status
+
+from core.views import AsyncAPIView, RowFormatterMixin
+from user_profile.v1.views.user_registration import UserSearchView
+
+
+class AsyncUserSearchView(RowFormatterMixin, AsyncAPIView):
+    """
+    Async version of `UserSearchView`.
+    """
+    serializer_class = UserSearchView.serializer_class
+    row_formatter_class = UserSearchView.row_formatter_class
+    pagination_class = UserSearchView.pagination_class
+    keyset_ordering = UserSearchView.keyset_ordering
+    get_queryset = UserSearchView.get_queryset
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Handle GET request searching users, best match first.
+        """
+        # The in-memory search backend may build its index on first use.
+        queryset = await sync_to_async(self.get_queryset)()
+        paginator = self.pagination_class()
+        rows = await paginator.apaginate_queryset(
+            self.get_row_queryset(queryset), request, self)
+        data = paginator.get_paginated_response(self.format_rows(rows)).data
+        return self.render({
+                "data": data,
+                'status': 'S'
+            }, status=status.HTTP_200_OK)